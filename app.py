@@ -55,7 +55,7 @@ def cleanup():
     
     # Save API metrics
     api_metrics = get_api_metrics()
-    api_metrics.save_to_file('data/api_metrics.json')
+    api_metrics.publish()
     api_metrics.log_summary()
     
     # Close HTTP client
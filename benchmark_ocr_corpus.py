@@ -0,0 +1,445 @@
+"""
+Receipt OCR Accuracy & Throughput Benchmark
+Runs the full receipt OCR pipeline over a directory of labelled receipt images
+and reports per-stage timings, throughput with N worker processes and
+per-bank accuracy. Results are saved as JSON so runs can be compared.
+
+The directory must contain a labels.json mapping file names to the expected
+bank and amount, e.g.:
+    {
+        "bbva_01.jpg": {"bank": "BBVA", "amount": 1500.00},
+        "unknown_03.png": {"bank": null, "amount": 250}
+    }
+
+The OCR cache is bypassed so every image goes through the whole pipeline.
+
+With --parity the script instead checks that ReceiptAnalysis (one pass over
+the OCR text) returns the same bank, amount and name as the separate
+identify/parse passes it replaced. It reads every .txt file under the given
+directory, e.g. the OCR texts saved in OCR_LOG_PATH, and needs no Tesseract.
+
+Usage:
+    python benchmark_ocr_corpus.py <corpus_dir> [workers] [output.json]
+    python benchmark_ocr_corpus.py --parity <ocr_text_dir> [output.json]
+
+Examples:
+    python benchmark_ocr_corpus.py data/receipt_corpus            # One worker per CPU core
+    python benchmark_ocr_corpus.py data/receipt_corpus 4          # 4 workers
+    python benchmark_ocr_corpus.py data/receipt_corpus 4 run.json
+    python benchmark_ocr_corpus.py --parity data/ocr_logs
+"""
+import os
+import sys
+import re
+import json
+import time
+import logging
+import statistics
+from pathlib import Path
+from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from core.validation.ocr import get_ocr_config_version, ReceiptAnalysis
+from core.validation.ocr_engine import get_ocr_engine, warm_ocr_engine
+from core.validation.ocr_service import analyze_receipt
+from core.validation.ocr_templates import get_template_engine
+
+STAGES = ("decode", "preprocess", "tesseract", "bank", "parse", "amount")
+RESULTS_DIR = os.path.join("data", "benchmarks")
+
+
+def run_receipt(image_path, expected_amount):
+    """Runs in a worker process; the expected amount plays the role of the trade amount."""
+    result = analyze_receipt(image_path, expected_amount, use_cache=False)
+    result["engine"] = get_ocr_engine().name
+    return result
+
+
+def summarize_timings(values):
+    ordered = sorted(values)
+    return {
+        "avg_ms": round(statistics.mean(ordered) * 1000, 1),
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1)
+    }
+
+
+def amounts_match(found, expected):
+    return found is not None and expected is not None and abs(float(found) - float(expected)) < 0.005
+
+
+# --- Reference copy of the separate passes ReceiptAnalysis replaced ---
+# Kept verbatim (minus logging) so --parity compares against the old
+# behaviour, not against code that shares ReceiptAnalysis' helpers.
+
+def legacy_normalize_text(text):
+    if not text:
+        return ""
+    accent_map = {
+        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
+        'Á': 'a', 'É': 'e', 'Í': 'i', 'Ó': 'o', 'Ú': 'u',
+        'ñ': 'n', 'Ñ': 'n',
+        '¡': '', '¿': ''
+    }
+    for accented, plain in accent_map.items():
+        text = text.replace(accented, plain)
+    return text.lower()
+
+
+def legacy_identify_bank_from_text(text, raw_templates):
+    if not text:
+        return None
+    text_lower = text.lower()
+    text_normalized = legacy_normalize_text(text)
+    bank_templates = raw_templates.get("bank_templates", {})
+
+    best_match_bank = None
+    highest_score = 0
+    for bank_name, template in bank_templates.items():
+        fingerprint = template.get("fingerprint", [])
+        if not fingerprint:
+            continue
+        score = 0
+        for phrase in fingerprint:
+            phrase_normalized = legacy_normalize_text(phrase)
+            if phrase.lower() in text_lower or phrase_normalized in text_normalized:
+                score += 1
+        normalized_score = score / len(fingerprint) if len(fingerprint) > 0 else 0
+        if normalized_score > highest_score:
+            highest_score = normalized_score
+            best_match_bank = bank_name
+
+    if highest_score > 0.4:
+        return best_match_bank
+
+    found_banks = set()
+    for bank_name, template in bank_templates.items():
+        if any(keyword.lower() in text_lower for keyword in template.get("keywords", [])):
+            found_banks.add(bank_name)
+    if not found_banks:
+        return None
+    if len(found_banks) == 1:
+        return found_banks.pop()
+    return list(found_banks)[0] if found_banks else None
+
+
+def legacy_find_details_with_parsers(text, identified_bank, raw_templates):
+    bank_template = raw_templates.get("bank_templates", {}).get(identified_bank, {})
+    parsers = bank_template.get("parsers", {})
+    found_details = {"amount": None, "name": None}
+    if not parsers:
+        return found_details
+
+    amount_pattern = parsers.get("amount", {}).get("pattern")
+    if amount_pattern:
+        match = re.search(amount_pattern, text, re.IGNORECASE | re.MULTILINE)
+        if match:
+            try:
+                amount_str = match.group(1).replace(',', '').strip()
+                if '.' not in amount_str:
+                    amount_str += '.00'
+                found_details["amount"] = float(amount_str)
+            except (ValueError, IndexError):
+                pass
+
+    name_pattern = parsers.get("name", {}).get("pattern")
+    if name_pattern:
+        match = re.search(name_pattern, text, re.IGNORECASE | re.MULTILINE)
+        if match:
+            try:
+                found_details["name"] = match.group(1).strip()
+            except IndexError:
+                pass
+    return found_details
+
+
+def legacy_find_amount_in_text(text, trade_amount, raw_templates):
+    if not text:
+        return None
+    identified_bank = legacy_identify_bank_from_text(text, raw_templates)
+    if identified_bank:
+        parsed_amount = legacy_find_details_with_parsers(text, identified_bank, raw_templates).get("amount")
+        if parsed_amount is not None:
+            return parsed_amount
+
+    priority_keywords = [k.lower() for k in raw_templates.get("generic_amount_keywords", [])]
+    if identified_bank:
+        bank_template = raw_templates.get("bank_templates", {}).get(identified_bank, {})
+        kw = bank_template.get("parsers", {}).get("amount", {}).get("line_keyword")
+        if kw:
+            priority_keywords.insert(0, kw.lower())
+
+    money_pattern = r'\$\s*(\d{1,3}(?:,?\d{3})*(?:\.\d{2})?)\b'
+    all_amounts, priority_amounts = [], []
+    for line in text.lower().split('\n'):
+        found = re.findall(money_pattern, line)
+        if not found:
+            continue
+        is_priority = any(keyword in line for keyword in priority_keywords)
+        for amount_str in found:
+            amount = float(amount_str.replace(',', ''))
+            all_amounts.append(amount)
+            if is_priority:
+                priority_amounts.append(amount)
+
+    expected_amount = float(trade_amount)
+    for amount in priority_amounts:
+        if amount == expected_amount:
+            return amount
+    for amount in all_amounts:
+        if amount == expected_amount:
+            return amount
+    if all_amounts:
+        return min(all_amounts, key=lambda x: abs(x - expected_amount))
+    return None
+
+
+def legacy_find_name_in_text(text, name_keywords, raw_templates):
+    if not text or not name_keywords:
+        return None
+    identified_bank = legacy_identify_bank_from_text(text, raw_templates)
+    if identified_bank:
+        parsed_name = legacy_find_details_with_parsers(text, identified_bank, raw_templates).get("name")
+        if parsed_name:
+            for keyword in name_keywords:
+                if keyword.lower() in parsed_name.lower():
+                    return parsed_name
+    for keyword in name_keywords:
+        if re.search(r'\b' + re.escape(keyword) + r'\b', text, re.IGNORECASE):
+            return keyword
+    return None
+
+
+def parity_probes(text, raw_templates):
+    """
+    Trade amounts and name keywords to try against one text: every amount in
+    the text plus one that is absent (exercises the exact, priority and
+    closest-value paths), and the parsed name's words plus one absent name.
+    """
+    amounts = sorted({float(a.replace(',', '')) for a in re.findall(r'\$\s*([\d,]+(?:\.\d{2})?)', text)})
+    amounts.append(987654.32)
+    keywords = []
+    bank = legacy_identify_bank_from_text(text, raw_templates)
+    if bank:
+        parsed_name = legacy_find_details_with_parsers(text, bank, raw_templates).get("name")
+        if parsed_name:
+            keywords = [word for word in parsed_name.split() if len(word) > 2][:3]
+    name_probes = [keywords, ["Zyxwvut"]] if keywords else [["Zyxwvut"]]
+    return amounts, name_probes
+
+
+def run_parity(text_dir, output_path):
+    """Compares ReceiptAnalysis with the legacy passes over every .txt under text_dir."""
+    paths = sorted(Path(text_dir).rglob("*.txt"))
+    if not paths:
+        print(f"❌ No .txt files found under {text_dir}")
+        sys.exit(1)
+    templates_path = get_template_engine().path
+    with open(templates_path, encoding="utf-8") as f:
+        raw_templates = json.load(f)
+
+    print("=" * 70)
+    print(f"RECEIPT ANALYSIS PARITY CHECK ({len(paths)} texts, templates {get_template_engine().get().digest})")
+    print("=" * 70)
+
+    # Both sides log every fallback step; keep the console readable.
+    logging.disable(logging.WARNING)
+    checks = 0
+    mismatches = []
+    legacy_seconds = new_seconds = 0.0
+    try:
+        for path in paths:
+            text = path.read_text(encoding="utf-8", errors="replace")
+            amounts, name_probes = parity_probes(text, raw_templates)
+
+            start = time.perf_counter()
+            legacy = {"bank": legacy_identify_bank_from_text(text, raw_templates)}
+            for amount in amounts:
+                legacy[f"amount:{amount}"] = legacy_find_amount_in_text(text, amount, raw_templates)
+            for keywords in name_probes:
+                legacy[f"name:{keywords}"] = legacy_find_name_in_text(text, keywords, raw_templates)
+            legacy_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            analysis = ReceiptAnalysis(text)
+            new = {"bank": analysis.bank}
+            for amount in amounts:
+                new[f"amount:{amount}"] = analysis.find_amount(amount)
+            for keywords in name_probes:
+                new[f"name:{keywords}"] = analysis.find_name(keywords)
+            new_seconds += time.perf_counter() - start
+
+            for field, legacy_value in legacy.items():
+                checks += 1
+                if new[field] != legacy_value:
+                    mismatches.append({"file": str(path), "field": field, "legacy": legacy_value, "new": new[field]})
+    finally:
+        logging.disable(logging.NOTSET)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "mode": "parity",
+        "corpus": str(text_dir),
+        "ocr_config_version": get_ocr_config_version(),
+        "texts": len(paths),
+        "checks": checks,
+        "mismatches": len(mismatches),
+        "legacy_seconds": round(legacy_seconds, 3),
+        "analysis_seconds": round(new_seconds, 3),
+        "details": mismatches
+    }
+
+    for mismatch in mismatches[:20]:
+        print(f"   ❌ {mismatch['file']} {mismatch['field']}: legacy={mismatch['legacy']!r} new={mismatch['new']!r}")
+    if len(mismatches) > 20:
+        print(f"   ... {len(mismatches) - 20} more")
+    print(f"🔍 {checks} checks over {len(paths)} texts: {len(mismatches)} mismatch(es)")
+    print(f"⏱️  Legacy passes: {report['legacy_seconds']}s   ReceiptAnalysis: {report['analysis_seconds']}s")
+    print()
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"💾 Results saved to {output_path}")
+    if mismatches:
+        sys.exit(1)
+    print("\n✅ Done!")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    if sys.argv[1] == "--parity":
+        if len(sys.argv) < 3:
+            print(__doc__)
+            sys.exit(1)
+        output_path = sys.argv[3] if len(sys.argv) >= 4 else os.path.join(
+            RESULTS_DIR, f"ocr_parity_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        run_parity(sys.argv[2], output_path)
+        return
+    corpus_dir = Path(sys.argv[1])
+    workers = int(sys.argv[2]) if len(sys.argv) >= 3 else (os.cpu_count() or 2)
+    output_path = sys.argv[3] if len(sys.argv) >= 4 else os.path.join(
+        RESULTS_DIR, f"ocr_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+
+    labels_path = corpus_dir / "labels.json"
+    if not labels_path.exists():
+        print(f"❌ {labels_path} not found")
+        sys.exit(1)
+    with open(labels_path, encoding="utf-8") as f:
+        labels = json.load(f)
+    samples = [(name, label) for name, label in sorted(labels.items()) if (corpus_dir / name).exists()]
+    missing = len(labels) - len(samples)
+    if not samples:
+        print("❌ None of the labelled images exist")
+        sys.exit(1)
+
+    print("=" * 70)
+    print(f"RECEIPT OCR CORPUS BENCHMARK ({len(samples)} images, {workers} workers)")
+    print("=" * 70)
+    if missing:
+        print(f"⚠️  {missing} labelled image(s) not found, skipped")
+    print()
+
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_ocr_engine) as pool:
+        futures = [
+            pool.submit(run_receipt, str(corpus_dir / name), label.get("amount"))
+            for name, label in samples
+        ]
+        results = []
+        for (name, label), future in zip(samples, futures):
+            try:
+                results.append((name, label, future.result()))
+            except Exception as e:
+                print(f"   ❌ {name}: {e}")
+                results.append((name, label, None))
+    wall_seconds = time.perf_counter() - wall_start
+
+    stage_values = defaultdict(list)
+    tier_resolved = defaultdict(int)
+    per_bank = defaultdict(lambda: {"images": 0, "bank_correct": 0, "amount_correct": 0})
+    images = []
+    for name, label, result in results:
+        expected_bank = label.get("bank")
+        expected_amount = label.get("amount")
+        bank_stats = per_bank[expected_bank or "unknown"]
+        bank_stats["images"] += 1
+        if result is None:
+            images.append({"file": name, "error": True})
+            continue
+
+        for stage in STAGES:
+            if stage in result["timings"]:
+                stage_values[stage].append(result["timings"][stage])
+        stage_values["pipeline"].append(sum(result["timings"].values()))
+        if result["tiers"] and result["tiers"][-1]["success"]:
+            tier_resolved[result["tiers"][-1]["tier"]] += 1
+        else:
+            tier_resolved["unresolved"] += 1
+
+        bank_correct = result["bank"] == expected_bank
+        amount_correct = amounts_match(result["amount"], expected_amount)
+        bank_stats["bank_correct"] += int(bank_correct)
+        bank_stats["amount_correct"] += int(amount_correct)
+        images.append({
+            "file": name,
+            "expected_bank": expected_bank,
+            "bank": result["bank"],
+            "expected_amount": expected_amount,
+            "amount": result["amount"],
+            "bank_correct": bank_correct,
+            "amount_correct": amount_correct,
+            "tiers": [tier["tier"] for tier in result["tiers"]],
+            "timings_ms": {stage: round(seconds * 1000, 1) for stage, seconds in result["timings"].items()}
+        })
+
+    for bank_stats in per_bank.values():
+        bank_stats["bank_accuracy"] = round(bank_stats["bank_correct"] / bank_stats["images"], 3)
+        bank_stats["amount_accuracy"] = round(bank_stats["amount_correct"] / bank_stats["images"], 3)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "corpus": str(corpus_dir),
+        "ocr_config_version": get_ocr_config_version(),
+        "engine": sorted({result["engine"] for _, _, result in results if result}),
+        "workers": workers,
+        "images": len(samples),
+        "errors": sum(1 for _, _, result in results if result is None),
+        "wall_seconds": round(wall_seconds, 2),
+        "throughput_per_minute": round(len(samples) / wall_seconds * 60, 1),
+        "stages": {stage: summarize_timings(values) for stage, values in stage_values.items() if values},
+        "tier_resolved": dict(tier_resolved),
+        "per_bank": dict(per_bank),
+        "results": images
+    }
+
+    print("⏱️  Stage timings")
+    for stage, summary in report["stages"].items():
+        print(f"   {stage:<11} avg: {summary['avg_ms']:8.1f}ms   p50: {summary['p50_ms']:8.1f}ms   "
+              f"p95: {summary['p95_ms']:8.1f}ms   max: {summary['max_ms']:8.1f}ms")
+    print()
+    print(f"🚀 Throughput: {report['throughput_per_minute']} receipts/min "
+          f"({len(samples)} in {report['wall_seconds']}s, {workers} workers, engine: {', '.join(report['engine'])})")
+    print(f"   Resolved by tier: {report['tier_resolved']}")
+    print()
+    print("🏦 Accuracy per bank")
+    for bank, bank_stats in sorted(report["per_bank"].items()):
+        print(f"   {bank:<15} images: {bank_stats['images']:4d}   "
+              f"bank: {bank_stats['bank_accuracy']:6.1%}   amount: {bank_stats['amount_accuracy']:6.1%}")
+    print()
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"💾 Results saved to {output_path}")
+    print("\n✅ Done!")
+
+
+if __name__ == '__main__':
+    main()
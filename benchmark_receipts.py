@@ -0,0 +1,95 @@
+"""
+Receipt OCR Engine Benchmark
+Measures per-image OCR latency with a cold engine (pytesseract: one tesseract
+process per image) and a warm engine (tesserocr: model loaded once per process).
+
+Usage:
+    python benchmark_receipts.py <image_dir> [repeat]
+
+Examples:
+    python benchmark_receipts.py data/attachments          # Every image once
+    python benchmark_receipts.py data/attachments 3        # Every image 3 times
+"""
+import sys
+import time
+import statistics
+from pathlib import Path
+
+from core.validation.ocr import OCR_TIERS, load_image
+from core.validation.ocr_engine import PytesseractEngine, TesserocrEngine, tesserocr
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def load_fast_tier_images(image_dir):
+    """Decodes and preprocesses every image once so only OCR time is measured."""
+    _, preprocess, psm = OCR_TIERS[0]
+    images = []
+    for path in sorted(Path(image_dir).iterdir()):
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        img = load_image(str(path))
+        if img is not None:
+            images.append((path.name, preprocess(img)))
+    return images, psm
+
+
+def run_engine(engine, images, psm, repeat):
+    """Returns per-image latencies in milliseconds, in call order."""
+    latencies = []
+    for _ in range(repeat):
+        for _, image in images:
+            start = time.perf_counter()
+            engine.image_to_text(image, psm=psm)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def print_latencies(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"   {label:<22} first: {latencies[0]:8.1f}ms   "
+          f"mean: {statistics.mean(latencies):8.1f}ms   "
+          f"median: {statistics.median(latencies):8.1f}ms   p95: {p95:8.1f}ms")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    image_dir = sys.argv[1]
+    repeat = int(sys.argv[2]) if len(sys.argv) >= 3 else 1
+
+    images, psm = load_fast_tier_images(image_dir)
+    if not images:
+        print(f"❌ No images found in {image_dir}")
+        sys.exit(1)
+
+    print("=" * 70)
+    print(f"RECEIPT OCR ENGINE BENCHMARK ({len(images)} images x {repeat})")
+    print("=" * 70)
+    print()
+
+    print("🐢 pytesseract (cold: new tesseract process per image)")
+    print_latencies("per image", run_engine(PytesseractEngine(), images, psm, repeat))
+    print()
+
+    if tesserocr is None:
+        print("⚠️  tesserocr is not installed; warm engine not benchmarked.")
+        print("   Install it with: pip install tesserocr")
+        return
+
+    print("🚀 tesserocr (warm: model loaded once)")
+    start = time.perf_counter()
+    engine = TesserocrEngine()
+    print(f"   {'engine start-up':<22} {(time.perf_counter() - start) * 1000:8.1f}ms")
+    latencies = run_engine(engine, images, psm, repeat)
+    print_latencies("per image", latencies)
+    if len(latencies) > 1:
+        print_latencies("per image (warm only)", latencies[1:])
+    engine.close()
+    print("\n✅ Done!")
+
+
+if __name__ == '__main__':
+    main()
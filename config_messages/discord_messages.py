@@ -318,7 +318,8 @@ DUPLICATE_RECEIPT_EMBEDS = {
         "description": "⚠️ **IMMEDIATE ACTION REQUIRED** ⚠️\n\nThis receipt has been used before",
         "fields": [
             {"name": "**CURRENT TRADE:**", "value": "{owner_username}", "inline": True},
-            {"name": "**PREVIOUS TRADE:**", "value": "{previous_owner}", "inline": True}
+            {"name": "**PREVIOUS TRADE:**", "value": "{previous_owner}", "inline": True},
+            {"name": "**MATCH:**", "value": "{match_description}", "inline": False}
         ]
     }
 }
@@ -86,7 +86,8 @@ LOW_BALANCE_ALERT_MESSAGE = (
 DUPLICATE_RECEIPT_ALERT_MESSAGE = """\
 🚨 *DUPLICATE RECEIPT*  •  {owner_username}
 ├ Current:   🔑 `{trade_hash}`
-└ Previous:  🔑 `{previous_trade_hash}`  ({previous_owner})
+├ Previous:  🔑 `{previous_trade_hash}`  ({previous_owner})
+└ Match:     {match_description}
 """
 
 # --- Status Update Templates ---
@@ -0,0 +1,52 @@
+import atexit
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from config import PLATFORM_ACCOUNTS
+from core.utils.rate_governor import current_priority, rate_priority
+
+logger = logging.getLogger(__name__)
+
+# Accounts handled at the same time by one bulk operation. Each account has
+# its own rate-governor buckets, so per-account calls don't compete.
+ACCOUNT_FANOUT_WORKERS = 8
+
+_fanout_executor = ThreadPoolExecutor(max_workers=ACCOUNT_FANOUT_WORKERS, thread_name_prefix="account-fanout")
+atexit.register(_fanout_executor.shutdown, wait=True, cancel_futures=False)
+
+
+def for_each_account(func, *args, accounts=None, on_error=None, **kwargs):
+    """
+    Runs func(account, *args, **kwargs) for every account concurrently.
+
+    A failure in one account never affects the others: if func raises, that
+    account's result is on_error(account, exception), or
+    {"success": False, "error": str(exception)} by default. The caller's
+    rate_priority() lane is carried over to the worker threads.
+
+    func must not call for_each_account itself (the shared pool could run
+    out of workers waiting on itself).
+
+    Args:
+        func: Callable taking the account dict first
+        accounts: Accounts to run for (defaults to PLATFORM_ACCOUNTS)
+        on_error: Optional callable(account, exception) building the failure result
+
+    Returns:
+        {account_name: result}, in account order
+    """
+    accounts = PLATFORM_ACCOUNTS if accounts is None else accounts
+    priority = current_priority()
+
+    def run(account):
+        with rate_priority(priority):
+            return func(account, *args, **kwargs)
+
+    futures = [(account, _fanout_executor.submit(run, account)) for account in accounts]
+    results = {}
+    for account, future in futures:
+        try:
+            results[account["name"]] = future.result()
+        except Exception as e:
+            logger.error(f"[Fanout] {getattr(func, '__name__', 'operation')} failed for {account['name']}: {e}")
+            results[account["name"]] = on_error(account, e) if on_error else {"success": False, "error": str(e)}
+    return results
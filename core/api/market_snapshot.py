@@ -0,0 +1,222 @@
+import time
+import atexit
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from core.api.offers import fetch_public_offers
+from core.api.singleflight import get_singleflight_group
+from core.utils.api_metrics import get_api_metrics
+from core.utils.config_service import freeze
+from core.utils.rate_governor import current_priority, rate_priority
+from core.utils.shared_cache import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+# A market is scanned at most once per this many seconds unless a consumer
+# asks for fresher data
+DEFAULT_MAX_AGE = 120
+# Snapshots stay readable (for consumers accepting older data) this long
+SNAPSHOT_RETENTION = 30 * 60
+# After a failed scan, the market isn't scanned again for this long
+FAILED_SCAN_BACKOFF = 30
+
+_scan_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="market-scan")
+atexit.register(_scan_executor.shutdown, wait=True, cancel_futures=False)
+
+# One public offer list: the arguments of fetch_public_offers, in order
+Market = namedtuple(
+    "Market", ["crypto", "fiat", "payment_method", "direction", "payment_method_country_iso", "country_code"]
+)
+
+
+def market_key(crypto, fiat, payment_method, direction="buy", payment_method_country_iso=None, country_code=None):
+    """Builds a normalised Market (codes upper-cased)."""
+    return Market(
+        crypto.upper(), fiat.upper(), payment_method, direction,
+        payment_method_country_iso.upper() if payment_method_country_iso else None,
+        country_code.upper() if country_code else None
+    )
+
+
+def market_for(crypto, fiat, payment_method, direction="buy"):
+    """The Market our offers compete in: MXN markets are filtered to Mexico."""
+    country = "MX" if fiat.upper() == "MXN" else None
+    return market_key(crypto, fiat, payment_method, direction, country, country)
+
+
+class MarketSnapshot:
+    """One scan of a market: read-only offers and when they were fetched."""
+
+    __slots__ = ("market", "offers", "fetched_at")
+
+    def __init__(self, market, offers, fetched_at):
+        self.market = market
+        self.offers = freeze(offers)  # tuple of read-only offer dicts
+        self.fetched_at = fetched_at
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+
+class MarketSnapshotService:
+    """
+    Public offer lists, scanned once per market and shared by every consumer
+    (pricing, leaderboard, reports, dashboard routes, the bot's searches).
+
+    Consumers pass the oldest data they accept (max_age). Only when the
+    current snapshot is older than that is the market scanned again: once
+    per process (concurrent callers share the scan) and once across the
+    local processes (snapshots live in the SharedCache tier and scans are
+    leased). A failed scan isn't retried for FAILED_SCAN_BACKOFF seconds;
+    meanwhile consumers get None, unless they pass allow_stale and accept
+    the last snapshot (reports and dashboard views).
+    """
+
+    def __init__(self):
+        self._snapshots = {}  # {Market: MarketSnapshot}; replaced per item, read without locks
+        self._failed_at = {}  # {Market: time of the last failed scan}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "shared_hits": 0, "scans": 0, "scan_failures": 0, "backoff_hits": 0,
+                       "stale_served": 0, "stale_refused": 0}
+
+    @staticmethod
+    def _shared_key(market):
+        return "market:" + ":".join(str(part or "") for part in market)
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def get(self, market, max_age=DEFAULT_MAX_AGE, allow_stale=False):
+        """
+        Snapshot of a market no older than max_age seconds, scanning it if needed.
+
+        Args:
+            market: Market (see market_key / market_for)
+            max_age: Oldest snapshot this consumer accepts
+            allow_stale: If the market can't be scanned, fall back to the last
+                         snapshot (up to SNAPSHOT_RETENTION old). Only for
+                         displays and reports, never for pricing decisions.
+
+        Returns:
+            MarketSnapshot, or None if no snapshot within max_age (or within
+            SNAPSHOT_RETENTION with allow_stale) is available
+        """
+        snapshot = self._snapshots.get(market)
+        if snapshot is not None and snapshot.age <= max_age:
+            self._count("hits")
+            return snapshot
+        snapshot = get_singleflight_group("market_scan", copy_results=False).do(
+            market, self._refresh, market, max_age
+        )
+        if snapshot is not None and snapshot.age > max_age:
+            # Joined a scan led by a caller accepting older data (which didn't
+            # rescan); refresh for this caller's own max_age. If this caller
+            # led the scan and it failed, the backoff makes this a cheap no-op.
+            snapshot = self._refresh(market, max_age)
+        if snapshot is None:
+            return None
+        if snapshot.age <= max_age:
+            return snapshot
+        if allow_stale and snapshot.age <= SNAPSHOT_RETENTION:
+            self._count("stale_served")
+            return snapshot
+        self._count("stale_refused")
+        return None
+
+    def get_many(self, markets, max_age=DEFAULT_MAX_AGE, allow_stale=False):
+        """
+        Snapshots of several markets, scanning the stale ones concurrently.
+        The caller's rate_priority() lane is carried over to the scans.
+
+        Returns:
+            {Market: MarketSnapshot or None}, one entry per distinct market
+            (None under the same rules as get())
+        """
+        priority = current_priority()
+
+        def scan(market):
+            with rate_priority(priority):
+                return self.get(market, max_age, allow_stale)
+
+        futures = {market: _scan_executor.submit(scan, market) for market in dict.fromkeys(markets)}
+        results = {}
+        for market, future in futures.items():
+            try:
+                results[market] = future.result()
+            except Exception as e:
+                logger.error(f"[MarketSnapshot] Scan of {market} failed: {e}")
+                results[market] = None
+        return results
+
+    def _adopt_shared(self, market):
+        """Takes over a newer snapshot another process stored. Returns the current snapshot."""
+        current = self._snapshots.get(market)
+        if current is not None and current.age > SNAPSHOT_RETENTION:
+            self._snapshots.pop(market, None)
+            current = None
+        entry = get_shared_cache().get(self._shared_key(market))
+        if entry is not None:
+            data = entry[0]
+            if current is None or data["fetched_at"] > current.fetched_at:
+                current = self._snapshots[market] = MarketSnapshot(market, data["offers"], data["fetched_at"])
+                self._count("shared_hits")
+        return current
+
+    def _refresh(self, market, max_age):
+        snapshot = self._adopt_shared(market)
+        if snapshot is not None and snapshot.age <= max_age:
+            return snapshot
+        failed_at = self._failed_at.get(market)
+        if failed_at is not None and time.time() - failed_at < FAILED_SCAN_BACKOFF:
+            self._count("backoff_hits")
+            return snapshot
+
+        shared_cache = get_shared_cache()
+        with shared_cache.lease(self._shared_key(market)):
+            # The previous lease owner has usually just scanned it
+            snapshot = self._adopt_shared(market)
+            if snapshot is not None and snapshot.age <= max_age:
+                return snapshot
+
+            self._count("scans")
+            offers = fetch_public_offers(*market)
+            if offers is None:
+                self._failed_at[market] = time.time()
+                self._count("scan_failures")
+                logger.warning(f"[MarketSnapshot] Scan of {market.crypto}/{market.fiat}/{market.payment_method} "
+                               f"({market.direction}) failed; keeping the previous snapshot")
+                return snapshot
+
+            fetched_at = time.time()
+            self._failed_at.pop(market, None)
+            snapshot = self._snapshots[market] = MarketSnapshot(market, offers, fetched_at)
+            shared_cache.set(
+                self._shared_key(market), {"fetched_at": fetched_at, "offers": offers}, fetched_at + SNAPSHOT_RETENTION
+            )
+            return snapshot
+
+    def get_stats(self):
+        """Hit, scan and failure counts, plus the age of every snapshot held."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["markets"] = {
+            "/".join(str(part) for part in market[:4]): round(snapshot.age)
+            for market, snapshot in list(self._snapshots.items())
+        }
+        return stats
+
+
+# Global market snapshot service instance
+_market_snapshots = MarketSnapshotService()
+
+
+def get_market_snapshots():
+    """Get the global market snapshot service instance."""
+    return _market_snapshots
+
+
+get_api_metrics().register_stats_provider("market_snapshots", _market_snapshots.get_stats)
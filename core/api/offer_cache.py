@@ -0,0 +1,155 @@
+import copy
+import time
+import logging
+import threading
+
+from core.utils.shared_cache import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Own offers rarely change on their own; our changes are written through
+OFFER_CACHE_TTL = 180  # seconds
+
+
+def offer_key(offer):
+    """The hash identifying an offer in /offer/list entries."""
+    return offer.get("offer_hash") or offer.get("offer_id")
+
+
+def _find_offer(offers, offer_hash):
+    offers = list(offers)
+    return next((o for o in offers if offer_key(o) == offer_hash), None) or next(
+        (o for o in offers if o.get("offer_id") == offer_hash), None
+    )
+
+
+def _patch_offer(offer, fields):
+    for field, value in fields.items():
+        # Keep the API's representation (margins come back as strings)
+        if isinstance(offer.get(field), str) and not isinstance(value, str):
+            value = str(value)
+        offer[field] = value
+
+
+class OfferCache:
+    """
+    Own offers cached per account and per offer hash.
+
+    Successful toggles and margin updates are written through to the cached
+    offer instead of invalidating everything, so the next read after a
+    pricing run doesn't refetch /offer/list for every account. Only an
+    account whose offers can't be patched in place (bulk on/off, an offer
+    missing from the cache) is invalidated, and only that account is
+    refetched. Readers always get copies.
+
+    Each account's offers are also kept in the SharedCache tier under
+    shared_key(account), with write-throughs applied there atomically, so
+    the other local processes read the same offers (and see each other's
+    changes) instead of refetching. The in-process copy is only read when
+    the shared tier is unavailable.
+    """
+
+    def __init__(self, ttl_seconds=OFFER_CACHE_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._accounts = {}  # {account_name: {"offers": {hash: offer}, "expires_at": float}}
+        self._stats = {"hits": 0, "shared_hits": 0, "misses": 0, "write_throughs": 0, "invalidations": 0}
+
+    @staticmethod
+    def shared_key(account_name):
+        return f"own_offers:{account_name}"
+
+    def get_account(self, account_name):
+        """
+        Cached offers of one account (all of them, active or not).
+
+        Returns:
+            List of offer dicts, or None if the account must be fetched
+        """
+        shared_cache = get_shared_cache()
+        if shared_cache.enabled:
+            # The shared copy is authoritative: it carries the other processes' write-throughs
+            shared_entry = shared_cache.get(self.shared_key(account_name))
+            with self._lock:
+                if shared_entry is None or time.time() >= shared_entry[1]:
+                    self._stats["misses"] += 1
+                    return None
+                self._stats["shared_hits"] += 1
+            return shared_entry[0]
+
+        with self._lock:
+            entry = self._accounts.get(account_name)
+            if entry is None or time.time() >= entry["expires_at"]:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return copy.deepcopy(list(entry["offers"].values()))
+
+    def _set_local(self, account_name, offers, expires_at):
+        with self._lock:
+            self._accounts[account_name] = {
+                "offers": {offer_key(offer): copy.deepcopy(offer) for offer in offers},
+                "expires_at": expires_at
+            }
+
+    def set_account(self, account_name, offers):
+        """Store the full offer list of one account."""
+        expires_at = time.time() + self.ttl_seconds
+        self._set_local(account_name, offers, expires_at)
+        get_shared_cache().set(self.shared_key(account_name), offers, expires_at)
+
+    def update_offer(self, account_name, offer_hash, **fields):
+        """
+        Write a successful change through to the cached offer.
+
+        If the offer isn't cached, the account is invalidated instead so the
+        change can't be missed.
+        """
+        with self._lock:
+            entry = self._accounts.get(account_name)
+            offer = None
+            if entry is not None:
+                offer = _find_offer(entry["offers"].values(), offer_hash)
+            if offer is None:
+                if entry is not None:
+                    del self._accounts[account_name]
+                    self._stats["invalidations"] += 1
+            else:
+                _patch_offer(offer, fields)
+                self._stats["write_throughs"] += 1
+
+        def patch_shared(offers):
+            shared_offer = _find_offer(offers, offer_hash)
+            if shared_offer is None:
+                return None
+            _patch_offer(shared_offer, fields)
+            return offers
+
+        get_shared_cache().update(self.shared_key(account_name), patch_shared)
+        if offer is None:
+            return
+        logger.debug(f"Offer cache: updated {offer_hash} of {account_name} in place ({', '.join(fields)})")
+
+    def invalidate_account(self, account_name):
+        with self._lock:
+            if self._accounts.pop(account_name, None) is not None:
+                self._stats["invalidations"] += 1
+        get_shared_cache().invalidate(self.shared_key(account_name))
+        logger.debug(f"Offer cache: invalidated {account_name}")
+
+    def clear(self):
+        with self._lock:
+            self._accounts.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, cached_accounts=len(self._accounts))
+
+
+# Global offer cache instance
+_offer_cache = OfferCache()
+
+
+def get_offer_cache():
+    """Get the global offer cache instance."""
+    return _offer_cache
@@ -5,7 +5,11 @@ from datetime import datetime
 from core.api.auth import fetch_token_with_retry
 from config import PLATFORM_ACCOUNTS, BASE_URL_NOONES, LOGS_DIR
 from core.utils.http_client import get_http_client
-from core.utils.response_cache import get_response_cache
+from core.utils.config_service import thaw
+from core.api.singleflight import get_singleflight_group
+from core.api.offer_cache import get_offer_cache
+from core.utils.shared_cache import get_shared_cache
+from core.api.fanout import for_each_account
 
 
 logger = logging.getLogger(__name__)
@@ -14,19 +18,33 @@ logger = logging.getLogger(__name__)
 MARKET_SEARCH_LOG_DIR = str(LOGS_DIR / "market_search")
 os.makedirs(MARKET_SEARCH_LOG_DIR, exist_ok=True)
 
+
 def search_public_offers(crypto_code: str, fiat_code: str, payment_method_slug: str, trade_direction: str = "buy", payment_method_country_iso: str = None, country_code: str = None):
     """
-    Fetches public offers from the Noones /offer/all endpoint.
+    Public offers of one market, from the market snapshot service (scanned
+    at most once per DEFAULT_MAX_AGE across the local processes).
+
+    Returns:
+        A list of offers (the caller's own copy), or None if the market
+        couldn't be scanned
+    """
+    # Imported here: the snapshot service scans through fetch_public_offers below
+    from core.api.market_snapshot import get_market_snapshots, market_key
+
+    snapshot = get_market_snapshots().get(market_key(
+        crypto_code, fiat_code, payment_method_slug, trade_direction, payment_method_country_iso, country_code
+    ))
+    return thaw(snapshot.offers) if snapshot is not None else None
+
+
+def fetch_public_offers(crypto_code, fiat_code, payment_method_slug, trade_direction="buy", payment_method_country_iso=None, country_code=None):
+    """
+    Fetches public offers from the Noones /offer/all endpoint (uncached).
     This REQUIRES authentication, so it uses the first account in config.
+
+    Returns:
+        The offers in fiat_code, or None on failure
     """
-    # Check cache first (2 minute TTL)
-    response_cache = get_response_cache()
-    cache_params = {"crypto": crypto_code, "fiat": fiat_code, "payment": payment_method_slug}
-    cached_result = response_cache.get("public_offers", params=cache_params)
-    if cached_result is not None:
-        logger.debug(f"Returning cached public offers for {crypto_code}/{fiat_code}/{payment_method_slug}")
-        return cached_result
-    
     if not PLATFORM_ACCOUNTS:
         logger.error("Cannot search public offers, no accounts configured in PLATFORM_ACCOUNTS.")
         return None
@@ -111,8 +129,6 @@ def search_public_offers(crypto_code: str, fiat_code: str, payment_method_slug:
                 
                 logger.info(f"Found {len(filtered_offers)} matching offers after filtering.")
 
-                # Cache and return the filtered list
-                response_cache.set("public_offers", filtered_offers, ttl_seconds=120, params=cache_params)
                 return filtered_offers
                 # --- END OF NEW FILTER LOGIC ---
 
@@ -128,67 +144,108 @@ def search_public_offers(crypto_code: str, fiat_code: str, payment_method_slug:
         return None
 
 
-def get_all_offers(active_only=True):
-    """Fetches all of a user's own offers using the correct /offer/list endpoint."""
-    # Check cache first (3 minute TTL — offers rarely change on their own)
-    response_cache = get_response_cache()
-    cached_offers = response_cache.get("all_offers")
-    if cached_offers is not None:
-        logger.debug("Returning cached offers list")
-        return cached_offers
+def _fetch_account_offers(account):
+    """
+    Fetches all of one account's own offers (active or not) from /offer/list.
 
-    all_offers_data = []
-    http_client = get_http_client()
-    for account in PLATFORM_ACCOUNTS:
-        token = fetch_token_with_retry(account)
-        if not token:
-            logger.error(f"Could not authenticate for {account['name']} to fetch offers.")
-            continue
+    Returns:
+        List of offers, or None if they couldn't be fetched
+    """
+    token = fetch_token_with_retry(account)
+    if not token:
+        logger.error(f"Could not authenticate for {account['name']} to fetch offers.")
+        return None
+
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
 
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
+    url = f"{BASE_URL_NOONES}/v1/offer/list"
+    http_client = get_http_client()
 
-        url = f"{BASE_URL_NOONES}/v1/offer/list"
+    try:
+        response = http_client.post(url, headers=headers, timeout=15)
         
-        try:
-            response = http_client.post(url, headers=headers, timeout=15)
-            
-            if response.status_code == 200:
-                try:
-                    response_data = response.json()
-                    offers = response_data.get("data", {}).get("offers", [])
-                    
-                    if not offers and "data" in response_data and isinstance(response_data["data"], list):
-                         offers = response_data["data"]
+        if response.status_code == 200:
+            try:
+                response_data = response.json()
+                offers = response_data.get("data", {}).get("offers", [])
+                
+                if not offers and "data" in response_data and isinstance(response_data["data"], list):
+                     offers = response_data["data"]
 
-                    filtered_offers = [o for o in offers if o.get("active")] if active_only else offers
+                for offer in offers:
+                    offer['account_name'] = account["name"]
+                    offer['enabled'] = offer.get('active')
+                
+                logger.info(f"Successfully fetched {len(offers)} offers for {account['name']}.")
+                return offers
 
-                    for offer in filtered_offers:
-                        offer['account_name'] = account["name"]
-                        offer['enabled'] = offer['active']
-                    
-                    all_offers_data.extend(filtered_offers)
-                    logger.info(f"Successfully fetched {len(filtered_offers)} offers for {account['name']}.")
+            except json.JSONDecodeError:
+                logger.error(f"Failed to decode JSON for {account['name']} from /offer/list. Response: {response.text}")
+        else:
+            error_message = f"API error for {account['name']} from /offer/list (Status: {response.status_code})"
+            try:
+                error_desc = response.json().get("error", {}).get("message", response.text)
+                error_message += f": {error_desc}"
+            except json.JSONDecodeError:
+                 error_message += f". Response body: {response.text}"
+            logger.error(error_message)
 
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to decode JSON for {account['name']} from /offer/list. Response: {response.text}")
-            else:
-                error_message = f"API error for {account['name']} from /offer/list (Status: {response.status_code})"
-                try:
-                    error_desc = response.json().get("error", {}).get("message", response.text)
-                    error_message += f": {error_desc}"
-                except json.JSONDecodeError:
-                     error_message += f". Response body: {response.text}"
-                logger.error(error_message)
+    except Exception as e:
+        logger.error(f"An exception occurred fetching offers for {account['name']}: {e}")
+    return None
 
-        except Exception as e:
-            logger.error(f"An exception occurred fetching offers for {account['name']}: {e}")
 
-    # Cache results for 3 minutes
-    response_cache.set("all_offers", all_offers_data, ttl_seconds=180)
-    return all_offers_data
+def _load_account_offers(account):
+    """
+    Fetches an account's offers into the offer cache (one fetch per account
+    at a time, across the local processes).
+    """
+    def fetch():
+        offer_cache = get_offer_cache()
+        with get_shared_cache().lease(offer_cache.shared_key(account["name"])):
+            # The previous lease owner has usually just stored them
+            offers = offer_cache.get_account(account["name"])
+            if offers is None:
+                offers = _fetch_account_offers(account)
+                if offers is not None:
+                    offer_cache.set_account(account["name"], offers)
+        return offers
+
+    # Concurrent callers each get their own copy of the fetched list
+    return get_singleflight_group("account_offers").do(account["name"], fetch)
+
+
+def get_all_offers(active_only=True):
+    """
+    Fetches all of a user's own offers using the correct /offer/list endpoint.
+
+    Offers are cached per account (see OfferCache); only accounts missing
+    from the cache are fetched, concurrently.
+    """
+    offer_cache = get_offer_cache()
+    per_account = {}
+    missing = []
+    for account in PLATFORM_ACCOUNTS:
+        offers = offer_cache.get_account(account["name"])
+        if offers is None:
+            missing.append(account)
+        else:
+            per_account[account["name"]] = offers
+
+    if missing:
+        per_account.update(for_each_account(_load_account_offers, accounts=missing, on_error=lambda account, e: None))
+    else:
+        logger.debug("Returning cached offers list")
+
+    return [
+        offer
+        for account in PLATFORM_ACCOUNTS
+        for offer in per_account.get(account["name"]) or []
+        if offer.get("active") or not active_only
+    ]
 
 def toggle_single_offer(account_name, offer_hash, turn_on):
     """Activates or deactivates a single offer."""
@@ -214,8 +271,8 @@ def toggle_single_offer(account_name, offer_hash, turn_on):
         response = http_client.post(url, headers=headers, data=data, timeout=15)
 
         if response.status_code == 200 and response.json().get("status") == "success":
-            # Invalidate offers cache so next fetch is fresh
-            get_response_cache().invalidate("all_offers")
+            # Patch the cached offer instead of refetching every account
+            get_offer_cache().update_offer(account_name, offer_hash, active=turn_on, enabled=turn_on)
             return {"success": True}
         else:
             error_message = response.json().get("error_description", "Unknown API error")
@@ -249,8 +306,8 @@ def update_offer_margin(account_name: str, offer_hash: str, margin: float):
         response = http_client.post(url, headers=headers, data=data, timeout=15)
 
         if response.status_code == 200 and response.json().get("status") == "success":
-            # Invalidate offers cache so next fetch is fresh
-            get_response_cache().invalidate("all_offers")
+            # Patch the cached offer instead of refetching every account
+            get_offer_cache().update_offer(account_name, offer_hash, margin=margin)
             return {"success": True}
         else:
             try:
@@ -263,39 +320,86 @@ def update_offer_margin(account_name: str, offer_hash: str, margin: float):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _set_account_offer_status(account, turn_on):
+    """Turns all offers of one account on or off."""
+    token = fetch_token_with_retry(account)
+    if not token:
+        return {"account": account["name"], "success": False, "error": "Could not authenticate."}
+
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+    
+    endpoint = "/offer/turn-on" if turn_on else "/offer/turn-off"
+    url = f"{BASE_URL_NOONES}/v1{endpoint}"
+
+    try:
+        response = get_http_client().post(url, headers=headers)
+
+        if response.status_code == 200 and response.json().get("status") == "success":
+            return {"account": account["name"], "success": True}
+        error_message = response.json().get("error_description", "Unknown error")
+        return {"account": account["name"], "success": False, "error": error_message}
+    except Exception as e:
+        return {"account": account["name"], "success": False, "error": str(e)}
+
+
 def set_offer_status(turn_on):
     """
     Turns all offers on or off for all configured accounts using the correct endpoints.
+    Accounts are switched concurrently; a failing account doesn't affect the others.
+
+    Returns:
+        List of {account, success, error?} in account order
     """
-    results = []
-    http_client = get_http_client()
-    for account in PLATFORM_ACCOUNTS:
-        token = fetch_token_with_retry(account)
-        if not token:
-            results.append({"account": account["name"], "success": False, "error": "Could not authenticate."})
-            continue
-
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        
-        endpoint = "/offer/turn-on" if turn_on else "/offer/turn-off"
-        url = f"{BASE_URL_NOONES}/v1{endpoint}"
+    results = list(for_each_account(
+        _set_account_offer_status, turn_on,
+        on_error=lambda account, e: {"account": account["name"], "success": False, "error": str(e)}
+    ).values())
+
+    # Only the accounts that were switched need a refetch
+    for result in results:
+        if result["success"]:
+            get_offer_cache().invalidate_account(result["account"])
+    
+    return results
 
-        try:
-            response = http_client.post(url, headers=headers)
 
-            if response.status_code == 200 and response.json().get("status") == "success":
-                results.append({"account": account["name"], "success": True})
-            else:
-                error_message = response.json().get("error_description", "Unknown error")
-                results.append({"account": account["name"], "success": False, "error": error_message})
-        except Exception as e:
-            results.append({"account": account["name"], "success": False, "error": str(e)})
+def update_offer_margins(updates):
+    """
+    Applies several margin updates at once: accounts are updated
+    concurrently, the offers of one account one after another.
 
-    # Invalidate offers cache after bulk toggle
-    if any(r["success"] for r in results):
-        get_response_cache().invalidate("all_offers")
-    
-    return results
\ No newline at end of file
+    Args:
+        updates: List of {"account_name", "offer_hash", "margin"} dicts
+
+    Returns:
+        List of {"account_name", "offer_hash", "margin", "success", "error"?}
+        in the order of updates
+    """
+    by_account = {}
+    for update in updates:
+        by_account.setdefault(update["account_name"], []).append(update)
+
+    def apply(account):
+        results = []
+        for update in by_account[account["name"]]:
+            result = update_offer_margin(account["name"], update["offer_hash"], update["margin"])
+            results.append(dict(update, **result))
+        return results
+
+    accounts = [account for account in PLATFORM_ACCOUNTS if account["name"] in by_account]
+    per_account = for_each_account(
+        apply, accounts=accounts,
+        on_error=lambda account, e: [dict(update, success=False, error=str(e)) for update in by_account[account["name"]]]
+    )
+
+    unknown = [
+        dict(update, success=False, error=f"Account '{update['account_name']}' not found.")
+        for name, account_updates in by_account.items() if name not in per_account
+        for update in account_updates
+    ]
+    results = {(r["account_name"], r["offer_hash"]): r for rs in per_account.values() for r in rs}
+    results.update({(r["account_name"], r["offer_hash"]): r for r in unknown})
+    return [results[(update["account_name"], update["offer_hash"])] for update in updates]
@@ -0,0 +1,133 @@
+import copy
+import logging
+import threading
+from functools import wraps
+
+from core.utils.api_metrics import get_api_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller for a key runs the
+    function, callers arriving while it is in flight wait and receive the
+    same result (or exception) instead of issuing their own request.
+
+    Each waiter gets its own deep copy of the result, so a caller mutating
+    what it got (offer lists, dicts) can't change what the others see.
+    Groups whose results are immutable (frozen snapshots) can skip the copy
+    with copy_results=False.
+    """
+
+    def __init__(self, name, copy_results=True):
+        self.name = name
+        self.copy_results = copy_results
+        self._calls = {}  # {key: _Call}
+        self._lock = threading.Lock()
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) unless a call with the same key is already in flight.
+
+        Returns:
+            The result of the single shared call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            logger.debug(f"[SingleFlight:{self.name}] Joined in-flight call for {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result) if self.copy_results else call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.debug(f"[SingleFlight:{self.name}] Shared one call for {key} with {call.waiters} waiter(s)")
+
+    def get_stats(self):
+        """Calls executed, calls saved by joining an in-flight one, and calls in flight now."""
+        with self._lock:
+            return {"executed": self._executed, "saved": self._coalesced, "in_flight": len(self._calls)}
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_singleflight_group(name, copy_results=True):
+    """
+    Get (or create) the named singleflight group.
+
+    Args:
+        name: Group name
+        copy_results: Hand waiters a deep copy of the result (see SingleFlight);
+                      only pass False for groups returning immutable results
+    """
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name, copy_results)
+        return group
+
+
+def singleflight(name, key=None):
+    """
+    Decorator that coalesces concurrent calls with the same arguments.
+
+    Args:
+        name: Group name (used in stats)
+        key: Optional callable(*args, **kwargs) returning a hashable key;
+             by default the positional and keyword arguments are used
+    """
+    def decorator(func):
+        group = get_singleflight_group(name)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return group.do(call_key, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_singleflight_stats():
+    """Stats for every singleflight group: {name: {executed, saved, in_flight}}."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.get_stats() for group in groups}
+
+
+get_api_metrics().register_stats_provider("singleflight", get_singleflight_stats)
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+
+from config import TOKEN_URL_NOONES
+from core.utils.token_cache import get_token_cache
+from core.utils.http_client import get_http_client
+from core.utils.rate_governor import get_rate_governor
+from core.utils.retry_policy import TOKEN_POLICY
+from core.utils.shared_cache import get_shared_cache
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = Exception
+
+logger = logging.getLogger(__name__)
+
+TOKEN_STORE_PATH = os.path.join("data", "token_store.json")
+
+# Used when the OAuth response carries no expires_in
+DEFAULT_EXPIRES_IN = 60 * 60  # seconds
+# Refresh this long before the token expires
+REFRESH_AHEAD_SECONDS = 5 * 60
+# Wait between background refresh attempts that failed
+REFRESH_RETRY_SECONDS = 60
+# Re-check the store this soon when another process is refreshing the token
+REFRESH_HANDOFF_SECONDS = 15
+# The fetch lease must outlive a whole token request under TOKEN_POLICY
+# (retries included), and waiters must wait that long, or other processes
+# take over mid-request and fetch tokens of their own
+TOKEN_LEASE_SECONDS = TOKEN_POLICY.worst_case_seconds + 5
+
+_KEY_SALT = b"noones-token-store"
+_KEY_ITERATIONS = 100_000
+
+
+class TokenManager:
+    """
+    Owns Noones OAuth tokens: fetches them using the real expires_in, keeps
+    them in the TokenCache, refreshes each one in the background shortly
+    before it expires, and persists them encrypted at rest so a restarted
+    process starts with valid tokens instead of re-authenticating.
+
+    Tokens are encrypted with Fernet (optional 'cryptography' package) using
+    a key derived from the account's client secret. Without the package,
+    tokens are only kept in memory.
+
+    The store is shared by the trading process, the Flask app and the bot:
+    a process missing a token first reads the store, and fetching or
+    refreshing a token is done under the account's SharedCache lease, so
+    one process fetches and the others adopt its token from the store.
+    Every token is registered with the rate governor under the account's
+    client_id, so a refresh doesn't reset the account's rate budget.
+    """
+
+    def __init__(self, store_path=TOKEN_STORE_PATH):
+        """
+        Initialize the token manager.
+
+        Args:
+            store_path: Path of the encrypted token store
+        """
+        self.store_path = store_path
+        self._store_lock = threading.Lock()
+        self._timers_lock = threading.Lock()
+        self._timers = {}  # {account_name: threading.Timer}
+        self._fernets = {}  # {account_name: Fernet}
+        if Fernet is None:
+            logger.warning("'cryptography' is not installed; Noones tokens will not be persisted across restarts.")
+
+    def _get_fernet(self, account):
+        if Fernet is None:
+            return None
+        fernet = self._fernets.get(account["name"])
+        if fernet is None:
+            derived = hashlib.pbkdf2_hmac("sha256", account["secret"].encode("utf-8"), _KEY_SALT, _KEY_ITERATIONS)
+            fernet = self._fernets[account["name"]] = Fernet(base64.urlsafe_b64encode(derived))
+        return fernet
+
+    def _read_store(self):
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _persist(self, account, token, expires_at):
+        fernet = self._get_fernet(account)
+        if fernet is None:
+            return
+        with self._store_lock:
+            try:
+                store = self._read_store()
+                store[account["name"]] = {
+                    "token": fernet.encrypt(token.encode("utf-8")).decode("ascii"),
+                    "expires_at": expires_at
+                }
+                os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+                temp_path = f"{self.store_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(store, f)
+                os.replace(temp_path, self.store_path)
+            except OSError as e:
+                logger.warning(f"Could not persist token for {account['name']}: {e}")
+
+    def _restore(self, account, newer_than=0):
+        """
+        Loads a still-valid persisted token into the cache (one written by
+        this or another process). Returns the token or None.
+
+        Args:
+            account: Account configuration dict
+            newer_than: Ignore stored tokens expiring at or before this time
+        """
+        fernet = self._get_fernet(account)
+        if fernet is None:
+            return None
+        with self._store_lock:
+            entry = self._read_store().get(account["name"])
+        if not entry or entry.get("expires_at", 0) - time.time() <= get_token_cache().expiry_margin_seconds:
+            return None
+        if entry["expires_at"] <= newer_than:
+            return None
+        try:
+            token = fernet.decrypt(entry["token"].encode("ascii")).decode("utf-8")
+        except (InvalidToken, KeyError, ValueError):
+            logger.warning(f"Persisted token for {account['name']} could not be decrypted; ignoring it.")
+            return None
+        get_token_cache().set_with_expiry(account["name"], token, entry["expires_at"])
+        get_rate_governor().register_token(token, account["key"])
+        self._schedule_refresh(account, entry["expires_at"])
+        logger.info(f"Restored persisted token for {account['name']} "
+                    f"(expires in {int(entry['expires_at'] - time.time())}s)")
+        return token
+
+    def _request_token(self, account, max_retries):
+        """Requests a new token. Returns (token, expires_in) or (None, None)."""
+        account_name = account["name"]
+        token_url = TOKEN_URL_NOONES
+        token_data = {
+            "grant_type": "client_credentials",
+            "client_id": account["key"],
+            "client_secret": account["secret"]
+        }
+
+        http_client = get_http_client()
+        try:
+            response = TOKEN_POLICY.call(
+                lambda timeout: http_client.post(token_url, data=token_data, timeout=timeout),
+                max_attempts=max_retries
+            )
+        except Exception as e:
+            logger.error(f"Token request failed for {account_name}: {e}")
+            return None, None
+
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch token for {account_name}. Status Code: {response.status_code} - {response.text}")
+            return None, None
+
+        payload = response.json()
+        try:
+            expires_in = int(payload.get("expires_in") or DEFAULT_EXPIRES_IN)
+        except (TypeError, ValueError):
+            expires_in = DEFAULT_EXPIRES_IN
+        return payload.get("access_token"), expires_in
+
+    def get_token(self, account, max_retries=3, force_refresh=False):
+        """
+        Get a valid token for the account: cached, restored from the store, or fetched.
+
+        Args:
+            account: Account configuration dict
+            max_retries: Maximum retry attempts when fetching
+            force_refresh: If True, always fetch a new token
+
+        Returns:
+            Access token string or None on failure
+        """
+        account_name = account["name"]
+        if force_refresh:
+            return self._fetch(account, max_retries)
+
+        cached_token = get_token_cache().get(account_name)
+        if cached_token:
+            return cached_token
+        with get_shared_cache().lease(self.lease_key(account), wait=TOKEN_LEASE_SECONDS, lease_seconds=TOKEN_LEASE_SECONDS):
+            # Another process may have fetched it (or this one may have, before a restart)
+            restored_token = self._restore(account)
+            if restored_token:
+                return restored_token
+            return self._fetch(account, max_retries)
+
+    @staticmethod
+    def lease_key(account):
+        return f"token:{account['name']}"
+
+    def _fetch(self, account, max_retries):
+        """Requests a new token and caches, persists and schedules its refresh."""
+        account_name = account["name"]
+        token_cache = get_token_cache()
+        token, expires_in = self._request_token(account, max_retries)
+        if not token:
+            return None
+        expires_at = time.time() + expires_in
+        token_cache.set_with_expiry(account_name, token, expires_at)
+        get_rate_governor().register_token(token, account["key"])
+        self._persist(account, token, expires_at)
+        self._schedule_refresh(account, expires_at)
+        return token
+
+    def _schedule_refresh(self, account, expires_at, delay=None):
+        if delay is None:
+            delay = max(0.0, expires_at - REFRESH_AHEAD_SECONDS - time.time())
+        timer = threading.Timer(delay, self._background_refresh, args=(account, expires_at))
+        timer.daemon = True
+        timer.name = f"token-refresh-{account['name']}"
+        with self._timers_lock:
+            previous = self._timers.get(account["name"])
+            if previous is not None:
+                previous.cancel()
+            self._timers[account["name"]] = timer
+        timer.start()
+
+    def _background_refresh(self, account, expires_at):
+        # Imported here: auth wraps this manager and adds request coalescing
+        from core.api.auth import fetch_token_with_retry
+
+        with get_shared_cache().lease(self.lease_key(account), wait=0, lease_seconds=TOKEN_LEASE_SECONDS) as owned:
+            if not owned:
+                # Another process is refreshing it; pick its token up from the store
+                logger.debug(f"Token refresh for {account['name']} is running in another process")
+                self._schedule_refresh(account, expires_at, delay=REFRESH_HANDOFF_SECONDS)
+                return
+            if self._restore(account, newer_than=expires_at):
+                logger.debug(f"Adopted a token for {account['name']} refreshed by another process")
+                return
+            logger.debug(f"Refreshing token for {account['name']} ahead of expiry")
+            if fetch_token_with_retry(account, force_refresh=True):
+                return
+        if time.time() < expires_at:
+            logger.warning(f"Background token refresh failed for {account['name']}; retrying in {REFRESH_RETRY_SECONDS}s")
+            self._schedule_refresh(account, expires_at, delay=REFRESH_RETRY_SECONDS)
+
+    def shutdown(self):
+        """Cancel pending background refreshes."""
+        with self._timers_lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+
+
+# Global token manager instance
+_token_manager = TokenManager()
+
+
+def get_token_manager():
+    """Get the global token manager instance."""
+    return _token_manager
@@ -1,46 +1,106 @@
 import logging
-import time
 import os
 import re
+import uuid
+import atexit
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from config import (
     GET_CHAT_URL_NOONES,
     ATTACHMENT_PATH
 )
 from core.api.auth import fetch_token_with_retry
 from core.utils.http_client import get_http_client
+from core.utils.circuit_breaker import CircuitOpenError
+from core.utils.retry_policy import CHAT_READ_POLICY, RELEASE_POLICY
 
 logger = logging.getLogger(__name__)
 
+# Attachments are streamed to disk in chunks of this size while being hashed.
+_ATTACHMENT_CHUNK_SIZE = 64 * 1024
+
+# Small dedicated pool so several receipts uploaded to the same trade are
+# downloaded concurrently instead of one after another.
+_download_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="attach-dl")
+atexit.register(_download_executor.shutdown, wait=True, cancel_futures=False)
+
 
 def download_attachment(image_url_path, image_api_url, trade_hash, headers):
+    """
+    Streams a trade attachment into the content-addressed attachment store.
+
+    The body is SHA-256 hashed while it is written, so the digest is available
+    as soon as the download finishes without reading the file back. Files are
+    stored as '<sha256><ext>' in ATTACHMENT_PATH, which means an identical
+    receipt re-uploaded in another trade resolves to the file already on disk.
+
+    Returns:
+        (file_path, image_hash) on success, (None, None) otherwise.
+    """
     match = re.search(r'attachment/([^?]+)', image_url_path)
     if not match:
-        return None
+        return None, None
     image_hash = match.group(1)
     image_payload = {"image_hash": image_hash, "size": "2"}
     image_headers = headers.copy()
     image_headers["Content-Type"] = "application/x-www-form-urlencoded"
 
+    temp_path = None
     try:
         http_client = get_http_client()
-        response = http_client.post(image_api_url, data=image_payload, headers=image_headers, timeout=15)
-        
-        if response.status_code == 200:
+        with http_client.post(image_api_url, data=image_payload, headers=image_headers, timeout=15, stream=True) as response:
+            if response.status_code != 200:
+                logger.error(f"Failed to download attachment with hash {image_hash}. Status: {response.status_code} - {response.text}")
+                return None, None
+
             os.makedirs(ATTACHMENT_PATH, exist_ok=True)
-            file_extension = os.path.splitext(image_url_path)[1] or '.jpg'
+            file_extension = os.path.splitext(image_url_path.split('?')[0])[1] or '.jpg'
             sanitized_hash = "".join(c for c in trade_hash if c.isalnum())
-            timestamp = int(time.time())
-            file_name = f"{sanitized_hash}_{timestamp}{file_extension}"
-            file_path = os.path.join(ATTACHMENT_PATH, file_name)
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
-            logger.info(f"New attachment for trade {trade_hash} downloaded to {file_path}")
-            return file_path
+            # Unique temp name: concurrent downloads must never share a partial file.
+            temp_path = os.path.join(ATTACHMENT_PATH, f".{sanitized_hash}_{uuid.uuid4().hex}.part")
+
+            hasher = hashlib.sha256()
+            with open(temp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=_ATTACHMENT_CHUNK_SIZE):
+                    if chunk:
+                        hasher.update(chunk)
+                        f.write(chunk)
+
+        digest = hasher.hexdigest()
+        file_path = os.path.join(ATTACHMENT_PATH, f"{digest}{file_extension}")
+        if os.path.exists(file_path):
+            logger.info(f"Attachment for trade {trade_hash} already stored as {file_path} (identical content).")
         else:
-            logger.error(f"Failed to download attachment with hash {image_hash}. Status: {response.status_code} - {response.text}")
+            os.replace(temp_path, file_path)
+            logger.info(f"New attachment for trade {trade_hash} downloaded to {file_path}")
+        return file_path, digest
     except Exception as e:
         logger.error(f"Error downloading attachment for trade {trade_hash}: {e}")
-    return None
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    return None, None
+
+
+def download_attachments(image_url_paths, image_api_url, trade_hash, headers):
+    """
+    Downloads several attachments of one trade concurrently.
+
+    Returns:
+        A list of (file_path, image_hash) tuples in the same order as image_url_paths.
+    """
+    if not image_url_paths:
+        return []
+    if len(image_url_paths) == 1:
+        return [download_attachment(image_url_paths[0], image_api_url, trade_hash, headers)]
+    futures = [
+        _download_executor.submit(download_attachment, url, image_api_url, trade_hash, headers)
+        for url in image_url_paths
+    ]
+    return [future.result() for future in futures]
 
 def get_all_messages_from_chat(trade_hash, account, headers, max_retries=3):
     """
@@ -51,32 +111,27 @@ def get_all_messages_from_chat(trade_hash, account, headers, max_retries=3):
     chat_url = GET_CHAT_URL_NOONES
     data = {"trade_hash": trade_hash}
 
-    for attempt in range(max_retries):
-        try:
-            http_client = get_http_client()
-            response = http_client.post(chat_url, data=data, headers=headers, timeout=20)
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch chat for {trade_hash}: {response.status_code}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    return []
-
-
-            chat_data = response.json()
-            if chat_data.get("status") != "success":
-                logger.error(f"API returned error fetching chat: {chat_data}")
-                return []
-
-            return chat_data.get("data", {}).get("messages", [])
-        
-        except Exception as e:
-            logger.error(f"Request failed for {trade_hash}: {e}")
-        
-        if attempt < max_retries - 1:
-            time.sleep(2 ** attempt)
+    http_client = get_http_client()
+    try:
+        response = CHAT_READ_POLICY.call(
+            lambda timeout: http_client.post(chat_url, data=data, headers=headers, timeout=timeout),
+            max_attempts=max_retries
+        )
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch chat for {trade_hash}: {response.status_code}")
+            return []
 
+        chat_data = response.json()
+        if chat_data.get("status") != "success":
+            logger.error(f"API returned error fetching chat: {chat_data}")
+            return []
+
+        return chat_data.get("data", {}).get("messages", [])
+
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping chat fetch for {trade_hash}: {e}")
+    except Exception as e:
+        logger.error(f"Request failed for {trade_hash}: {e}")
     return []
 
 def release_trade(trade_hash, account):
@@ -97,7 +152,10 @@ def release_trade(trade_hash, account):
 
     http_client = get_http_client()
     try:
-        response = http_client.post(release_url, data=data, headers=headers, timeout=15)
+        # Not idempotent: only retried if the request never reached Noones
+        response = RELEASE_POLICY.call(
+            lambda timeout: http_client.post(release_url, data=data, headers=headers, timeout=timeout)
+        )
         if response.status_code == 200:
             response_data = response.json()
             if response_data.get("status") == "success":
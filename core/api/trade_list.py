@@ -1,161 +1,302 @@
 import certifi
-import logging
 import json
-import time
-import os
-import uuid
+import math
+import atexit
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from config import (
     TRADE_LIST_URL_NOONES,
-    TRADE_COMPLETED_URL_NOONES,
-    TRADES_ACTIVE_DIR
+    TRADE_COMPLETED_URL_NOONES
 )
 from core.utils.http_client import get_http_client
+from core.utils.circuit_breaker import CircuitOpenError
+from core.utils.retry_policy import TRADE_LIST_POLICY
+from core.state.trade_snapshot import get_trade_snapshot_publisher
 
 logger = logging.getLogger(__name__)
 
+# Trades requested per /trade/list page
+TRADE_PAGE_SIZE = 100
+# Safety cap: never page further than this in one cycle
+MAX_TRADE_PAGES = 20
 
-def get_trade_list(account, headers, limit=10, page=1, max_retries=3, include_completed=False):
+# Pages after the first are fetched concurrently (the rate governor still
+# spaces them out per account)
+_page_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="trade-page")
+atexit.register(_page_executor.shutdown, wait=True, cancel_futures=False)
+
+
+class TradeListDelta:
+    """
+    One cycle's full trade list plus what changed since the previous cycle
+    of the same account: trades that appeared, trades whose content
+    changed, and hashes that are no longer listed.
+    """
+
+    __slots__ = ("trades", "added", "changed", "removed", "complete")
+
+    def __init__(self, trades, added, changed, removed, complete):
+        self.trades = trades
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.complete = complete
+
+    def __bool__(self):
+        return bool(self.trades)
+
+
+_previous_cycle = {}  # {account_name: {trade_hash: fingerprint}}
+_previous_cycle_lock = threading.Lock()
+
+
+def _fingerprint(trade):
+    return hashlib.sha1(json.dumps(trade, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _total_count(trades_data):
+    """Total number of open trades reported by /trade/list (requested with count=1), if any."""
+    data = trades_data.get("data") or {}
+    for key in ("totalCount", "total_count", "count"):
+        value = data.get(key)
+        if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+            return int(value)
+    return None
 
+
+def _fetch_trade_page(account, headers, page, limit, max_retries=3):
+    """
+    Fetches one /trade/list page.
+
+    Returns:
+        The parsed response dict, or None on failure
+    """
+    http_client = get_http_client()
     data = {
         "page": page,
         "count": 1,
         "limit": limit
     }
-
-    http_client = get_http_client()
-    
-    for attempt in range(max_retries):
-        try:
-            response = http_client.post(
+    try:
+        response = TRADE_LIST_POLICY.call(
+            lambda timeout: http_client.post(
                 TRADE_LIST_URL_NOONES,
                 headers=headers,
                 data=data,
                 verify=certifi.where(),
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                trades_data = response.json()
-                filename = f"{account['name'].replace(' ', '_')}_trades.json"
-                filepath = os.path.join(TRADES_ACTIVE_DIR, filename)
-                # Use a uuid-based suffix to prevent cross-thread .tmp collisions
-                # when two threads write for the same account simultaneously.
-                temp_filepath = filepath + f".{uuid.uuid4().hex}.tmp"
-                try:
-                    with open(temp_filepath, "w", encoding="utf-8") as json_file:
-                        json.dump(trades_data, json_file, indent=4)
-                    success = False
-                    last_err = None
-                    for replace_attempt in range(5):
-                        try:
-                            os.replace(temp_filepath, filepath)
-                            success = True
-                            break
-                        except PermissionError as e:
-                            last_err = e
-                            delay = 0.1 * (2 ** replace_attempt)
-                            time.sleep(delay)
-
-                    if not success:
-                        try:
-                            if os.path.exists(filepath):
-                                os.remove(filepath)
-                            os.replace(temp_filepath, filepath)
-                        except Exception as e:
-                            raise last_err or e
-                except Exception as e:
-                    logger.warning(f"Could not write trades snapshot for {account['name']}: {e}")
-                finally:
-                    if os.path.exists(temp_filepath):
-                        try:
-                            os.remove(temp_filepath)
-                        except Exception:
-                            pass
-                logger.debug(f"Saved raw trade data to {filepath}")
-
-                if trades_data.get("status") == "success" and trades_data["data"].get("trades"):
-                    trades = trades_data["data"]["trades"]
-                    
-                    # Fetch recently completed trades if requested
-                    # Completed trades immediately drop off the /trade/list endpoint
-                    if include_completed:
-                        try:
-                            completed_url = TRADE_COMPLETED_URL_NOONES
-                            
-                            # Fetch recent completed trades (last 5 minutes)
-                            completed_data = {
-                                "page": 1,
-                                "limit": 20  # Get recent completed trades
-                            }
-                            
-                            completed_response = http_client.post(
-                                completed_url,
-                                headers=headers,
-                                data=completed_data,  # Use data= not json=
-                                verify=certifi.where(),
-                                timeout=10
-                            )
-                            
-                            if completed_response.status_code == 200:
-                                completed_trades_data = completed_response.json()
-                                if completed_trades_data.get("status") == "success" and completed_trades_data["data"].get("trades"):
-                                    completed_trades = completed_trades_data["data"]["trades"]
-                                    
-                                    # Filter to only very recently completed (within 5 minutes)
-                                    five_minutes_ago = datetime.now(timezone.utc) - timedelta(minutes=5)
-                                    recently_completed = []
-                                    for trade in completed_trades:
-                                        # API uses 'status' = 'successful' or 'trade_status' = 'Released'
-                                        is_completed = (
-                                            str(trade.get("trade_status")).lower() in ["released", "successful"] or
-                                            str(trade.get("status")).lower() == "successful"
-                                        )
-                                        if is_completed:
-                                            completed_at_str = trade.get("completed_at") or trade.get("ended_at")
-                                            if completed_at_str:
-                                                try:
-                                                    completed_at = datetime.fromisoformat(completed_at_str.replace("Z", "+00:00"))
-                                                    if completed_at.tzinfo is None:
-                                                        completed_at = completed_at.replace(tzinfo=timezone.utc)
-                                                        
-                                                    if completed_at > five_minutes_ago:
-                                                        # /v1/trade/completed API omits owner_username, inject it from
-                                                        # the explicit field in PLATFORM_ACCOUNTS (not parsed from name).
-                                                        if "owner_username" not in trade:
-                                                            trade["owner_username"] = account.get("owner_username", account["name"])
-                                                            
-                                                        recently_completed.append(trade)
-                                                        logger.info(f"Found recently completed trade: {trade.get('trade_hash')} at {completed_at_str}")
-                                                except (ValueError, TypeError) as e:
-                                                    logger.debug(f"Error parsing completion time: {e}")
-                                    
-                                    # Add recently completed trades to processing queue
-                                    trades.extend(recently_completed)
-                                    logger.debug(f"Added {len(recently_completed)} recently completed trades from last 5 minutes")
-                            else:
-                                logger.warning(f"Failed to fetch completed trades from {completed_url}: {completed_response.status_code}")
-                                logger.debug(f"Response text: {completed_response.text}")
-                        except Exception as e:
-                            logger.error(f"Error fetching completed trades: {e}")
-                    
-                    return trades
-                else:
-                    logger.debug(f"No trades found for {account['name']}.")
-                    return []
-            else:
-                logger.error(f"Error fetching trade list for {account['name']}: {response.status_code} - {response.text}")
-                return []
-        
-        except Exception as e:
-            logger.error(f"SSL/Request Error on attempt {attempt + 1} for {account['name']}: {e}")
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                logger.debug(f"Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
+                timeout=timeout
+            ),
+            max_attempts=max_retries
+        )
+        if response.status_code == 200:
+            return response.json()
+        logger.error(f"Error fetching trade list page {page} for {account['name']}: {response.status_code} - {response.text}")
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping trade list for {account['name']}: {e}")
+    except Exception as e:
+        logger.error(f"SSL/Request Error fetching trade list page {page} for {account['name']}: {e}")
+    return None
+
+
+def _page_ok(trades_data):
+    """A page was fetched and the API reported success (a 200 can still carry an error body)."""
+    return trades_data is not None and trades_data.get("status") == "success"
+
+
+def _page_trades(trades_data):
+    if _page_ok(trades_data):
+        return (trades_data.get("data") or {}).get("trades") or []
+    return []
+
+
+def _fetch_recently_completed(account, headers):
+    """
+    Trades completed in the last 5 minutes.
+
+    Completed trades immediately drop off the /trade/list endpoint, so they
+    are fetched separately to finish their processing.
+    """
+    http_client = get_http_client()
+    recently_completed = []
+    try:
+        completed_url = TRADE_COMPLETED_URL_NOONES
+
+        # Fetch recent completed trades (last 5 minutes)
+        completed_data = {
+            "page": 1,
+            "limit": 20  # Get recent completed trades
+        }
+
+        completed_response = http_client.post(
+            completed_url,
+            headers=headers,
+            data=completed_data,  # Use data= not json=
+            verify=certifi.where(),
+            timeout=10
+        )
+
+        if completed_response.status_code == 200:
+            completed_trades_data = completed_response.json()
+            if completed_trades_data.get("status") == "success" and completed_trades_data["data"].get("trades"):
+                completed_trades = completed_trades_data["data"]["trades"]
+
+                # Filter to only very recently completed (within 5 minutes)
+                five_minutes_ago = datetime.now(timezone.utc) - timedelta(minutes=5)
+                for trade in completed_trades:
+                    # API uses 'status' = 'successful' or 'trade_status' = 'Released'
+                    is_completed = (
+                        str(trade.get("trade_status")).lower() in ["released", "successful"] or
+                        str(trade.get("status")).lower() == "successful"
+                    )
+                    if is_completed:
+                        completed_at_str = trade.get("completed_at") or trade.get("ended_at")
+                        if completed_at_str:
+                            try:
+                                completed_at = datetime.fromisoformat(completed_at_str.replace("Z", "+00:00"))
+                                if completed_at.tzinfo is None:
+                                    completed_at = completed_at.replace(tzinfo=timezone.utc)
+
+                                if completed_at > five_minutes_ago:
+                                    # /v1/trade/completed API omits owner_username, inject it from
+                                    # the explicit field in PLATFORM_ACCOUNTS (not parsed from name).
+                                    if "owner_username" not in trade:
+                                        trade["owner_username"] = account.get("owner_username", account["name"])
+
+                                    recently_completed.append(trade)
+                                    logger.info(f"Found recently completed trade: {trade.get('trade_hash')} at {completed_at_str}")
+                            except (ValueError, TypeError) as e:
+                                logger.debug(f"Error parsing completion time: {e}")
+
+                logger.debug(f"Added {len(recently_completed)} recently completed trades from last 5 minutes")
+        else:
+            logger.warning(f"Failed to fetch completed trades from {completed_url}: {completed_response.status_code}")
+            logger.debug(f"Response text: {completed_response.text}")
+    except Exception as e:
+        logger.error(f"Error fetching completed trades: {e}")
+    return recently_completed
+
+
+def get_trade_list(account, headers, limit=10, page=1, max_retries=3, include_completed=False):
+    """
+    Fetches a single /trade/list page.
+
+    Args:
+        account: Account configuration dict
+        headers: Request headers with the bearer token
+        limit: Page size
+        page: Page number (1-based)
+        max_retries: Attempts under TRADE_LIST_POLICY
+        include_completed: Also return trades completed in the last 5 minutes
+
+    Returns:
+        List of trades (empty on failure)
+    """
+    trades = _page_trades(_fetch_trade_page(account, headers, page, limit, max_retries))
+    if not trades:
+        logger.debug(f"No trades found for {account['name']}.")
+        return []
+    if include_completed:
+        trades.extend(_fetch_recently_completed(account, headers))
+    return trades
+
+
+def fetch_all_trades(account, headers, page_size=TRADE_PAGE_SIZE, include_completed=False, max_retries=3):
+    """
+    Fetches every open trade of an account, paging past the first page.
+
+    The first page reports the total; the remaining pages are then fetched
+    concurrently. If the API gives no total, pages are fetched one after
+    another while they come back full. The merged list is published as the
+    account's trade snapshot and compared with the previous cycle.
+
+    If any page is missing or unsuccessful the cycle is incomplete: its
+    trades are still returned, but nothing is published and no trade is
+    reported as removed.
+
+    Args:
+        account: Account configuration dict
+        headers: Request headers with the bearer token
+        page_size: Trades per page
+        include_completed: Also return trades completed in the last 5 minutes
+        max_retries: Attempts per page under TRADE_LIST_POLICY
+
+    Returns:
+        TradeListDelta (falsy when there are no trades)
+    """
+    first_page = _fetch_trade_page(account, headers, 1, page_size, max_retries)
+    if not _page_ok(first_page):
+        if first_page is not None:
+            logger.error(f"API returned error fetching trade list for {account['name']}: {first_page}")
+        return TradeListDelta([], [], [], [], complete=False)
+
+    pages = [_page_trades(first_page)]
+    complete = True
+    total = _total_count(first_page)
+    if total is not None and total > page_size:
+        page_count = min(math.ceil(total / page_size), MAX_TRADE_PAGES)
+        futures = [
+            _page_executor.submit(_fetch_trade_page, account, headers, page, page_size, max_retries)
+            for page in range(2, page_count + 1)
+        ]
+        for future in futures:
+            page_data = future.result()
+            complete = complete and _page_ok(page_data)
+            pages.append(_page_trades(page_data))
+    elif total is None:
+        page = 1
+        while len(pages[-1]) >= page_size and page < MAX_TRADE_PAGES:
+            page += 1
+            page_data = _fetch_trade_page(account, headers, page, page_size, max_retries)
+            complete = complete and _page_ok(page_data)
+            pages.append(_page_trades(page_data))
+
+    # Trades can shift between pages while paging; keep the first copy
+    trades = []
+    seen = set()
+    for page_trades in pages:
+        for trade in page_trades:
+            trade_hash = trade.get("trade_hash")
+            if trade_hash in seen:
                 continue
-            else:
-                logger.error("Max retries reached. Giving up.")
-                return []
-    
-    return []
\ No newline at end of file
+            seen.add(trade_hash)
+            trades.append(trade)
+
+    if total is not None and total > page_size * MAX_TRADE_PAGES:
+        logger.warning(f"{account['name']} has {total} open trades; only the first {len(trades)} are fetched this cycle")
+    if len(pages) > 1:
+        logger.info(f"Fetched {len(trades)} open trades for {account['name']} across {len(pages)} pages")
+
+    if complete:
+        merged = dict(first_page)
+        merged["data"] = dict(first_page.get("data") or {}, trades=trades)
+        # Written only when the list changed since the last poll
+        get_trade_snapshot_publisher().publish(account["name"], merged)
+    else:
+        logger.warning(f"Trade list for {account['name']} is incomplete this cycle; keeping the previous snapshot")
+
+    delta = _diff_against_previous_cycle(account["name"], trades, complete)
+    if trades and include_completed:
+        delta.trades.extend(_fetch_recently_completed(account, headers))
+    return delta
+
+
+def _diff_against_previous_cycle(account_name, trades, complete):
+    current = {trade.get("trade_hash"): _fingerprint(trade) for trade in trades}
+    with _previous_cycle_lock:
+        previous = _previous_cycle.get(account_name, {})
+        if complete:
+            _previous_cycle[account_name] = current
+        else:
+            # A page failed: don't report its trades as removed, and keep them for next time
+            _previous_cycle[account_name] = {**previous, **current}
+
+    added = [trade for trade in trades if trade.get("trade_hash") not in previous]
+    changed = [
+        trade for trade in trades
+        if trade.get("trade_hash") in previous and previous[trade.get("trade_hash")] != current[trade.get("trade_hash")]
+    ]
+    removed = [trade_hash for trade_hash in previous if trade_hash not in current] if complete else []
+    return TradeListDelta(list(trades), added, changed, removed, complete)
@@ -1,8 +1,8 @@
 import logging
 from core.api.auth import fetch_token_with_retry
-from config import PLATFORM_ACCOUNTS
 from core.utils.http_client import get_http_client
 from core.utils.response_cache import get_response_cache
+from core.api.fanout import for_each_account
 
 
 logger = logging.getLogger(__name__)
@@ -14,54 +14,66 @@ def _log_api_response(account_name, response):
     except Exception as e:
         logger.error(f"Failed to log API response for {account_name}: {e}")
 
-def get_wallet_balances():
-    """Fetches wallet balances for all configured accounts."""
-    # Check cache first (5 minute TTL)
-    response_cache = get_response_cache()
-    cached_balances = response_cache.get("wallet_balances")
-    if cached_balances is not None:
-        logger.debug("Returning cached wallet balances")
-        return cached_balances
-    
-    all_balances = {}
-    http_client = get_http_client()
-    for account in PLATFORM_ACCOUNTS:
-        token = fetch_token_with_retry(account)
-        if not token:
-            logger.error(f"Could not authenticate for {account['name']} to fetch wallet balances.")
-            all_balances[account['name']] = {"error": "Authentication failed."}
-            continue
-
-        headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
-        
-        try:
-            url = "https://api.noones.com/noones/v1/user/wallet-balances"
-            headers["Content-Type"] = "application/x-www-form-urlencoded"
-            response = http_client.post(url, headers=headers, timeout=15)
-
-            if response:
-                _log_api_response(account['name'], response)
-
-            if response.status_code == 200:
-                data = response.json().get("data", {})
-                balances = {
-                    currency['code']: currency['balance']
-                    for currency in data.get('cryptoCurrencies', [])
-                }
-                if 'preferredFiatCurrency' in data and data['preferredFiatCurrency'].get('code'):
-                    balances[data['preferredFiatCurrency']['code']] = data['preferredFiatCurrency']['balance']
-
-                all_balances[account['name']] = balances
-            else:
-                error_message = f"API error (Status: {response.status_code}): {response.text}"
-                logger.error(f"Failed to fetch balance for {account['name']}: {error_message}")
-                all_balances[account['name']] = {"error": f"API Error {response.status_code}"}
-
-        except Exception as e:
-            logger.error(f"An exception occurred fetching balance for {account['name']}: {e}")
-            all_balances[account['name']] = {"error": "Request failed"}
-    
-    # Cache the results for 5 minutes
-    response_cache.set("wallet_balances", all_balances, ttl_seconds=300)
+def _fetch_account_balances(account):
+    """Fetches one account's wallet balances: {currency: balance} or {"error": ...}."""
+    token = fetch_token_with_retry(account)
+    if not token:
+        logger.error(f"Could not authenticate for {account['name']} to fetch wallet balances.")
+        return {"error": "Authentication failed."}
+
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
     
-    return all_balances
\ No newline at end of file
+    try:
+        url = "https://api.noones.com/noones/v1/user/wallet-balances"
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        response = get_http_client().post(url, headers=headers, timeout=15)
+
+        if response:
+            _log_api_response(account['name'], response)
+
+        if response.status_code == 200:
+            data = response.json().get("data", {})
+            balances = {
+                currency['code']: currency['balance']
+                for currency in data.get('cryptoCurrencies', [])
+            }
+            if 'preferredFiatCurrency' in data and data['preferredFiatCurrency'].get('code'):
+                balances[data['preferredFiatCurrency']['code']] = data['preferredFiatCurrency']['balance']
+
+            return balances
+        error_message = f"API error (Status: {response.status_code}): {response.text}"
+        logger.error(f"Failed to fetch balance for {account['name']}: {error_message}")
+        return {"error": f"API Error {response.status_code}"}
+
+    except Exception as e:
+        logger.error(f"An exception occurred fetching balance for {account['name']}: {e}")
+        return {"error": "Request failed"}
+
+
+# Balances stay fresh for 5 minutes and may be served up to 5 more while a
+# background refresh runs
+WALLET_BALANCES_TTL = 300
+WALLET_BALANCES_STALE_TTL = 300
+
+
+def _all_accounts_fetched(balances):
+    return not any(isinstance(account_balances, dict) and "error" in account_balances
+                   for account_balances in balances.values())
+
+
+def get_wallet_balances():
+    """
+    Fetches wallet balances for all configured accounts, concurrently.
+
+    Served from the response cache; callers missing the cache at the same
+    moment share one fetch. A result where any account failed is returned
+    as is but not cached, so the next call tries again.
+    """
+    return get_response_cache().get_or_fetch(
+        "wallet_balances",
+        lambda: for_each_account(_fetch_account_balances, on_error=lambda account, e: {"error": "Request failed"}),
+        ttl_seconds=WALLET_BALANCES_TTL,
+        stale_ttl=WALLET_BALANCES_STALE_TTL,
+        shared=True,
+        cache_if=_all_accounts_fetched
+    )
@@ -5,12 +5,13 @@ Generates headers and provides a standardized HTTP request handler.
 import hmac
 import hashlib
 import time
-import requests
 import logging
 from requests.exceptions import RequestException, ConnectionError
 from http.client import RemoteDisconnected
 from urllib3.exceptions import ProtocolError
 import binance_config
+from core.utils.http_client import instrumented_request
+from core.utils.retry_policy import BINANCE_POLICY
 
 logger = logging.getLogger(__name__)
 
@@ -56,7 +57,7 @@ def generate_auth_headers(api_key, api_secret, query_params=None):
 
 def make_binance_request(user, api_key, api_secret, endpoint, params, max_retries=5, backoff_factor=1.5):
     """
-    Make an authenticated GET request to Binance API with retry and backoff logic.
+    Make an authenticated GET request to Binance API, retried under BINANCE_POLICY.
     
     Args:
         user: Username identifier
@@ -64,38 +65,33 @@ def make_binance_request(user, api_key, api_secret, endpoint, params, max_retrie
         api_secret: Binance API secret
         endpoint: API endpoint (e.g. '/sapi/v1/capital/deposit/hisrec')
         params: Dictionary of query parameters
-        max_retries: Maximum retry attempts
-        backoff_factor: Exponential backoff multiplier
+        max_retries: Maximum attempts
+        backoff_factor: Unused; backoff follows BINANCE_POLICY
         
     Returns:
         Parsed JSON response (list or dict), or None on fatal failure
     """
     url = binance_config.BASE_URL + endpoint
-    retries = 0
-    while retries < max_retries:
-        try:
-            auth_data = generate_auth_headers(api_key, api_secret, params)
-            response = requests.get(
-                f"{url}?{auth_data['query_string']}", 
-                headers=auth_data['headers'], 
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Binance API error for {user} ({endpoint}): HTTP {response.status_code} - {response.text}")
-                raise RequestException(f"Non-200 response: {response.status_code}")
-        
-        except (ConnectionError, RemoteDisconnected, ProtocolError) as conn_err:
-            logger.warning(f"Binance connection error for {user} ({endpoint}): {conn_err}. Retrying...")
-        except RequestException as req_err:
-            logger.warning(f"Binance request error for {user} ({endpoint}): {req_err}. Retrying...")
-        
-        retries += 1
-        sleep_time = backoff_factor ** retries
-        logger.info(f"Retry {retries}/{max_retries} for {user} - sleeping {sleep_time:.1f} seconds...")
-        time.sleep(sleep_time)
-        
-    logger.error(f"Failed to fetch data from Binance endpoint {endpoint} after {max_retries} retries for user {user}.")
+
+    def send(timeout):
+        # Signed per attempt: the signature covers a timestamp
+        auth_data = generate_auth_headers(api_key, api_secret, params)
+        return instrumented_request("GET",
+            f"{url}?{auth_data['query_string']}", 
+            headers=auth_data['headers'], 
+            timeout=timeout
+        )
+
+    try:
+        response = BINANCE_POLICY.call(send, max_attempts=max_retries)
+    except (ConnectionError, RemoteDisconnected, ProtocolError) as conn_err:
+        logger.error(f"Binance connection error for {user} ({endpoint}): {conn_err}")
+        return None
+    except RequestException as req_err:
+        logger.error(f"Binance request error for {user} ({endpoint}): {req_err}")
+        return None
+
+    if response.status_code == 200:
+        return response.json()
+    logger.error(f"Failed to fetch data from Binance endpoint {endpoint} for user {user}: HTTP {response.status_code} - {response.text}")
     return None
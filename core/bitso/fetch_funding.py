@@ -1,5 +1,3 @@
-import time
-import requests
 from requests.exceptions import RequestException, ConnectionError
 from http.client import RemoteDisconnected
 from urllib3.exceptions import ProtocolError
@@ -10,6 +8,8 @@ from dateutil import parser
 
 from core.bitso.auth import generate_auth_headers_for_user
 import bitso_config
+from core.utils.http_client import instrumented_request
+from core.utils.retry_policy import BITSO_POLICY
 
 def save_raw_response(data, filename='bitso_raw_fundings.json'):
     # with open(filename, 'w') as f:
@@ -33,33 +33,27 @@ def fetch_funding_transactions_for_user(user, api_key, api_secret, max_retries=5
         else:
             print(f"Fetching page {page_number} for {user}")
 
-        retries = 0
-        while retries < max_retries:
-            try:
-                headers = generate_auth_headers_for_user(
-                    endpoint, method='GET', query_params=params,
-                    api_key=api_key, api_secret=api_secret
-                )
-                response = requests.get(url, headers=headers, params=params, timeout=10)
-
-                if response.status_code == 200:
-                    break  # Success
-                else:
-                    print(f"Non-200 status code: {response.status_code} - {response.text}")
-                    raise RequestException(f"Non-200 response: {response.status_code}")
-
-            except (ConnectionError, RemoteDisconnected, ProtocolError) as conn_err:
-                print(f"Connection error: {conn_err}. Retrying...")
-
-            except RequestException as req_err:
-                print(f"Request error: {req_err}. Retrying...")
-
-            retries += 1
-            sleep_time = backoff_factor ** retries
-            print(f"Retry {retries}/{max_retries} - sleeping {sleep_time:.1f} seconds...")
-            time.sleep(sleep_time)
-        else:
-            print(f"⚠️ WARNING: Failed to fetch data after {max_retries} retries for user {user}. Skipping this account.")
+        def send(timeout):
+            # Signed per attempt: the signature covers a nonce
+            headers = generate_auth_headers_for_user(
+                endpoint, method='GET', query_params=params,
+                api_key=api_key, api_secret=api_secret
+            )
+            return instrumented_request("GET", url, headers=headers, params=params, timeout=timeout)
+
+        try:
+            response = BITSO_POLICY.call(send, max_attempts=max_retries)
+            if response.status_code != 200:
+                print(f"Non-200 status code: {response.status_code} - {response.text}")
+        except (ConnectionError, RemoteDisconnected, ProtocolError) as conn_err:
+            print(f"Connection error: {conn_err}")
+            response = None
+        except RequestException as req_err:
+            print(f"Request error: {req_err}")
+            response = None
+
+        if response is None or response.status_code != 200:
+            print(f"⚠️ WARNING: Failed to fetch data after {max_retries} attempts for user {user}. Skipping this account.")
             print(f"   This account may be blocked or experiencing issues. Continuing with remaining accounts...")
             return []  # Return empty list to skip this account
 
@@ -39,6 +39,7 @@ from config_messages.chat_messages import (
     SPAM_WARNING_MESSAGE,
 )
 from core.utils.profile import generate_user_profile
+from core.utils.http_client import instrumented_request
 
 logger = logging.getLogger(__name__)
 
@@ -102,9 +103,9 @@ def _send_discord_request(webhook_url, payload=None, files=None, max_retries=5):
         try:
             with _discord_api_lock:
                 if files:
-                    response = requests.post(webhook_url, data={"payload_json": json.dumps(payload)}, files=files, timeout=15)
+                    response = instrumented_request("POST", webhook_url, data={"payload_json": json.dumps(payload)}, files=files, timeout=15)
                 else:
-                    response = requests.post(webhook_url, json=payload, timeout=15)
+                    response = instrumented_request("POST", webhook_url, json=payload, timeout=15)
 
             if response.status_code in [200, 204]:
                 return True, "Success", None
@@ -162,7 +163,7 @@ def _send_discord_bot_request(url, headers, payload, max_retries=5):
     for attempt in range(max_retries):
         try:
             with _discord_api_lock:
-                response = requests.post(url, headers=headers, json=payload, timeout=15)
+                response = instrumented_request("POST", url, headers=headers, json=payload, timeout=15)
 
             if response.status_code == 200:
                 return True, response
@@ -561,12 +562,13 @@ def create_name_validation_embed(trade_hash, success, account_name):
     }
     send_discord_embed(embed, alert_type="attachments", trade_hash=trade_hash)
 
-def create_duplicate_receipt_embed(trade_hash, owner_username, image_path, platform, previous_trade_info):
-    """Builds and sends a duplicate receipt embed."""
+def create_duplicate_receipt_embed(trade_hash, owner_username, image_path, platform, previous_trade_info, similarity=None):
+    """Builds and sends a duplicate receipt embed (exact copy, or near-duplicate when similarity is given)."""
     template = DUPLICATE_RECEIPT_EMBEDS["warning"]
     
     previous_trade_hash = previous_trade_info.get("trade_hash", "N/A")
     previous_owner = previous_trade_info.get("owner_username", "N/A")
+    match_description = "Exact copy" if similarity is None else f"Near-duplicate ({similarity:.1%} similar)"
 
     embed_data = {
         "title": template["title"],
@@ -575,14 +577,16 @@ def create_duplicate_receipt_embed(trade_hash, owner_username, image_path, platf
             trade_hash=trade_hash,
             owner_username=owner_username,
             previous_trade_hash=previous_trade_hash,
-            previous_owner=previous_owner
+            previous_owner=previous_owner,
+            match_description=match_description
         ),
         "fields": [
             {"name": field["name"], "value": field["value"].format(
                 trade_hash=trade_hash,
                 owner_username=owner_username,
                 previous_trade_hash=previous_trade_hash,
-                previous_owner=previous_owner
+                previous_owner=previous_owner,
+                match_description=match_description
             ), "inline": field.get("inline", False)}
             for field in template.get("fields", [])
         ],
@@ -7,6 +7,7 @@ import threading
 import tempfile
 import logging
 from config import DISCORD_BOT_TOKEN, DISCORD_CHAT_LOG_CHANNEL_ID, DISCORD_THREADS_FILE
+from core.utils.http_client import instrumented_request
 
 logger = logging.getLogger(__name__)
 
@@ -160,7 +161,7 @@ def _make_request_with_retry(url, headers, payload, max_retries=5):
     for attempt in range(max_retries):
         try:
             with _discord_api_lock:
-                response = requests.post(url, headers=headers, json=payload, timeout=10)
+                response = instrumented_request("POST", url, headers=headers, json=payload, timeout=10)
 
                 # Success
                 if response.status_code in [200, 201]:
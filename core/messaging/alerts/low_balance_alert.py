@@ -9,7 +9,8 @@ from config_messages.discord_messages import LOW_BALANCE_ALERT_EMBED
 from core.api.trade_list import get_trade_list
 from core.api.auth import fetch_token_with_retry
 from config import PLATFORM_ACCOUNTS, DISCORD_BOT_TOKEN, DISCORD_ACTIVE_TRADES_CHANNEL_ID, STATE_DIR
-from core.utils.web_utils import get_app_settings
+from core.utils.config_cache import get_cached_app_settings
+from core.utils.http_client import instrumented_request
 
 logger = logging.getLogger(__name__)
 
@@ -131,7 +132,7 @@ def send_wallet_fund_meter(balances: dict) -> None:
     if message_id:
         edit_url = f"https://discord.com/api/v10/channels/{channel_id}/messages/{message_id}"
         try:
-            resp = requests.patch(edit_url, headers=headers, json=payload, timeout=15)
+            resp = instrumented_request("PATCH", edit_url, headers=headers, json=payload, timeout=15)
             if resp.status_code == 200:
                 logger.debug("[FundMeter] Embed updated in active trades channel.")
                 return
@@ -146,7 +147,7 @@ def send_wallet_fund_meter(balances: dict) -> None:
     # Post a fresh message and save its ID
     post_url = f"https://discord.com/api/v10/channels/{channel_id}/messages"
     try:
-        resp = requests.post(post_url, headers=headers, json=payload, timeout=15)
+        resp = instrumented_request("POST", post_url, headers=headers, json=payload, timeout=15)
         if resp.status_code == 200:
             new_id = resp.json()["id"]
             _save_meter_message_id(new_id)
@@ -215,7 +216,7 @@ def check_wallet_balances_and_alert():
     send_wallet_fund_meter(balances)
 
     # Wallet alert logic respects the toggle
-    app_settings = get_app_settings()
+    app_settings = get_cached_app_settings()
     if not app_settings.get("wallet_alerts_enabled", True):
         logger.info("Wallet alerts are disabled. Skipping low-balance alert check.")
         return
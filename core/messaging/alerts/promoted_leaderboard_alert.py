@@ -2,7 +2,7 @@ import os
 import json
 import logging
 from config import STATE_DIR, BOT_OWNER_USERNAMES, TELEGRAM_TOPICS
-from core.api.offers import search_public_offers
+from core.api.market_snapshot import get_market_snapshots, market_for
 from core.messaging.alerts.telegram_alert import _send_text_alert, escape_markdown
 from core.messaging.alerts.discord_alert import send_discord_text
 
@@ -10,6 +10,9 @@ logger = logging.getLogger(__name__)
 
 STATE_FILE = os.path.join(STATE_DIR, "promoted_state.json")
 
+# Oldest market snapshot (seconds) the watchdog accepts; matches its 3 minute schedule
+LEADERBOARD_MARKET_MAX_AGE = 180
+
 def load_previous_state():
     """Loads the previous leaderboard state from the JSON file."""
     if os.path.exists(STATE_FILE):
@@ -61,21 +64,17 @@ def check_promoted_leaderboard_and_alert():
         # Fallback if no offers found
         combinations = {("BTC", "MXN", "bank-transfer"), ("USDT", "MXN", "bank-transfer")}
     
+    # Public sell offers ( visitor buying crypto with fiat via PM ), all markets at once
+    snapshots = get_market_snapshots().get_many(
+        [market_for(*combination) for combination in combinations], max_age=LEADERBOARD_MARKET_MAX_AGE
+    )
     for crypto, fiat_code, payment_method_slug in combinations:
         try:
-            # Fetch public sell offers ( visitor buying crypto with fiat via PM )
-            offers = search_public_offers(
-                crypto_code=crypto,
-                fiat_code=fiat_code,
-                payment_method_slug=payment_method_slug,
-                trade_direction="buy",
-                payment_method_country_iso="MX" if fiat_code.upper() == "MXN" else None,
-                country_code="MX" if fiat_code.upper() == "MXN" else None
-            )
-            
-            if offers is None:
+            snapshot = snapshots[market_for(crypto, fiat_code, payment_method_slug)]
+            if snapshot is None:
                 logger.warning(f"[LeaderboardWatchdog] Failed to fetch offers for {crypto}-{payment_method_slug}.")
                 continue
+            offers = snapshot.offers
                 
             # Filter for promoted/stickied offers
             promoted_offers = [o for o in offers if o.get("is_sticky") == True]
@@ -35,6 +35,7 @@ from .telegram_thread_manager import (
     save_message_id, get_message_id, 
     save_chat_message_id, get_chat_message_id
 )
+from core.utils.http_client import instrumented_request
 
 logger = logging.getLogger(__name__)
 
@@ -119,7 +120,7 @@ def _send_text_alert(message, disable_web_page_preview=True, thread_id=None, rep
     for attempt in range(max_retries):
         try:
             with _telegram_api_lock:
-                response = requests.post(url, json=payload, timeout=10)
+                response = instrumented_request("POST", url, json=payload, timeout=10)
                 if response.status_code == 200:
                     logger.info("Telegram text alert sent successfully.")
                     return response.json().get("result", {}).get("message_id")
@@ -186,7 +187,7 @@ def _send_photo_alert(caption_text, image_path, thread_id=None, reply_to_message
             with _telegram_api_lock:
                 with open(image_path, 'rb') as photo_file:
                     files = {'photo': photo_file}
-                    response = requests.post(url, data=data, files=files, timeout=20)
+                    response = instrumented_request("POST", url, data=data, files=files, timeout=20)
                 
                 if response.status_code == 200:
                     logger.info("Attachment alert with image sent successfully.")
@@ -455,16 +456,18 @@ def send_low_balance_alert(account_name, total_balance_usd, threshold, balance_d
     
     _send_text_alert(message, thread_id=TELEGRAM_TOPICS.get("low_balance"))
 
-def send_duplicate_receipt_alert(trade_hash, owner_username, image_path, previous_trade_info):
-    """Sends a Telegram alert for a duplicate receipt."""
+def send_duplicate_receipt_alert(trade_hash, owner_username, image_path, previous_trade_info, similarity=None):
+    """Sends a Telegram alert for a duplicate receipt (exact copy, or near-duplicate when similarity is given)."""
     previous_trade_hash = previous_trade_info.get('trade_hash', 'N/A')
     previous_owner = previous_trade_info.get('owner_username', 'N/A')
+    match_description = "Exact copy" if similarity is None else f"Near-duplicate ({similarity:.1%} similar)"
 
     caption_text = DUPLICATE_RECEIPT_ALERT_MESSAGE.format(
         trade_hash=escape_markdown(trade_hash),
         owner_username=escape_markdown(owner_username),
         previous_trade_hash=escape_markdown(previous_trade_hash),
-        previous_owner=escape_markdown(previous_owner)
+        previous_owner=escape_markdown(previous_owner),
+        match_description=escape_markdown(match_description)
     )
     
     reply_to = get_message_id(trade_hash)
@@ -576,7 +579,7 @@ def send_scheduled_task_alert(message):
         payload["message_thread_id"] = thread_id
 
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        response = instrumented_request("POST", url, json=payload, timeout=10)
         if response.status_code == 200:
             logger.info("Scheduled task alert sent successfully.")
         else:
@@ -1,6 +1,7 @@
 import logging
-import time
 from core.utils.http_client import get_http_client
+from core.utils.circuit_breaker import CircuitOpenError
+from core.utils.retry_policy import CHAT_SEND_POLICY
 
 logger = logging.getLogger(__name__)
 
@@ -10,24 +11,22 @@ def send_message_with_retry(url, data, headers, max_retries=3):
     Uses the shared pooled HTTP client instead of raw requests.post()
     to benefit from connection pooling and avoid spawning a new TCP
     connection for every message.
+
+    A chat send is not idempotent: it is only retried when the request
+    never reached the server (see CHAT_SEND_POLICY), so a timeout or 5xx
+    after sending can't post the message twice.
     """
     http_client = get_http_client()
-    for attempt in range(max_retries):
-        try:
-            logger.debug(f"[MessageSender] Attempt {attempt + 1} to send message.")
-            response = http_client.post(url, data=data, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                return True
-            else:
-                logger.error(f"[MessageSender] Failed: {response.status_code} - {response.text}")
-        except Exception as e:
-            logger.error(f"[MessageSender] Exception: {e}")
-
-        if attempt < max_retries - 1:
-            wait_time = 2 ** attempt
-            logger.debug(f"[MessageSender] Retrying in {wait_time} seconds...")
-            time.sleep(wait_time)
-
-    logger.error("[MessageSender] Max retries reached. Giving up.")
-    return False
\ No newline at end of file
+    try:
+        response = CHAT_SEND_POLICY.call(
+            lambda timeout: http_client.post(url, data=data, headers=headers, timeout=timeout),
+            max_attempts=max_retries
+        )
+        if response.status_code == 200:
+            return True
+        logger.error(f"[MessageSender] Failed: {response.status_code} - {response.text}")
+    except CircuitOpenError as e:
+        logger.error(f"[MessageSender] Not sent: {e}")
+    except Exception as e:
+        logger.error(f"[MessageSender] Exception: {e}")
+    return False
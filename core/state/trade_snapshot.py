@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from config import TRADES_ACTIVE_DIR
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = "_trades.json"
+# Sidecar holding {"version": n, "digest": sha256}; written after the snapshot
+VERSION_SUFFIX = "_trades.version"
+
+
+def snapshot_stem(account_name):
+    return account_name.replace(' ', '_')
+
+
+def _replace_with_retry(temp_path, path):
+    """os.replace that tolerates a reader holding the file open on Windows."""
+    last_err = None
+    for attempt in range(5):
+        try:
+            os.replace(temp_path, path)
+            return
+        except PermissionError as e:
+            last_err = e
+            time.sleep(0.1 * (2 ** attempt))
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+        os.replace(temp_path, path)
+    except Exception as e:
+        raise last_err or e
+
+
+def _write_atomic(path, content):
+    # uuid suffix: two threads may publish for the same account at once
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        _replace_with_retry(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+def _read_version(stem, directory):
+    try:
+        with open(os.path.join(directory, f"{stem}{VERSION_SUFFIX}"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+class TradeSnapshotPublisher:
+    """
+    Publishes each account's raw trade list to TRADES_ACTIVE_DIR for the
+    dashboard. A snapshot is only written when its content hash changes, in
+    compact JSON, and every write bumps the account's version counter in the
+    sidecar file so readers can skip unchanged snapshots without parsing them.
+    """
+
+    def __init__(self, directory=TRADES_ACTIVE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._published = {}  # {stem: {"version": n, "digest": sha256}}
+        self._written = 0
+        self._skipped = 0
+
+    def publish(self, account_name, trades_data):
+        """
+        Publish an account's trade list response if it changed.
+
+        Args:
+            account_name: Account name
+            trades_data: Raw /trade/list response
+
+        Returns:
+            True if a new snapshot version was written
+        """
+        stem = snapshot_stem(account_name)
+        content = json.dumps(trades_data, separators=(",", ":"), sort_keys=True)
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+        with self._lock:
+            current = self._published.get(stem)
+            if current is None:
+                # First publish since start-up: continue from what is on disk
+                current = _read_version(stem, self.directory) or {"version": 0, "digest": None}
+                self._published[stem] = current
+            if current["digest"] == digest:
+                self._skipped += 1
+                return False
+
+            version = {"version": current["version"] + 1, "digest": digest}
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                _write_atomic(os.path.join(self.directory, f"{stem}{SNAPSHOT_SUFFIX}"), content)
+                _write_atomic(os.path.join(self.directory, f"{stem}{VERSION_SUFFIX}"), json.dumps(version))
+            except Exception as e:
+                logger.warning(f"Could not write trades snapshot for {account_name}: {e}")
+                return False
+            self._published[stem] = version
+            self._written += 1
+        logger.debug(f"Published trades snapshot v{version['version']} for {account_name}")
+        return True
+
+    def get_stats(self):
+        with self._lock:
+            return {"written": self._written, "skipped_unchanged": self._skipped}
+
+
+class TradeSnapshotReader:
+    """
+    Reads published trade snapshots, re-parsing a file only when its version
+    changed since the last read.
+    """
+
+    def __init__(self, directory=TRADES_ACTIVE_DIR, prepare=None):
+        """
+        Initialize the reader.
+
+        Args:
+            directory: Directory the snapshots are published to
+            prepare: Optional callable(stem, trades) run once per parsed
+                     version, e.g. to annotate the trades
+        """
+        self.directory = directory
+        self.prepare = prepare
+        self._lock = threading.Lock()
+        self._cache = {}  # {stem: (version, trades)}
+
+    def _parse(self, stem):
+        path = os.path.join(self.directory, f"{stem}{SNAPSHOT_SUFFIX}")
+        for attempt in range(5):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                break
+            except (PermissionError, json.JSONDecodeError):
+                # Being replaced right now; try again shortly
+                if attempt == 4:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+        trades = data.get("data", {}).get("trades", []) or []
+        if self.prepare:
+            self.prepare(stem, trades)
+        return trades
+
+    def read_all(self):
+        """
+        Current trades of every published account.
+
+        Returns:
+            {stem: [trade, ...]} (lists are shared with the cache; don't mutate)
+        """
+        if not os.path.exists(self.directory):
+            return {}
+        result = {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(SNAPSHOT_SUFFIX):
+                continue
+            stem = filename[:-len(SNAPSHOT_SUFFIX)]
+            version_info = _read_version(stem, self.directory)
+            version = version_info["version"] if version_info else None
+            with self._lock:
+                cached = self._cache.get(stem)
+            if cached is not None and version is not None and cached[0] == version:
+                result[stem] = cached[1]
+                continue
+            try:
+                trades = self._parse(stem)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.error(f"Could not read or parse trades file {filename}: {e}")
+                if cached is not None:
+                    result[stem] = cached[1]
+                continue
+            with self._lock:
+                self._cache[stem] = (version, trades)
+            result[stem] = trades
+        return result
+
+
+# Global publisher instance
+_publisher = TradeSnapshotPublisher()
+
+
+def get_trade_snapshot_publisher():
+    """Get the global trade snapshot publisher."""
+    return _publisher
@@ -3,18 +3,53 @@ import json
 import logging
 import time
 from config import BASE_DIR, BOT_OWNER_USERNAMES, TELEGRAM_TOPICS
-from core.api.offers import get_all_offers, search_public_offers, update_offer_margin
+from core.api.offers import get_all_offers, update_offer_margins
+from core.api.market_snapshot import get_market_snapshots, market_for
 from core.messaging.alerts.telegram_alert import _send_text_alert, escape_markdown
 from core.messaging.alerts.discord_alert import send_discord_text
+from core.utils.config_service import get_config_service
+from core.utils.api_metrics import get_api_metrics
 
 logger = logging.getLogger(__name__)
 
 SETTINGS_FILE = os.path.join(BASE_DIR, "data", "config", "dynamic_pricing_settings.json")
+PRICING_SETTINGS_CONFIG = "dynamic_pricing"
 
-# Simple TTL cache for load_settings() — the file rarely changes, so there
-# is no reason to re-read it from disk on every scheduler tick.
-_settings_cache = {"data": None, "expires_at": 0.0}
-_SETTINGS_CACHE_TTL = 60  # seconds
+# Oldest market snapshot (seconds) each consumer accepts
+PRICING_MARKET_MAX_AGE = 60
+REPORT_MARKET_MAX_AGE = 300
+
+DEFAULT_SETTINGS = {
+    "enabled": True,
+    "min_competitor_max_limit": 5000.0,
+    "undercut_percentage": 0.1,
+    "min_competitor_positive_feedback": 10,
+    "min_competitor_feedback_ratio": 0.90,
+    "david_min_margin": 11.0,
+    "joe_min_margin": 11.0,
+    "rules": {
+        "BTC": {
+            "bank-transfer": {
+                "min_margin": 11.0,
+                "max_margin": 24.5
+            },
+            "spei-sistema-de-pagos-electronicos-interbancarios": {
+                "min_margin": 11.0,
+                "max_margin": 24.5
+            }
+        },
+        "USDT": {
+            "bank-transfer": {
+                "min_margin": 11.0,
+                "max_margin": 24.5
+            },
+            "spei-sistema-de-pagos-electronicos-interbancarios": {
+                "min_margin": 11.0,
+                "max_margin": 24.5
+            }
+        }
+    }
+}
 
 
 def _parse_margin(offer, default: float = 999.0) -> float:
@@ -25,59 +60,25 @@ def _parse_margin(offer, default: float = 999.0) -> float:
     except (ValueError, TypeError):
         return default
 
+def _read_settings(path):
+    if not os.path.exists(path):
+        return DEFAULT_SETTINGS
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # Ensure defaults for top-level keys
+    return {**DEFAULT_SETTINGS, **data}
+
+
+get_config_service().register(PRICING_SETTINGS_CONFIG, SETTINGS_FILE, _read_settings, default=DEFAULT_SETTINGS)
+
+
 def load_settings():
-    """Loads dynamic pricing settings from JSON file (cached for 60 s)."""
-    now = time.time()
-    if _settings_cache["data"] is not None and now < _settings_cache["expires_at"]:
-        return _settings_cache["data"]
-
-    default_settings = {
-        "enabled": True,
-        "min_competitor_max_limit": 5000.0,
-        "undercut_percentage": 0.1,
-        "min_competitor_positive_feedback": 10,
-        "min_competitor_feedback_ratio": 0.90,
-        "david_min_margin": 11.0,
-        "joe_min_margin": 11.0,
-        "rules": {
-            "BTC": {
-                "bank-transfer": {
-                    "min_margin": 11.0,
-                    "max_margin": 24.5
-                },
-                "spei-sistema-de-pagos-electronicos-interbancarios": {
-                    "min_margin": 11.0,
-                    "max_margin": 24.5
-                }
-            },
-            "USDT": {
-                "bank-transfer": {
-                    "min_margin": 11.0,
-                    "max_margin": 24.5
-                },
-                "spei-sistema-de-pagos-electronicos-interbancarios": {
-                    "min_margin": 11.0,
-                    "max_margin": 24.5
-                }
-            }
-        }
-    }
-    if os.path.exists(SETTINGS_FILE):
-        try:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                # Ensure defaults for top-level keys
-                for k, v in default_settings.items():
-                    if k not in data:
-                        data[k] = v
-                _settings_cache["data"] = data
-                _settings_cache["expires_at"] = time.time() + _SETTINGS_CACHE_TTL
-                return data
-        except Exception as e:
-            logger.error(f"Error loading dynamic pricing settings: {e}")
-    _settings_cache["data"] = default_settings
-    _settings_cache["expires_at"] = time.time() + _SETTINGS_CACHE_TTL
-    return default_settings
+    """
+    Dynamic pricing settings (read-only snapshot; see config_service.thaw).
+    Loaded once and reloaded when the file changes.
+    """
+    return get_config_service().get(PRICING_SETTINGS_CONFIG)
+
 
 def filter_competitors(public_offers, min_competitor_max_limit, min_competitor_positive_feedback, min_competitor_feedback_ratio):
     """
@@ -132,10 +133,143 @@ def filter_competitors(public_offers, min_competitor_max_limit, min_competitor_p
         competitors.append(o)
     return competitors
 
+def _announce_margin_update(update):
+    """Logs a successful margin update and posts it to Telegram and Discord."""
+    offer_hash = update["offer_hash"]
+    account_name = update["account_name"]
+    target_margin = update["margin"]
+    current_margin = update["current_margin"]
+    crypto = update["crypto"]
+    logger.info(f"[DynamicPricing] Successfully updated offer {offer_hash} to {target_margin}%.")
+    
+    user_clean = account_name.split("_")[0] if account_name else "Unknown"
+    
+    if target_margin > current_margin:
+        direction_icon = "📈"
+    elif target_margin < current_margin:
+        direction_icon = "📉"
+    else:
+        direction_icon = "🔄"
+    
+    # Send Telegram alert
+    alert_msg = (
+        f"{direction_icon} *\\[{crypto}\\] Dynamic Pricing Update\\!* {direction_icon}\n\n"
+        f"Your offer `\\[{offer_hash}\\]` margin has been updated\\:\n"
+        f"• *Old Margin*: `{escape_markdown(str(current_margin))}%`\n"
+        f"• *New Margin*: `{escape_markdown(str(target_margin))}%`\n"
+        f"• *Reason*: {update['reason_msg']}\n\n"
+        f"*Details*:\n"
+        f"• *User*: `{escape_markdown(user_clean)}`\n"
+        f"• *Slug*: `{escape_markdown(update['payment_method'])}`"
+    )
+    topic_id = TELEGRAM_TOPICS.get("pricing_updates") or TELEGRAM_TOPICS.get("action_required")
+    _send_text_alert(alert_msg, thread_id=topic_id)
+    send_discord_text(alert_msg, alert_type="pricing_updates")
+
+def _pricing_bounds(offer, settings, rules):
+    """
+    The pricing rule of an offer and its (min, max) margins after the
+    per-owner safety floors, or None if the offer has no rule.
+    """
+    offer_hash = offer.get("offer_id")
+    crypto = offer.get("crypto_currency_code")
+    payment_method = offer.get("payment_method_slug")
+    account_name = offer.get("account_name")
+
+    # Skip if there is no rule configured for this crypto
+    if crypto not in rules:
+        logger.debug(f"[DynamicPricing] No rules configured for crypto {crypto}, skipping offer {offer_hash}.")
+        return None
+
+    crypto_rules = rules[crypto]
+
+    # Safe check: only adjust if the specific payment method is configured
+    if payment_method not in crypto_rules:
+        logger.debug(f"[DynamicPricing] Payment method '{payment_method}' is not configured for {crypto}. Skipping offer {offer_hash} for safety.")
+        return None
+
+    rule = crypto_rules[payment_method]
+    min_margin = float(rule.get("min_margin", 11.0))
+    max_margin = float(rule.get("max_margin", 24.5))
+
+    # Apply user-specific safety floor override for bank transfer / SPEI / OXXO
+    if payment_method in ["bank-transfer", "spei-sistema-de-pagos-electronicos-interbancarios", "oxxo"]:
+        if account_name and "david" in str(account_name).lower():
+            min_margin = float(settings.get("david_min_margin", 11.0))
+        elif account_name and "joe" in str(account_name).lower():
+            min_margin = float(settings.get("joe_min_margin", 11.0))
+    return rule, min_margin, max_margin
+
+
+def _target_margin(public_offers, settings, rule, min_margin, max_margin):
+    """Returns (target_margin, reason_msg) for an offer competing in public_offers."""
+    min_competitor_max_limit = float(settings.get("min_competitor_max_limit", 5000.0))
+    undercut_percentage = float(settings.get("undercut_percentage", 0.1))
+
+    # Filter out own offers, low limits, inactive, and low-reputation competitors
+    competitors = filter_competitors(
+        public_offers,
+        min_competitor_max_limit,
+        int(settings.get("min_competitor_positive_feedback", 10)),
+        float(settings.get("min_competitor_feedback_ratio", 0.90))
+    )
+
+    # Find the closest competitor margin that we can outbid
+    # Filter competitors to only those at or above our min safety margin
+    valid_competitors = [c for c in competitors if _parse_margin(c) >= min_margin]
+
+    if not competitors:
+        logger.info(f"[DynamicPricing] No competitors found in our weight class (max_limit >= {min_competitor_max_limit}). Resetting to max margin.")
+        target_margin = max_margin
+        reason_msg = f"No competitors found in weight class \\(limit \\>\\= {escape_markdown(str(min_competitor_max_limit))} MXN\\)\\. Reset to Max Margin\\."
+    elif not valid_competitors:
+        logger.info(f"[DynamicPricing] All competitors are below our floor of {min_margin}%. Setting to min margin.")
+        target_margin = min_margin
+        reason_msg = f"All competitors are below Min Safety Margin \\({escape_markdown(str(min_margin))}%\\)\\. Capped at safety floor\\."
+    else:
+        # Find the closest competitor (the lowest among those above min_margin)
+        lowest_comp = min(valid_competitors, key=_parse_margin)
+        comp_username = lowest_comp.get("offer_owner_username")
+
+        comp_margin_val = lowest_comp.get("margin")
+        comp_margin = float(comp_margin_val) if comp_margin_val is not None else 0.0
+
+        comp_max_limit_val = lowest_comp.get("fiat_amount_range_max")
+        comp_max_limit = float(comp_max_limit_val) if comp_max_limit_val is not None else 0.0
+
+        # Get rule-specific undercut_percentage or default to the global settings one
+        rule_undercut = rule.get("undercut_percentage")
+        current_undercut = float(rule_undercut) if rule_undercut is not None else undercut_percentage
+
+        # Target is exactly current_undercut lower
+        target_margin = comp_margin - current_undercut
+        reason_msg = (
+            f"Set {escape_markdown(str(current_undercut))}% below closest competitor "
+            f"`{escape_markdown(comp_username)}` at `{escape_markdown(str(comp_margin))}%` "
+            f"\\(max limit: {escape_markdown(f'{comp_max_limit:,.0f}')} MXN\\)\\."
+        )
+
+    # Enforce safety boundaries
+    if target_margin < min_margin:
+        target_margin = min_margin
+        reason_msg += f" Capped at Min Safety Margin \\({escape_markdown(str(min_margin))}%\\)\\."
+    elif target_margin > max_margin:
+        target_margin = max_margin
+        reason_msg += f" Capped at Max safety Margin \\({escape_markdown(str(max_margin))}%\\)\\."
+
+    return float(round(target_margin, 2)), reason_msg
+
+
 def update_dynamic_pricing_job():
     """
     Background job that scans the competition for all active offers
     and adjusts margins dynamically.
+
+    Runs as a pipeline: work out which market each offer competes in, scan
+    every distinct market once (concurrently, through the market snapshot
+    service and the rate governor), compute all target margins, then push
+    the changes with accounts updated in parallel. The run time of each
+    stage is recorded in the API metrics under the "dynamic_pricing" job.
     """
     settings = load_settings()
     if not settings.get("enabled", True):
@@ -143,166 +277,87 @@ def update_dynamic_pricing_job():
         return
 
     logger.info("[DynamicPricing] Running dynamic pricing update job...")
-    
-    # 1. Fetch own active offers
+    started = time.perf_counter()
+
+    # 1. Fetch own active offers and the market each one competes in
     own_offers = get_all_offers()
     if not own_offers:
         logger.info("[DynamicPricing] No active own offers found to adjust.")
         return
 
-    min_competitor_max_limit = float(settings.get("min_competitor_max_limit", 5000.0))
-    undercut_percentage = float(settings.get("undercut_percentage", 0.1))
-    min_competitor_positive_feedback = int(settings.get("min_competitor_positive_feedback", 10))
-    min_competitor_feedback_ratio = float(settings.get("min_competitor_feedback_ratio", 0.90))
     rules = settings.get("rules", {})
-
+    planned = []
     for offer in own_offers:
         try:
-            offer_hash = offer.get("offer_id")
-            crypto = offer.get("crypto_currency_code")
-            fiat = offer.get("currency_code")
-            payment_method = offer.get("payment_method_slug")
-            
-            current_margin_val = offer.get("margin")
-            current_margin = float(current_margin_val) if current_margin_val is not None else 0.0
-            
-            account_name = offer.get("account_name")
-            
-            # Skip if there is no rule configured for this crypto
-            if crypto not in rules:
-                logger.debug(f"[DynamicPricing] No rules configured for crypto {crypto}, skipping offer {offer_hash}.")
-                continue
-                
-            crypto_rules = rules[crypto]
-            
-            # Safe check: only adjust if the specific payment method is configured
-            if payment_method not in crypto_rules:
-                logger.debug(f"[DynamicPricing] Payment method '{payment_method}' is not configured for {crypto}. Skipping offer {offer_hash} for safety.")
+            bounds = _pricing_bounds(offer, settings, rules)
+            if bounds is None:
                 continue
-                
-            rule = crypto_rules[payment_method]
-            min_margin = float(rule.get("min_margin", 11.0))
-            max_margin = float(rule.get("max_margin", 24.5))
-            
-            # Apply user-specific safety floor override for bank transfer / SPEI / OXXO
-            if payment_method in ["bank-transfer", "spei-sistema-de-pagos-electronicos-interbancarios", "oxxo"]:
-                if account_name and "david" in str(account_name).lower():
-                    min_margin = float(settings.get("david_min_margin", 11.0))
-                elif account_name and "joe" in str(account_name).lower():
-                    min_margin = float(settings.get("joe_min_margin", 11.0))            
-            logger.info(f"[DynamicPricing] Scanning competition for offer {offer_hash} ({crypto}/{fiat}/{payment_method}) on account {account_name}...")
-            
-            # Check country ISO parameters (specifically for MXN)
-            payment_method_country_iso = "MX" if fiat.upper() == "MXN" else None
-            country_code = "MX" if fiat.upper() == "MXN" else None
-            
-            # 2. Fetch public competitor offers (visitor buying -> traders selling)
-            public_offers = search_public_offers(
-                crypto_code=crypto,
-                fiat_code=fiat,
-                payment_method_slug=payment_method,
-                trade_direction="buy",
-                payment_method_country_iso=payment_method_country_iso,
-                country_code=country_code
-            )
-            
-            if public_offers is None:
-                logger.warning(f"[DynamicPricing] Failed to fetch public offers for {crypto}/{fiat}/{payment_method}.")
+            market = market_for(offer.get("crypto_currency_code"), offer.get("currency_code"), offer.get("payment_method_slug"))
+            planned.append((offer, market, bounds))
+        except Exception as e:
+            logger.error(f"[DynamicPricing] Error planning pricing for offer {offer.get('offer_id')}: {e}", exc_info=True)
+
+    # 2. Scan each distinct market once (visitor buying -> traders selling)
+    snapshots = get_market_snapshots().get_many([market for _, market, _ in planned], max_age=PRICING_MARKET_MAX_AGE)
+    scanned = time.perf_counter()
+
+    # 3. Compute every target margin
+    pending_updates = []
+    for offer, market, (rule, min_margin, max_margin) in planned:
+        offer_hash = offer.get("offer_id")
+        try:
+            snapshot = snapshots[market]
+            if snapshot is None:
+                logger.warning(f"[DynamicPricing] Failed to fetch public offers for {market.crypto}/{market.fiat}/{market.payment_method}.")
                 continue
-                
-            # Filter out own offers, low limits, inactive, and low-reputation competitors
-            competitors = filter_competitors(
-                public_offers,
-                min_competitor_max_limit,
-                min_competitor_positive_feedback,
-                min_competitor_feedback_ratio
-            )
-                
-            # 3. Find the closest competitor margin that we can outbid
-            # Filter competitors to only those at or above our min safety margin
-            valid_competitors = [c for c in competitors if _parse_margin(c) >= min_margin]
-
-            if not competitors:
-                logger.info(f"[DynamicPricing] No competitors found in our weight class (max_limit >= {min_competitor_max_limit}). Resetting to max margin.")
-                target_margin = max_margin
-                reason_msg = f"No competitors found in weight class \\(limit \\>\\= {escape_markdown(str(min_competitor_max_limit))} MXN\\)\\. Reset to Max Margin\\."
-            elif not valid_competitors:
-                logger.info(f"[DynamicPricing] All competitors are below our floor of {min_margin}%. Setting to min margin.")
-                target_margin = min_margin
-                reason_msg = f"All competitors are below Min Safety Margin \\({escape_markdown(str(min_margin))}%\\)\\. Capped at safety floor\\."
-            else:
-                # Find the closest competitor (the lowest among those above min_margin)
-                lowest_comp = min(valid_competitors, key=_parse_margin)
-                comp_username = lowest_comp.get("offer_owner_username")
-                
-                comp_margin_val = lowest_comp.get("margin")
-                comp_margin = float(comp_margin_val) if comp_margin_val is not None else 0.0
-                
-                comp_max_limit_val = lowest_comp.get("fiat_amount_range_max")
-                comp_max_limit = float(comp_max_limit_val) if comp_max_limit_val is not None else 0.0
-                
-                # Get rule-specific undercut_percentage or default to the global settings one
-                rule_undercut = rule.get("undercut_percentage")
-                current_undercut = float(rule_undercut) if rule_undercut is not None else undercut_percentage
-
-                # Target is exactly current_undercut lower
-                target_margin = comp_margin - current_undercut
-                reason_msg = (
-                    f"Set {escape_markdown(str(current_undercut))}% below closest competitor "
-                    f"`{escape_markdown(comp_username)}` at `{escape_markdown(str(comp_margin))}%` "
-                    f"\\(max limit: {escape_markdown(f'{comp_max_limit:,.0f}')} MXN\\)\\."
-                )
-                
-            # Enforce safety boundaries
-            if target_margin < min_margin:
-                target_margin = min_margin
-                reason_msg += f" Capped at Min Safety Margin \\({escape_markdown(str(min_margin))}%\\)\\."
-            elif target_margin > max_margin:
-                target_margin = max_margin
-                reason_msg += f" Capped at Max safety Margin \\({escape_markdown(str(max_margin))}%\\)\\."
-                
-            target_margin = float(round(target_margin, 2))
-            
-            # 4. Update offer if there is a meaningful change
+
+            current_margin_val = offer.get("margin")
+            current_margin = float(current_margin_val) if current_margin_val is not None else 0.0
+            target_margin, reason_msg = _target_margin(snapshot.offers, settings, rule, min_margin, max_margin)
+
+            # Queue an update if there is a meaningful change
             if abs(target_margin - current_margin) >= 0.05:
                 logger.warning(f"[DynamicPricing] Updating offer {offer_hash} margin from {current_margin}% to {target_margin}% because: {reason_msg}")
-
-                # Brief cooldown between offer updates to avoid hitting Noones rate limits.
-                time.sleep(5)
-                res = update_offer_margin(account_name, offer_hash, target_margin)
-                if res.get("success"):
-                    logger.info(f"[DynamicPricing] Successfully updated offer {offer_hash} to {target_margin}%.")
-                    
-                    user_clean = account_name.split("_")[0] if account_name else "Unknown"
-                    
-                    if target_margin > current_margin:
-                        direction_icon = "📈"
-                    elif target_margin < current_margin:
-                        direction_icon = "📉"
-                    else:
-                        direction_icon = "🔄"
-                    
-                    # Send Telegram alert
-                    alert_msg = (
-                        f"{direction_icon} *\\[{crypto}\\] Dynamic Pricing Update\\!* {direction_icon}\n\n"
-                        f"Your offer `\\[{offer_hash}\\]` margin has been updated\\:\n"
-                        f"• *Old Margin*: `{escape_markdown(str(current_margin))}%`\n"
-                        f"• *New Margin*: `{escape_markdown(str(target_margin))}%`\n"
-                        f"• *Reason*: {reason_msg}\n\n"
-                        f"*Details*:\n"
-                        f"• *User*: `{escape_markdown(user_clean)}`\n"
-                        f"• *Slug*: `{escape_markdown(payment_method)}`"
-                    )
-                    topic_id = TELEGRAM_TOPICS.get("pricing_updates") or TELEGRAM_TOPICS.get("action_required")
-                    _send_text_alert(alert_msg, thread_id=topic_id)
-                    send_discord_text(alert_msg, alert_type="pricing_updates")
-                else:
-                    logger.error(f"[DynamicPricing] Failed to update margin for {offer_hash}: {res.get('error')}")
+                pending_updates.append({
+                    "account_name": offer.get("account_name"),
+                    "offer_hash": offer_hash,
+                    "margin": target_margin,
+                    "current_margin": current_margin,
+                    "reason_msg": reason_msg,
+                    "crypto": market.crypto,
+                    "payment_method": market.payment_method
+                })
             else:
                 logger.info(f"[DynamicPricing] Offer {offer_hash} current margin {current_margin}% is already optimal (target: {target_margin}%). No change needed.")
-                
+
         except Exception as e:
-            logger.error(f"[DynamicPricing] Error processing pricing for offer: {e}", exc_info=True)
+            logger.error(f"[DynamicPricing] Error processing pricing for offer {offer_hash}: {e}", exc_info=True)
+
+    # 4. Apply all updates at once: accounts in parallel, the rate governor
+    # spaces out each account's calls
+    computed = time.perf_counter()
+    updated = failed = 0
+    if pending_updates:
+        for result in update_offer_margins(pending_updates):
+            if result.get("success"):
+                updated += 1
+                _announce_margin_update(result)
+            else:
+                failed += 1
+                logger.error(f"[DynamicPricing] Failed to update margin for {result['offer_hash']}: {result.get('error')}")
+
+    # 5. Record how long the run took
+    finished = time.perf_counter()
+    logger.info(
+        f"[DynamicPricing] Repriced {len(planned)} offers across {len(snapshots)} markets in {finished - started:.2f}s "
+        f"(scan {scanned - started:.2f}s, apply {finished - computed:.2f}s): {updated} updated, {failed} failed"
+    )
+    get_api_metrics().record_job(
+        "dynamic_pricing", finished - started,
+        offers=len(planned), markets=len(snapshots), updated=updated, failed=failed,
+        scan_seconds=round(scanned - started, 3), apply_seconds=round(finished - computed, 3)
+    )
+
 
 def send_market_status_report():
     """Generates and sends a consolidated market status report to Telegram."""
@@ -348,18 +403,9 @@ def send_market_status_report():
         elif crypto and crypto.upper() == "USDT":
             coin_icon = "🟢"
             
-        payment_method_country_iso = "MX" if fiat.upper() == "MXN" else None
-        country_code = "MX" if fiat.upper() == "MXN" else None
-        
-        # Fetch public list to see rank and competitor margins
-        public_offers = search_public_offers(
-            crypto_code=crypto,
-            fiat_code=fiat,
-            payment_method_slug=payment_method,
-            trade_direction="buy",
-            payment_method_country_iso=payment_method_country_iso,
-            country_code=country_code
-        )
+        # Public list to see rank and competitor margins
+        snapshot = get_market_snapshots().get(market_for(crypto, fiat, payment_method), max_age=REPORT_MARKET_MAX_AGE, allow_stale=True)
+        public_offers = snapshot.offers if snapshot is not None else None
         
         if not public_offers:
             report_lines.append(
@@ -442,18 +488,12 @@ def send_hourly_market_report():
     
     report_lines = []
     
+    snapshots = get_market_snapshots().get_many(
+        [market_for(crypto, fiat, payment_method) for crypto in cryptos], max_age=REPORT_MARKET_MAX_AGE, allow_stale=True
+    )
     for crypto in cryptos:
-        payment_method_country_iso = "MX"
-        country_code = "MX"
-        
-        offers = search_public_offers(
-            crypto_code=crypto,
-            fiat_code=fiat,
-            payment_method_slug=payment_method,
-            trade_direction="buy",
-            payment_method_country_iso=payment_method_country_iso,
-            country_code=country_code
-        )
+        snapshot = snapshots[market_for(crypto, fiat, payment_method)]
+        offers = snapshot.offers if snapshot is not None else None
         
         if not offers:
             report_lines.append(f"• *{crypto} / {fiat} / {payment_method}*:\n  `Error fetching market data`\n")
@@ -4,7 +4,7 @@ import logging
 import atexit
 from concurrent.futures import ThreadPoolExecutor
 from core.api.auth import fetch_token_with_retry
-from core.api.trade_list import get_trade_list
+from core.api.trade_list import fetch_all_trades
 from core.trading.trade import Trade
 from core.utils.adaptive_polling import AdaptivePoller
 from core.messaging.alerts.telegram_alert import send_scheduled_task_alert
@@ -99,10 +99,16 @@ def process_trades(account):
         headers = {"Authorization": f"Bearer {access_token}"}
 
         logger.debug(f"Checking for new trades for {account['name']}...")
-        trades = get_trade_list(account, headers, limit=100, page=1, include_completed=True)
+        trade_list = fetch_all_trades(account, headers, include_completed=True)
+        trades = trade_list.trades
 
         if trades:
             logger.info(f"Found {len(trades)} trades to process for {account['name']}.")
+            if trade_list.added or trade_list.removed:
+                logger.debug(
+                    f"[{account['name']}] Trade list delta: {len(trade_list.added)} new, "
+                    f"{len(trade_list.changed)} changed, {len(trade_list.removed)} gone"
+                )
             poller.record_activity(found_trades=True)
 
             # Local cache for loaded trade states to avoid redundant disk reads
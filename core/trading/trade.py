@@ -13,17 +13,11 @@ from config import (
     AUTO_MESSAGE_LIMIT
 )
 from core.state.trade_state_loader import load_processed_trades, save_processed_trade
-from core.api.trade_chat import download_attachment, get_all_messages_from_chat
+from core.api.trade_chat import download_attachments, get_all_messages_from_chat
 # from core.validation.email import check_for_payment_email, get_gmail_service  # EMAIL MODULE DISABLED
-from core.validation.ocr import (
-    extract_text_from_image,
-    find_amount_in_text,
-    find_name_in_text,
-    identify_bank_from_text,
-    save_ocr_text,
-    hash_image,
-    is_duplicate_receipt
-)
+from core.validation.ocr import save_ocr_text, is_duplicate_receipt
+from core.validation.ocr_service import get_ocr_service
+from core.validation.receipt_similarity import get_receipt_similarity_index
 from core.trading.chat_processor import ChatProcessor
 from core.messaging.welcome_message import send_welcome_message, is_afk_mode_enabled
 from core.messaging.payment_details import send_payment_details_message
@@ -244,6 +238,7 @@ class Trade:
             return
 
         # self.check_for_email_confirmation()  # EMAIL MODULE DISABLED
+        self.merge_ocr_results()
         self.check_chat_and_attachments()
         self.chat_processor.check_for_afk()
         self.chat_processor.check_for_extended_afk()
@@ -539,6 +534,74 @@ class Trade:
     #     """Checks for payment confirmation emails if the trade is marked as Paid and has an attachment."""
     #     (entire method commented out — re-enable when email module is fixed)
 
+    def _submit_receipt_ocr(self, path, image_hash, author, send_amount_alert, send_name_alert, expected_names, credential_identifier):
+        """Queues a receipt for OCR; alerts are sent from the result callback when OCR finishes."""
+        # Snapshot immutable data for safe capture in the callback thread
+        _trade_hash = self.trade_hash
+        _owner_username = self.owner_username
+        _platform = self.platform
+        expected = self.trade_state.get("fiat_amount_requested")
+        currency = self.trade_state.get("fiat_currency_code")
+
+        def _on_ocr_result(result):
+            text = result["text"] if result else ""
+            identified_bank = result["bank"] if result else None
+            found_amount = result["amount"] if result else None
+            is_name_found = result["name"] if result else None
+
+            if result and result.get("cache_hit"):
+                logger.info(f"Receipt {path} for trade {_trade_hash} served from the OCR cache; OCR text already saved.")
+            else:
+                save_ocr_text(_trade_hash, _owner_username, text, identified_bank)
+            if result and result.get("dhash") is not None:
+                near_duplicate = get_receipt_similarity_index().check_and_add(
+                    result["dhash"], image_hash, _trade_hash, _owner_username, result.get("parsed_amount")
+                )
+                if near_duplicate:
+                    similarity = near_duplicate["similarity"]
+                    _notification_executor.submit(
+                        send_duplicate_receipt_alert, _trade_hash, _owner_username, path, near_duplicate, similarity
+                    )
+                    _notification_executor.submit(
+                        create_duplicate_receipt_embed, _trade_hash, _owner_username, path, _platform, near_duplicate, similarity
+                    )
+            _notification_executor.submit(
+                send_attachment_alert, _trade_hash, _owner_username, author, path, identified_bank
+            )
+            _notification_executor.submit(
+                create_attachment_embed, _trade_hash, _owner_username, author, path, _platform, identified_bank
+            )
+            if send_amount_alert:
+                _notification_executor.submit(
+                    send_amount_validation_alert, _trade_hash, _owner_username, expected, found_amount, currency
+                )
+                _notification_executor.submit(
+                    create_amount_validation_embed, _trade_hash, _owner_username, expected, found_amount, currency
+                )
+            if send_name_alert:
+                _notification_executor.submit(
+                    send_name_validation_alert, _trade_hash, is_name_found, credential_identifier
+                )
+                _notification_executor.submit(
+                    create_name_validation_embed, _trade_hash, is_name_found, credential_identifier
+                )
+
+        logger.debug(f"Submitting receipt {path} for trade {self.trade_hash} to the OCR service.")
+        get_ocr_service().submit(
+            self.trade_hash, path, expected, expected_names or None,
+            on_result=_on_ocr_result, image_hash=image_hash
+        )
+
+    def merge_ocr_results(self):
+        """Merges receipts that finished OCR since the last cycle into the trade state."""
+        for result in get_ocr_service().pop_results(self.trade_hash):
+            identified_bank = result.get("bank")
+            if identified_bank:
+                self.trade_state['ocr_identified_bank'] = identified_bank
+                logger.info(f"Receipt for trade {self.trade_hash} identified as {identified_bank}.")
+            if result.get("amount") is not None:
+                self.trade_state['ocr_found_amount'] = result["amount"]
+
     def check_chat_and_attachments(self):
         """Fetches the entire chat history and processes any unprocessed messages or attachments."""
         logger.debug(f"--- Checking Chat & Attachments for {self.trade_hash} ---")
@@ -606,6 +669,8 @@ class Trade:
         new_attachments_to_process = []
         image_api_url = IMAGE_API_URL_NOONES
 
+        pending_downloads = []
+        pending_urls = set()
         for msg in all_messages:
             if msg.get("type") == "trade_attach_uploaded":
                 files = msg.get("text", {}).get("files", [])
@@ -614,17 +679,26 @@ class Trade:
                     image_url_path = file_info.get("url")
                     if image_url_path:
                         # Check if this attachment has been processed and alerts sent
-                        if image_url_path not in processed_attachments:
+                        if image_url_path not in processed_attachments and image_url_path not in pending_urls:
                             logger.info(f"New attachment uploaded by '{author}' for trade {self.trade_hash}. URL: {image_url_path}")
-                            file_path = download_attachment(image_url_path, image_api_url, self.trade_hash, self.headers)
-                            if file_path:
-                                new_attachments_to_process.append({
-                                    "path": file_path, 
-                                    "author": author,
-                                    "url": image_url_path
-                                })
-                                # Mark as downloaded but alerts not yet sent
-                                processed_attachments[image_url_path] = {"downloaded": True, "alerts_sent": False}
+                            pending_downloads.append((image_url_path, author))
+                            pending_urls.add(image_url_path)
+
+        # Download every new attachment of this trade concurrently; the
+        # SHA-256 digest comes back with the path, computed while streaming.
+        download_results = download_attachments(
+            [url for url, _ in pending_downloads], image_api_url, self.trade_hash, self.headers
+        )
+        for (image_url_path, author), (file_path, image_hash) in zip(pending_downloads, download_results):
+            if file_path:
+                new_attachments_to_process.append({
+                    "path": file_path,
+                    "author": author,
+                    "url": image_url_path,
+                    "image_hash": image_hash
+                })
+                # Mark as downloaded but alerts not yet sent
+                processed_attachments[image_url_path] = {"downloaded": True, "alerts_sent": False}
         
         self.trade_state['processed_attachments'] = processed_attachments
 
@@ -656,8 +730,8 @@ class Trade:
             if author not in BOT_OWNER_USERNAMES:
                 logger.debug(f"Processing new attachment by {author} for {self.trade_hash}.")
                 
-                # Check for duplicate receipt
-                image_hash = hash_image(path)
+                # Check for duplicate receipt (digest computed during download)
+                image_hash = attachment['image_hash']
                 is_duplicate, previous_trade_info = is_duplicate_receipt(image_hash, self.trade_hash, self.owner_username)
                 if is_duplicate:
                     _notification_executor.submit(
@@ -667,48 +741,31 @@ class Trade:
                         create_duplicate_receipt_embed, self.trade_hash, self.owner_username, path, self.platform, previous_trade_info
                     )
 
-                text = extract_text_from_image(path)
-                identified_bank = identify_bank_from_text(text)
-                save_ocr_text(self.trade_hash, self.owner_username, text, identified_bank)
-                _notification_executor.submit(
-                    send_attachment_alert, self.trade_hash, self.owner_username, author, path, identified_bank
-                )
-                _notification_executor.submit(
-                    create_attachment_embed, self.trade_hash, self.owner_username, author, path, self.platform, identified_bank
-                )
-
-                if identified_bank:
-                    self.trade_state['ocr_identified_bank'] = identified_bank
-                    logger.info(f"Receipt for trade {self.trade_hash} identified as {identified_bank}.")
-
-                logger.debug(f"Performing amount validation for {self.trade_hash}.")
-                found_amount = find_amount_in_text(text, self.trade_state.get("fiat_amount_requested"))
-                if not self.trade_state.get('amount_validation_alert_sent'):
-                    expected = self.trade_state.get("fiat_amount_requested")
-                    currency = self.trade_state.get("fiat_currency_code")
-                    # Set flag and save BEFORE submitting to executor — a restart
-                    # between here and the end-of-loop save() would otherwise
-                    # lose the flag and fire duplicate validation alerts.
+                # OCR runs in the OCR process pool. Validation flags are set
+                # and saved BEFORE submitting — a restart between here and the
+                # result callback would otherwise fire duplicate alerts.
+                send_amount_alert = not self.trade_state.get('amount_validation_alert_sent')
+                if send_amount_alert:
                     self.trade_state['amount_validation_alert_sent'] = True
-                    self.save()
-                    _notification_executor.submit(
-                        send_amount_validation_alert, self.trade_hash, self.owner_username, expected, found_amount, currency
-                    )
-                    _notification_executor.submit(
-                        create_amount_validation_embed, self.trade_hash, self.owner_username, expected, found_amount, currency
+                send_name_alert = bool(expected_names) and not self.trade_state.get('name_validation_alert_sent')
+                if send_name_alert:
+                    self.trade_state['name_validation_alert_sent'] = True
+                self.save()
+                try:
+                    self._submit_receipt_ocr(
+                        path, image_hash, author, send_amount_alert, send_name_alert, expected_names, credential_identifier
                     )
-
-                if expected_names:
-                    logger.debug(f"Performing name validation for {self.trade_hash}.")
-                    is_name_found = find_name_in_text(text, expected_names)
-                    if not self.trade_state.get('name_validation_alert_sent'):
-                        self.trade_state['name_validation_alert_sent'] = True  # Set flag before submit
-                        _notification_executor.submit(
-                            send_name_validation_alert, self.trade_hash, is_name_found, credential_identifier
-                        )
-                        _notification_executor.submit(
-                            create_name_validation_embed, self.trade_hash, is_name_found, credential_identifier
-                        )
+                except Exception as e:
+                    # Nothing will fire these alerts; undo the flags and forget the
+                    # attachment so the next poll downloads and submits it again.
+                    logger.error(f"Could not queue receipt {path} for OCR on trade {self.trade_hash}: {e}. Will retry.")
+                    if send_amount_alert:
+                        self.trade_state['amount_validation_alert_sent'] = False
+                    if send_name_alert:
+                        self.trade_state['name_validation_alert_sent'] = False
+                    processed_attachments.pop(url, None)
+                    self.save()
+                    continue
 
                 # Mark alerts as sent for this attachment
                 processed_attachments[url]['alerts_sent'] = True
@@ -1,54 +1,349 @@
 import logging
 import json
 import os
+import re
+import sys
+import time
 from datetime import datetime
 from collections import defaultdict
+from urllib.parse import urlparse
 import threading
+import weakref
 
 logger = logging.getLogger(__name__)
 
+# Upper bounds (ms) of the latency histogram buckets; the last one is open-ended
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+# Every process publishes its metrics here; the dashboard merges them
+API_METRICS_DIR = os.path.join("data", "api_metrics")
+_PUBLISH_INTERVAL = 60  # seconds
+
+# Path segments that identify a resource (ids, hashes, webhook/bot tokens) are
+# collapsed so they don't explode the endpoint keys or leak into stats files.
+_BOT_TOKEN_SEGMENT = re.compile(r"^bot\d+:[\w-]+$")
+
+
+def normalize_endpoint(method, url):
+    """'POST https://api.noones.com/noones/v1/trade/list' -> 'POST api.noones.com/noones/v1/trade/list'."""
+    parsed = urlparse(url)
+    segments = []
+    for segment in parsed.path.split("/"):
+        if _BOT_TOKEN_SEGMENT.match(segment):
+            segment = "bot{token}"
+        elif len(segment) >= 24 or sum(c.isdigit() for c in segment) >= 5:
+            segment = "{id}"
+        segments.append(segment)
+    return f"{method.upper()} {parsed.hostname or ''}{'/'.join(segments)}"
+
+
+class _EndpointStats:
+    __slots__ = ("count", "errors", "status_codes", "histogram", "latency_total", "latency_max",
+                 "retries", "backoff_seconds", "bytes_out", "bytes_in")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.status_codes = defaultdict(int)
+        self.histogram = [0] * len(LATENCY_BUCKETS_MS)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+
+def _add_stats(total, stats):
+    """Adds one _EndpointStats into another."""
+    total.count += stats.count
+    total.errors += stats.errors
+    for status_code, count in list(stats.status_codes.items()):
+        total.status_codes[status_code] += count
+    for index, count in enumerate(stats.histogram):
+        total.histogram[index] += count
+    total.latency_total += stats.latency_total
+    total.latency_max = max(total.latency_max, stats.latency_max)
+    total.retries += stats.retries
+    total.backoff_seconds += stats.backoff_seconds
+    total.bytes_out += stats.bytes_out
+    total.bytes_in += stats.bytes_in
+
 
 class APIMetrics:
-    """Track API calls and provide usage statistics."""
-    
+    """
+    Track API calls and provide usage statistics.
+
+    Per-request measurements (latency histogram, status codes, urllib3
+    retries and backoff time, bytes in/out) are recorded into a shard owned
+    by the calling thread, so the hot path takes no lock; get_stats() merges
+    the shards when asked. Shards of finished threads (Flask request
+    threads, timers) are folded into one retired total, so memory follows
+    the number of live threads.
+
+    Other services (caches, breakers, retry policies, ...) add their own
+    sections to get_stats() through register_stats_provider().
+    """
+
     def __init__(self):
-        self._metrics = defaultdict(int)  # {endpoint: count}
-        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []  # [(weakref to the owning thread, {endpoint: _EndpointStats})]
+        self._retired = defaultdict(_EndpointStats)  # merged shards of finished threads
+        self._lock = threading.Lock()  # guards shard registration and retirement
+        self._stats_providers = {}  # {section name: callable returning its stats}
+        self._jobs = {}  # {job name: run time stats}
+        self._jobs_lock = threading.Lock()
         self.start_time = datetime.now()
-    
+        self._publisher = None
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire_dead_shards()
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+            self._start_publisher()
+        return shard
+
+    def _retire_dead_shards(self):
+        """Folds the shards of finished threads into the retired total. Caller holds _lock."""
+        live = []
+        for thread_ref, shard in self._shards:
+            thread = thread_ref()
+            if thread is not None and thread.is_alive():
+                live.append((thread_ref, shard))
+            else:
+                # Its thread is gone, so nothing writes to it any more
+                for endpoint, stats in shard.items():
+                    _add_stats(self._retired[endpoint], stats)
+        self._shards = live
+
+    def register_stats_provider(self, name, provider):
+        """
+        Adds a section to get_stats().
+
+        Args:
+            name: Key of the section
+            provider: Callable returning the section's (JSON-serialisable) stats
+        """
+        with self._lock:
+            self._stats_providers[name] = provider
+
+    def _endpoint(self, endpoint):
+        shard = self._shard()
+        stats = shard.get(endpoint)
+        if stats is None:
+            stats = shard[endpoint] = _EndpointStats()
+        return stats
+
     def record_call(self, endpoint):
         """Record an API call to the specified endpoint."""
+        self._endpoint(endpoint).count += 1
+
+    def record_request(self, endpoint, latency, status_code=None, bytes_out=0, bytes_in=0,
+                       retries=0, backoff_seconds=0.0, error=False):
+        """
+        Record one HTTP request.
+
+        Args:
+            endpoint: Normalized endpoint key (see normalize_endpoint)
+            latency: Wall time of the request in seconds, retries included
+            status_code: Final HTTP status, None if no response was received
+            bytes_out: Request body size
+            bytes_in: Response body size
+            retries: Retries urllib3 made before the final response
+            backoff_seconds: Time urllib3 slept between those retries
+            error: True if the request raised instead of returning a response
+        """
+        stats = self._endpoint(endpoint)
+        stats.count += 1
+        if error:
+            stats.errors += 1
+        if status_code is not None:
+            stats.status_codes[status_code] += 1
+        latency_ms = latency * 1000
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                stats.histogram[index] += 1
+                break
+        stats.latency_total += latency
+        if latency > stats.latency_max:
+            stats.latency_max = latency
+        stats.retries += retries
+        stats.backoff_seconds += backoff_seconds
+        stats.bytes_out += bytes_out
+        stats.bytes_in += bytes_in
+
+    def record_response(self, method, url, started, response=None, error=False, streamed=False):
+        """Record a requests.Response (or a failed request) made at time.perf_counter() == started."""
+        latency = time.perf_counter() - started
+        if response is None:
+            self.record_request(normalize_endpoint(method, url), latency, error=error)
+            return
+
+        body = response.request.body if response.request is not None else None
+        bytes_out = len(body) if isinstance(body, (bytes, str)) else 0
+        if streamed:
+            bytes_in = int(response.headers.get("Content-Length") or 0)
+        else:
+            bytes_in = len(response.content or b"")
+
+        retries, backoff_seconds = 0, 0.0
+        retry_state = getattr(response.raw, "retries", None)
+        history = getattr(retry_state, "history", None) or ()
+        if history:
+            retries = len(history)
+            # Replay the backoff urllib3 computed before each retry
+            backoff_seconds = sum(
+                retry_state.new(history=history[:attempt]).get_backoff_time()
+                for attempt in range(1, retries + 1)
+            )
+        self.record_request(
+            normalize_endpoint(method, url), latency, response.status_code,
+            bytes_out, bytes_in, retries, backoff_seconds, error
+        )
+
+    def record_job(self, name, duration, **details):
+        """
+        Record one run of a background job.
+
+        Args:
+            name: Job name
+            duration: Run time in seconds
+            **details: Facts about the run kept with the last run (counts, stage times)
+        """
+        with self._jobs_lock:
+            job = self._jobs.setdefault(name, {"runs": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            job["runs"] += 1
+            job["total_seconds"] += duration
+            job["max_seconds"] = max(job["max_seconds"], duration)
+            job["last_seconds"] = duration
+            job["last_run"] = datetime.now().isoformat()
+            job["last"] = details
+
+    def get_job_stats(self):
+        """Run counts and times of the recorded jobs."""
+        with self._jobs_lock:
+            return {
+                name: dict(
+                    job,
+                    total_seconds=round(job["total_seconds"], 3),
+                    max_seconds=round(job["max_seconds"], 3),
+                    last_seconds=round(job["last_seconds"], 3),
+                    avg_seconds=round(job["total_seconds"] / job["runs"], 3)
+                )
+                for name, job in self._jobs.items()
+            }
+
+    def _merged_endpoints(self):
+        merged = defaultdict(_EndpointStats)
         with self._lock:
-            self._metrics[endpoint] += 1
-    
+            self._retire_dead_shards()
+            shards = [shard for _, shard in self._shards]
+            for endpoint, stats in self._retired.items():
+                _add_stats(merged[endpoint], stats)
+        for shard in shards:
+            for endpoint, stats in list(shard.items()):
+                _add_stats(merged[endpoint], stats)
+        return merged
+
+    @staticmethod
+    def _percentile_ms(histogram, fraction):
+        """Upper bound of the histogram bucket holding the given fraction of requests."""
+        total = sum(histogram)
+        if not total:
+            return None
+        threshold = total * fraction
+        running = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, histogram):
+            running += count
+            if running >= threshold:
+                return bound if bound != float("inf") else None
+        return None
+
+    def get_endpoint_stats(self):
+        """Per-endpoint latency, status codes, retries, backoff and traffic."""
+        result = {}
+        for endpoint, stats in self._merged_endpoints().items():
+            timed = sum(stats.histogram)
+            result[endpoint] = {
+                "count": stats.count,
+                "errors": stats.errors,
+                "status_codes": {str(code): count for code, count in sorted(stats.status_codes.items())},
+                "avg_ms": round(stats.latency_total / timed * 1000, 1) if timed else None,
+                "p50_ms": self._percentile_ms(stats.histogram, 0.5),
+                "p95_ms": self._percentile_ms(stats.histogram, 0.95),
+                "max_ms": round(stats.latency_max * 1000, 1),
+                "total_seconds": round(stats.latency_total, 2),
+                "histogram": {
+                    ("+inf" if bound == float("inf") else f"<={bound}ms"): count
+                    for bound, count in zip(LATENCY_BUCKETS_MS, stats.histogram)
+                },
+                "retries": stats.retries,
+                "backoff_seconds": round(stats.backoff_seconds, 2),
+                "bytes_out": stats.bytes_out,
+                "bytes_in": stats.bytes_in
+            }
+        return result
+
     def get_stats(self):
-        """Get current API call statistics."""
+        """Get current API call statistics, plus the sections of the registered stats providers."""
+        endpoints = self.get_endpoint_stats()
+        total_calls = sum(stats["count"] for stats in endpoints.values())
+        uptime = (datetime.now() - self.start_time).total_seconds()
+        calls_per_hour = (total_calls / uptime * 3600) if uptime > 0 else 0
+
+        stats = {
+            "total_calls": total_calls,
+            "calls_per_hour": round(calls_per_hour, 2),
+            "uptime_seconds": round(uptime),
+            "by_endpoint": {endpoint: stats["count"] for endpoint, stats in endpoints.items()},
+            "endpoints": endpoints,
+            "jobs": self.get_job_stats()
+        }
         with self._lock:
-            total_calls = sum(self._metrics.values())
-            uptime = (datetime.now() - self.start_time).total_seconds()
-            calls_per_hour = (total_calls / uptime * 3600) if uptime > 0 else 0
-            
-            return {
-                "total_calls": total_calls,
-                "calls_per_hour": round(calls_per_hour, 2),
-                "uptime_seconds": round(uptime),
-                "by_endpoint":  dict(self._metrics),
-                "timestamp": datetime.now().isoformat()
-            }
-    
+            providers = list(self._stats_providers.items())
+        for name, provider in providers:
+            try:
+                stats[name] = provider()
+            except Exception as e:
+                logger.error(f"Stats provider '{name}' failed: {e}")
+        stats["timestamp"] = datetime.now().isoformat()
+        return stats
+
     def save_to_file(self, filepath):
         """Save metrics to a JSON file."""
         try:
             stats = self.get_stats()
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
+            temp_path = f"{filepath}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
                 json.dump(stats, f, indent=4)
-            
-            logger.info(f"API metrics saved to {filepath}")
+            os.replace(temp_path, filepath)
+
+            logger.debug(f"API metrics saved to {filepath}")
         except Exception as e:
             logger.error(f"Failed to save API metrics: {e}")
-    
+
+    def _start_publisher(self):
+        """Starts the thread that publishes this process's metrics for the dashboard."""
+        with self._lock:
+            if self._publisher is not None:
+                return
+            self._publisher = threading.Thread(target=self._publish_loop, daemon=True, name="api-metrics-publisher")
+        self._publisher.start()
+
+    def publish(self):
+        """Writes this process's metrics to data/api_metrics/<process>.json for the dashboard."""
+        process_name = os.path.splitext(os.path.basename(sys.argv[0] or ""))[0] or "python"
+        self.save_to_file(os.path.join(API_METRICS_DIR, f"{process_name}.json"))
+
+    def _publish_loop(self):
+        while True:
+            time.sleep(_PUBLISH_INTERVAL)
+            self.publish()
+
     def log_summary(self):
         """Log a summary of API metrics."""
         stats = self.get_stats()
@@ -56,17 +351,48 @@ class APIMetrics:
         logger.info(f"Total API calls: {stats['total_calls']}")
         logger.info(f"Calls per hour: {stats['calls_per_hour']}")
         logger.info(f"Uptime: {stats['uptime_seconds']}s")
-        logger.info(f"Top endpoints:")
-        
-        # Sort by call count
+        logger.info(f"Top endpoints (by total time):")
+
+        # Sort by time spent, which is where poll-cycle time goes
         sorted_endpoints = sorted(
-            stats['by_endpoint'].items(),
-            key=lambda x: x[1],
+            stats['endpoints'].items(),
+            key=lambda x: x[1]["total_seconds"],
             reverse=True
         )[:10]
-        
-        for endpoint, count in sorted_endpoints:
-            logger.info(f"  {endpoint}: {count}")
+
+        for endpoint, endpoint_stats in sorted_endpoints:
+            logger.info(
+                f"  {endpoint}: {endpoint_stats['count']} calls, {endpoint_stats['total_seconds']}s total, "
+                f"p95 {endpoint_stats['p95_ms']}ms, {endpoint_stats['retries']} retries "
+                f"({endpoint_stats['backoff_seconds']}s backoff)"
+            )
+
+        saved = sum(group["saved"] for group in stats.get("singleflight", {}).values())
+        if saved:
+            logger.info(f"Calls saved by request coalescing: {saved}")
+
+        for name, breaker in stats.get("circuit_breakers", {}).items():
+            if breaker["times_opened"]:
+                logger.info(f"Circuit {name}: {breaker['state']}, opened {breaker['times_opened']}x, "
+                            f"{breaker['rejected']} calls failed fast")
+
+
+def load_published_metrics():
+    """Reads the metrics every process has published: {process_name: stats}."""
+    published = {}
+    try:
+        filenames = os.listdir(API_METRICS_DIR)
+    except FileNotFoundError:
+        return published
+    for filename in filenames:
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(API_METRICS_DIR, filename), "r", encoding="utf-8") as f:
+                published[filename[:-5]] = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read published API metrics {filename}: {e}")
+    return published
 
 
 # Global metrics instance
@@ -0,0 +1,232 @@
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+from core.utils.api_metrics import get_api_metrics
+from core.utils.rate_governor import classify_endpoint
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Consecutive failures (connection errors, timeouts, 5xx) that open a circuit
+FAILURE_THRESHOLD = 5
+# How long an open circuit rejects calls before letting one probe through;
+# doubled after every failed probe, up to MAX_RESET_TIMEOUT
+RESET_TIMEOUT = 30  # seconds
+MAX_RESET_TIMEOUT = 300  # seconds
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Raised instead of sending a request while its circuit is open.
+
+    Subclasses requests' ConnectionError so existing error handling treats a
+    rejected call like an unreachable host, just without the wait.
+    """
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def endpoint_group(url):
+    """
+    Names the breaker a URL belongs to: '<host>:<group>'.
+
+    Noones endpoints are grouped like the rate governor groups them (trade,
+    chat, offer, ...) so a failing chat endpoint doesn't stop trade polling;
+    Discord webhooks and bot calls are kept apart; other hosts get one breaker.
+    """
+    parsed = urlparse(url)
+    host = parsed.hostname or ""
+    if host.endswith("noones.com"):
+        group = classify_endpoint(url)
+    elif host.endswith("discord.com"):
+        group = "webhook" if "/webhooks/" in parsed.path else "bot"
+    else:
+        group = "default"
+    return f"{host}:{group}"
+
+
+def is_failure_status(status_code):
+    """Server errors count against the circuit; 4xx (429 included) are the caller's business."""
+    return status_code >= 500
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after FAILURE_THRESHOLD consecutive failures. While open,
+    calls fail immediately with CircuitOpenError. Once the reset timeout has
+    passed the circuit is half-open: a single probe call is let through;
+    success closes the circuit, failure re-opens it with a longer timeout.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT,
+                 max_reset_timeout=MAX_RESET_TIMEOUT):
+        """
+        Initialize a circuit breaker.
+
+        Args:
+            name: Breaker name (see endpoint_group)
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+            max_reset_timeout: Upper bound for the backed-off reset timeout
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._current_timeout = reset_timeout
+        self._probe_in_flight = False
+        self._times_opened = 0
+        self._rejected = 0
+        self._last_error = None
+
+    def before_call(self):
+        """
+        Admits a call or raises CircuitOpenError.
+
+        Returns:
+            True if this call is the half-open probe
+        """
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return False
+            now = time.monotonic()
+            retry_in = self._opened_at + self._current_timeout - now
+            if self._state == STATE_OPEN and retry_in <= 0:
+                self._state = STATE_HALF_OPEN
+                logger.info(f"[CircuitBreaker] {self.name} half-open; sending a probe request")
+            if self._state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+        raise CircuitOpenError(self.name, max(retry_in, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                logger.info(f"[CircuitBreaker] {self.name} closed; upstream recovered")
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+            self._current_timeout = self.reset_timeout
+
+    def record_not_sent(self):
+        """The admitted call gave up before sending (not an upstream failure)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error is not None else None
+            if self._state == STATE_HALF_OPEN:
+                # Failed probe: back off further before the next one
+                self._current_timeout = min(self._current_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self._state == STATE_CLOSED and self._failures >= self.failure_threshold:
+                self._current_timeout = self.reset_timeout
+                self._open()
+
+    def _open(self):
+        self._state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._times_opened += 1
+        logger.warning(
+            f"[CircuitBreaker] {self.name} open after {self._failures} consecutive failures "
+            f"(last: {self._last_error}); failing fast for {self._current_timeout:.0f}s"
+        )
+
+    def get_stats(self):
+        with self._lock:
+            retry_in = 0.0
+            if self._state == STATE_OPEN:
+                retry_in = max(0.0, self._opened_at + self._current_timeout - time.monotonic())
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+                "retry_in_seconds": round(retry_in, 1),
+                "last_error": self._last_error
+            }
+
+
+class CircuitBreakerRegistry:
+    """One CircuitBreaker per upstream host and endpoint group."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def for_url(self, url):
+        """Get (or create) the breaker guarding a URL."""
+        name = endpoint_group(url)
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(name)
+        return breaker
+
+    def call(self, url, send):
+        """
+        Runs send() (which performs the request for url) through its breaker.
+
+        Args:
+            url: Request URL, used to pick the breaker
+            send: Callable returning a requests.Response
+
+        Returns:
+            The response from send()
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        breaker = self.for_url(url)
+        breaker.before_call()
+        try:
+            response = send()
+        except Exception as e:
+            if getattr(e, "request_sent", True):
+                breaker.record_failure(e)
+            else:
+                breaker.record_not_sent()
+            raise
+        if is_failure_status(response.status_code):
+            breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            breaker.record_success()
+        return response
+
+    def get_stats(self):
+        """State of every breaker: {name: {state, consecutive_failures, ...}}."""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.get_stats() for breaker in breakers}
+
+
+# Global circuit breaker registry
+_registry = CircuitBreakerRegistry()
+
+
+def get_circuit_breakers():
+    """Get the global circuit breaker registry."""
+    return _registry
+
+
+get_api_metrics().register_stats_provider("circuit_breakers", _registry.get_stats)
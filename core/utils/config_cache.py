@@ -1,63 +1,61 @@
 import os
 import json
-import time
-import threading
 import logging
-from config import PAYMENT_ACCOUNTS_PATH
-from core.utils.web_utils import get_app_settings
+from config import PAYMENT_ACCOUNTS_PATH, APP_SETTINGS_FILE
+from core.utils.web_utils import get_app_settings, DEFAULT_APP_SETTINGS
+from core.utils.config_service import get_config_service
 
 logger = logging.getLogger(__name__)
 
-CACHE_TTL = 10  # seconds
+APP_SETTINGS_CONFIG = "app_settings"
 
-_app_settings_cache = {
-    "data": None,
-    "timestamp": 0
-}
-_app_settings_lock = threading.Lock()
 
-_payment_data_cache = {}
-_payment_data_lock = threading.Lock()
+def _read_app_settings(path):
+    if not os.path.exists(path):
+        # Writes the defaults file
+        return get_app_settings()
+    with open(path, "r") as f:
+        settings = json.load(f)
+    return {**DEFAULT_APP_SETTINGS, **settings}
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _apply_verbose_logging(name, old, new):
+    """Applies the verbose logging toggle in every process, not just the one that changed it."""
+    if old is not None and old.get("verbose_logging_enabled") == new.get("verbose_logging_enabled"):
+        return
+    level = logging.INFO if new.get("verbose_logging_enabled", True) else logging.WARNING
+    logging.getLogger().setLevel(level)
+    logger.warning(f"Log level set to {logging.getLevelName(level)} after a settings change")
+
+
+get_config_service().register(
+    APP_SETTINGS_CONFIG, APP_SETTINGS_FILE, _read_app_settings, default=DEFAULT_APP_SETTINGS
+)
+get_config_service().subscribe(APP_SETTINGS_CONFIG, _apply_verbose_logging)
 
 
 def get_cached_app_settings():
     """
-    Returns app settings from cache. Reloads from disk if older than CACHE_TTL.
-    Thread-safe: multiple trading threads can call this concurrently.
+    Returns the current app settings snapshot (read-only; see config_service.thaw).
+    Loaded once and reloaded when the file changes, so reads never touch disk.
     """
-    now = time.time()
-    with _app_settings_lock:
-        if _app_settings_cache["data"] is None or (now - _app_settings_cache["timestamp"]) > CACHE_TTL:
-            _app_settings_cache["data"] = get_app_settings()
-            _app_settings_cache["timestamp"] = now
-        return _app_settings_cache["data"]
+    return get_config_service().get(APP_SETTINGS_CONFIG)
 
 
 def get_cached_payment_account(json_filename):
     """
-    Returns payment account data from cache. Reloads from disk if older than CACHE_TTL.
-    Thread-safe: multiple trading threads can call this concurrently.
+    Returns the payment account data of one file (read-only), or None if it
+    can't be read. The file is loaded on first use and reloaded when it changes.
     """
-    now = time.time()
-
-    with _payment_data_lock:
-        # Check if cached and fresh
-        if json_filename in _payment_data_cache:
-            cache_entry = _payment_data_cache[json_filename]
-            if (now - cache_entry["timestamp"]) <= CACHE_TTL:
-                return cache_entry["data"]
-
-        # Load from disk (inside the lock to prevent thundering-herd on cache miss)
-        json_path = os.path.join(PAYMENT_ACCOUNTS_PATH, json_filename)
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logger.error(f"Could not read or parse {json_filename}: {e}")
-            data = None
-
-        _payment_data_cache[json_filename] = {
-            "data": data,
-            "timestamp": now
-        }
-        return data
+    name = f"payment_accounts:{json_filename}"
+    config_service = get_config_service()
+    try:
+        return config_service.get(name)
+    except KeyError:
+        config_service.register(name, os.path.join(PAYMENT_ACCOUNTS_PATH, json_filename), _read_json)
+        return config_service.get(name)
@@ -0,0 +1,246 @@
+import os
+import time
+import logging
+import threading
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+logger = logging.getLogger(__name__)
+
+# How often watched files are stat()ed for changes (seconds). With watchdog
+# installed, file events trigger reloads and polling is only a safety net.
+POLL_INTERVAL = 0.5
+POLL_INTERVAL_WITH_EVENTS = 5.0
+
+
+class FrozenDict(dict):
+    """A dict that can't be modified. Still JSON-serialisable like a dict."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Config snapshots are read-only; use thaw() for a mutable copy")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+
+def freeze(value):
+    """Recursively turns dicts into FrozenDicts and lists into tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Mutable deep copy of a frozen snapshot (for read-modify-write code)."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+class _ConfigFile:
+    __slots__ = ("name", "path", "loader", "signature", "subscribers")
+
+    def __init__(self, name, path, loader):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        self.signature = None
+        self.subscribers = []
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, service):
+        self.service = service
+
+    def on_any_event(self, event):
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path:
+                self.service.check_path(path)
+
+
+class ConfigService:
+    """
+    Config files loaded once and kept as immutable snapshots.
+
+    Each registered file is parsed once; readers get the current snapshot
+    with a plain dict lookup, without locks or disk access. A watcher
+    thread notices changes (file events through the optional 'watchdog'
+    package, otherwise mtime polling every POLL_INTERVAL), parses the file
+    again, swaps the new snapshot in and notifies the file's subscribers.
+
+    A file that fails to parse (e.g. caught mid-write) keeps its previous
+    snapshot until it is readable again.
+    """
+
+    def __init__(self):
+        self._files = {}  # {name: _ConfigFile}
+        self._snapshots = {}  # {name: frozen data}; replaced per item, read without locks
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._observer = None
+        self._watched_dirs = set()
+        self._stats = {"loads": 0, "reloads": 0, "unchanged": 0, "failures": 0, "notifications": 0}
+
+    def register(self, name, path, loader, default=None):
+        """
+        Load a config file and start watching it. Registering a name again is a no-op.
+
+        Args:
+            name: Key readers use with get()
+            path: File to load and watch
+            loader: Callable(path) returning the parsed data; raises on failure
+            default: Snapshot used if the first load fails
+        """
+        with self._lock:
+            if name in self._files:
+                return
+            config_file = _ConfigFile(name, os.path.abspath(path), loader)
+            config_file.signature = _signature(config_file.path)
+            try:
+                data = loader(config_file.path)
+                self._stats["loads"] += 1
+            except Exception as e:
+                logger.error(f"Could not load config '{name}' from {path}: {e}")
+                self._stats["failures"] += 1
+                data = default
+            self._snapshots[name] = freeze(data)
+            self._files[name] = config_file
+            self._watch_dir(os.path.dirname(config_file.path))
+            self._start_watcher()
+
+    def get(self, name):
+        """
+        Current snapshot of a registered config (read-only; see thaw()).
+
+        Raises:
+            KeyError: If the name isn't registered
+        """
+        return self._snapshots[name]
+
+    def subscribe(self, name, callback):
+        """
+        Call callback(name, old_snapshot, new_snapshot) whenever the config changes.
+        Callbacks run on the watcher thread (or the thread calling reload()).
+        """
+        with self._lock:
+            self._files[name].subscribers.append(callback)
+
+    def reload(self, name):
+        """Re-read a config now (e.g. right after this process wrote it)."""
+        config_file = self._files.get(name)
+        if config_file is not None:
+            self._reload(config_file, _signature(config_file.path))
+
+    def reload_path(self, path):
+        """Re-read every config loaded from path."""
+        path = os.path.abspath(path)
+        for config_file in list(self._files.values()):
+            if config_file.path == path:
+                self._reload(config_file, _signature(path))
+
+    def check_path(self, path):
+        """Reload configs from path if the file changed since it was loaded."""
+        path = os.path.abspath(path)
+        for config_file in list(self._files.values()):
+            if config_file.path == path:
+                self._check(config_file)
+
+    def _check(self, config_file):
+        signature = _signature(config_file.path)
+        if signature != config_file.signature:
+            self._reload(config_file, signature)
+
+    def _reload(self, config_file, signature):
+        with self._lock:
+            try:
+                data = freeze(config_file.loader(config_file.path))
+            except Exception as e:
+                # Keep the last good snapshot; retried on the next change
+                logger.warning(f"Could not reload config '{config_file.name}', keeping the previous one: {e}")
+                self._stats["failures"] += 1
+                config_file.signature = signature
+                return
+            config_file.signature = signature
+            old = self._snapshots.get(config_file.name)
+            if data == old:
+                self._stats["unchanged"] += 1
+                return
+            self._snapshots[config_file.name] = data
+            self._stats["reloads"] += 1
+            subscribers = list(config_file.subscribers)
+        logger.info(f"Config '{config_file.name}' reloaded from {config_file.path}")
+        for callback in subscribers:
+            try:
+                callback(config_file.name, old, data)
+                with self._lock:
+                    self._stats["notifications"] += 1
+            except Exception as e:
+                logger.error(f"Config subscriber for '{config_file.name}' failed: {e}")
+
+    def _watch_dir(self, directory):
+        if Observer is None or directory in self._watched_dirs or not os.path.isdir(directory):
+            return
+        try:
+            if self._observer is None:
+                self._observer = Observer()
+                self._observer.daemon = True
+                self._observer.start()
+            self._observer.schedule(_EventHandler(self), directory, recursive=False)
+            self._watched_dirs.add(directory)
+        except Exception as e:
+            logger.warning(f"Could not watch {directory} for config changes, polling instead: {e}")
+
+    def _start_watcher(self):
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._poll_loop, name="config-watch", daemon=True)
+        self._watcher.start()
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(POLL_INTERVAL_WITH_EVENTS if self._watched_dirs else POLL_INTERVAL)
+            for config_file in list(self._files.values()):
+                try:
+                    self._check(config_file)
+                except Exception as e:
+                    logger.error(f"Config watcher failed for '{config_file.name}': {e}")
+
+    def get_stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                files=len(self._files),
+                watch_mode="events" if self._watched_dirs else "polling"
+            )
+
+
+# Global config service instance
+_config_service = ConfigService()
+
+
+def get_config_service():
+    """Get the global config service instance."""
+    return _config_service
@@ -1,11 +1,11 @@
 import logging
-import requests
 import threading
 import time
 import os
 import json
 from datetime import datetime, timezone
 from config import HEARTBEAT_STATE_FILE
+from core.utils.http_client import instrumented_request
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +71,7 @@ class HeartbeatMonitor:
                 }]
             }
             
-            response = requests.post(
+            response = instrumented_request("POST",
                 self.webhook_url,
                 json=payload,
                 params={"wait": "true"},  # Get message ID back
@@ -115,7 +115,7 @@ class HeartbeatMonitor:
                 }]
             }
             
-            response = requests.patch(edit_url, json=payload, timeout=10)
+            response = instrumented_request("PATCH", edit_url, json=payload, timeout=10)
             
             if response.status_code == 200:
                 logger.debug("Heartbeat message updated")
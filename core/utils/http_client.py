@@ -1,8 +1,14 @@
+import time
 import requests
 import logging
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from core.utils.rate_governor import get_rate_governor
+from core.utils.api_metrics import get_api_metrics
+from core.utils.circuit_breaker import get_circuit_breakers, CircuitOpenError
+from core.utils.retry_policy import remaining_budget, DeadlineExceededError
+
 logger = logging.getLogger(__name__)
 
 
@@ -10,25 +16,46 @@ class OptimizedHTTPClient:
     """
     HTTP client with connection pooling and automatic retry logic.
     Reuses connections to reduce overhead and improve performance.
+
+    Requests to the Noones API go through the rate governor first; a 429 is
+    not retried by urllib3 (which would sleep inside the calling thread) but
+    pauses the governor's bucket and is retried once a token is free again.
+    Inside a RetryPolicy.call() the governor wait, the 429 retries and the
+    request timeouts are all capped by what is left of the call's deadline.
+
+    Every request is recorded in the API metrics (latency, status, urllib3
+    retries and backoff, bytes in/out) under its normalized endpoint, and
+    passes the circuit breaker of its host and endpoint group: while that
+    upstream is failing, requests raise CircuitOpenError immediately.
     """
-    
-    def __init__(self, pool_connections=10, pool_maxsize=20, max_retries=3):
+
+    # Extra attempts for a Noones request answered with 429
+    RATE_LIMIT_RETRIES = 2
+
+    def __init__(self, pool_connections=10, pool_maxsize=20, max_retries=2):
         """
         Initialize HTTP client with connection pooling.
         
         Args:
             pool_connections: Number of connection pools to cache
             pool_maxsize: Maximum number of connections per pool
-            max_retries: Maximum number of retry attempts for failed requests
+            max_retries: Maximum number of retries for failed connection attempts
         """
         self.session = requests.Session()
+        self.connect_retries = max_retries
         
-        # Configure retry strategy
+        # Only connection setup is retried here: the request has not been sent
+        # yet, so this is safe for any method. Retrying reads and 5xx
+        # responses is left to the call site's RetryPolicy, which knows
+        # whether the call is idempotent and how long it may take.
         retry_strategy = Retry(
             total=max_retries,
-            backoff_factor=1,  # Wait 1, 2, 4 seconds between retries
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "POST", "PUT", "DELETE", "OPTIONS", "TRACE"]
+            connect=max_retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=0.5,
+            raise_on_status=False
         )
         
         # Configure HTTP adapter with pooling
@@ -44,10 +71,75 @@ class OptimizedHTTPClient:
         logger.info(f"Initialized HTTP client with connection pooling "
                    f"(pool_size={pool_maxsize}, max_retries={max_retries})")
     
+    def _budget_timeout(self, timeout, budget):
+        """
+        Request timeout capped by the remaining retry budget: half of it for
+        connecting (spread over urllib3's connect retries), the rest for reading.
+        """
+        if budget <= 0:
+            raise DeadlineExceededError("Retry deadline spent before the request was sent")
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        connect_limit = budget / 2 / (self.connect_retries + 1)
+        read_limit = budget / 2
+        return (
+            connect_limit if connect is None else min(connect, connect_limit),
+            read_limit if read is None else min(read, read_limit)
+        )
+
+    def _send(self, method, url, **kwargs):
+        """Sends one request through the pooled session and records it in the API metrics."""
+        budget = remaining_budget()
+        if budget is not None:
+            kwargs["timeout"] = self._budget_timeout(kwargs.get("timeout"), budget)
+        metrics = get_api_metrics()
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            metrics.record_response(method, url, started, error=True)
+            raise
+        metrics.record_response(method, url, started, response, streamed=kwargs.get("stream", False))
+        return response
+
+    def _request(self, method, url, priority=None, **kwargs):
+        """
+        Sends a request through its circuit breaker, governed by the Noones
+        rate limiter when applicable.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            priority: Optional rate governor lane (see core.utils.rate_governor)
+
+        Raises:
+            CircuitOpenError: If the circuit for this endpoint is open
+        """
+        return get_circuit_breakers().call(url, lambda: self._governed_request(method, url, priority, **kwargs))
+
+    def _governed_request(self, method, url, priority, **kwargs):
+        governor = get_rate_governor()
+        if not governor.is_governed(url):
+            return self._send(method, url, **kwargs)
+
+        headers, data = kwargs.get("headers"), kwargs.get("data")
+        for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+            governor.acquire(url, headers=headers, data=data, priority=priority, max_wait=remaining_budget())
+            response = self._send(method, url, **kwargs)
+            if response.status_code != 429 or attempt == self.RATE_LIMIT_RETRIES:
+                return response
+            pause = governor.throttled(url, headers=headers, data=data, retry_after=response.headers.get("Retry-After"))
+            budget = remaining_budget()
+            if budget is not None and budget <= pause:
+                # No time left to wait out the pause; the caller's policy decides
+                return response
+        return response
+
     def post(self, url, **kwargs):
         """Make a POST request using the pooled session."""
         try:
-            return self.session.post(url, **kwargs)
+            return self._request("POST", url, **kwargs)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"HTTP POST error for {url}: {e}")
             raise
@@ -55,7 +147,9 @@ class OptimizedHTTPClient:
     def get(self, url, **kwargs):
         """Make a GET request using the pooled session."""
         try:
-            return self.session.get(url, **kwargs)
+            return self._request("GET", url, **kwargs)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"HTTP GET error for {url}: {e}")
             raise
@@ -63,7 +157,9 @@ class OptimizedHTTPClient:
     def put(self, url, **kwargs):
         """Make a PUT request using the pooled session."""
         try:
-            return self.session.put(url, **kwargs)
+            return self._request("PUT", url, **kwargs)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"HTTP PUT error for {url}: {e}")
             raise
@@ -71,7 +167,9 @@ class OptimizedHTTPClient:
     def patch(self, url, **kwargs):
         """Make a PATCH request using the pooled session."""
         try:
-            return self.session.patch(url, **kwargs)
+            return self._request("PATCH", url, **kwargs)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"HTTP PATCH error for {url}: {e}")
             raise
@@ -79,7 +177,9 @@ class OptimizedHTTPClient:
     def delete(self, url, **kwargs):
         """Make a DELETE request using the pooled session."""
         try:
-            return self.session.delete(url, **kwargs)
+            return self._request("DELETE", url, **kwargs)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"HTTP DELETE error for {url}: {e}")
             raise
@@ -102,6 +202,37 @@ def get_http_client():
     return _http_client
 
 
+def instrumented_request(method, url, **kwargs):
+    """
+    requests.request() for call sites that don't use the pooled client
+    (webhooks, alerts, exchange APIs), recorded in the API metrics and
+    guarded by the circuit breaker of the target host.
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        **kwargs: Passed to requests.request
+
+    Returns:
+        requests.Response
+
+    Raises:
+        CircuitOpenError: If the circuit for this endpoint is open
+    """
+    def send():
+        metrics = get_api_metrics()
+        started = time.perf_counter()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except Exception:
+            metrics.record_response(method, url, started, error=True)
+            raise
+        metrics.record_response(method, url, started, response, streamed=kwargs.get("stream", False))
+        return response
+
+    return get_circuit_breakers().call(url, send)
+
+
 def close_http_client():
     """Close the global HTTP client."""
     global _http_client
@@ -3,7 +3,7 @@ import csv
 import os
 from datetime import datetime, timezone
 from config import TRADE_HISTORY_DIR 
-from core.api.offers import search_public_offers
+from core.api.market_snapshot import get_market_snapshots, market_key as build_market
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +27,8 @@ FIAT = "MXN"
 # --- USE THE CORRECT COUNTRY ISO ---
 COUNTRY_ISO = "MX"
 # --- END ---
+# Oldest market snapshot (seconds) the report accepts
+REPORT_MARKET_MAX_AGE = 300
 
 def generate_mxn_market_report():
     """
@@ -37,7 +39,17 @@ def generate_mxn_market_report():
     logger.info("Starting generation of full MXN market report...")
     
     all_offers_data = []
-    
+
+    # Every market at once; markets scanned recently by other jobs are reused
+    snapshots = get_market_snapshots().get_many(
+        [
+            build_market(crypto, FIAT, pm_slug, trade_direction, COUNTRY_ISO, COUNTRY_ISO)
+            for crypto in CRYPTOS for pm_slug in MXN_PAYMENT_METHODS for trade_direction in ["buy", "sell"]
+        ],
+        max_age=REPORT_MARKET_MAX_AGE,
+        allow_stale=True
+    )
+
     for crypto in CRYPTOS:
         for pm_slug in MXN_PAYMENT_METHODS:
             for trade_direction in ["buy", "sell"]:
@@ -45,20 +57,11 @@ def generate_mxn_market_report():
                 logger.info(f"Scanning market: {market_key}")
                 
                 try:
-                    # --- ADD CORRECT COUNTRY_ISO FILTERS ---
-                    offers = search_public_offers(
-                        crypto, 
-                        FIAT, 
-                        pm_slug, 
-                        trade_direction, 
-                        payment_method_country_iso=COUNTRY_ISO, 
-                        country_code=COUNTRY_ISO
-                    )
-
-                    # Validate that offers is a list, not a string or error
-                    if not isinstance(offers, list):
-                        logger.warning(f"Received non-list response for market {market_key}: {type(offers).__name__}")
+                    snapshot = snapshots[build_market(crypto, FIAT, pm_slug, trade_direction, COUNTRY_ISO, COUNTRY_ISO)]
+                    if snapshot is None:
+                        logger.warning(f"Could not scan market {market_key}.")
                         continue
+                    offers = snapshot.offers
 
                     if not offers:
                         logger.warning(f"No offers found for market {market_key}.")
@@ -0,0 +1,433 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from collections import defaultdict, OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes: lower value = more urgent
+PRIORITY_CRITICAL = 0    # chat send, trade list, release, auth
+PRIORITY_NORMAL = 1      # dashboard / bot initiated calls
+PRIORITY_BACKGROUND = 2  # scheduled scans (pricing, leaderboard, wallet, reports)
+_PRIORITY_NAMES = {PRIORITY_CRITICAL: "critical", PRIORITY_NORMAL: "normal", PRIORITY_BACKGROUND: "background"}
+
+# Only requests to these hosts are governed
+GOVERNED_HOST_SUFFIX = "noones.com"
+
+# {endpoint_class: (tokens per second, burst size)} per account
+ENDPOINT_LIMITS = {
+    "chat": (2.0, 5),
+    "trade": (2.0, 5),
+    "offer": (1.0, 5),
+    "wallet": (0.5, 2),
+    "token": (0.2, 2),
+    "other": (1.0, 3),
+}
+_DEFAULT_PRIORITIES = {
+    "chat": PRIORITY_CRITICAL,
+    "trade": PRIORITY_CRITICAL,
+    "token": PRIORITY_CRITICAL,
+}
+# Share of the burst that background calls must leave in the bucket, so
+# trade-critical calls still find tokens while a scan is running.
+BACKGROUND_RESERVE = 0.4
+# Longest a caller waits for a token before going ahead anyway (seconds)
+MAX_WAIT = {PRIORITY_CRITICAL: 15, PRIORITY_NORMAL: 30, PRIORITY_BACKGROUND: 60}
+
+# Bucket state shared by the trading process, the Flask app and the Discord bot
+SHARED_STATE_DB = os.path.join("data", "rate_governor.db")
+SHARE_ACROSS_PROCESSES = True
+# A locked/busy shared state file (another process mid-write) is retried this
+# often before the call falls back to this process's buckets for that call only
+SHARED_ATTEMPTS = 3
+SHARED_RETRY_SECONDS = 0.05
+# SQLite busy timeout per attempt (seconds)
+SHARED_BUSY_TIMEOUT = 1
+# Buckets idle this long are dropped; a missing bucket starts full, as an
+# idle one would be anyway
+BUCKET_IDLE_SECONDS = 24 * 60 * 60
+BUCKET_PRUNE_INTERVAL = 60 * 60
+# Bearer tokens mapped to their account (hourly refreshes of every account)
+MAX_KNOWN_TOKENS = 256
+
+_context = threading.local()
+
+
+@contextmanager
+def rate_priority(priority):
+    """Runs the enclosed Noones calls of this thread in the given priority lane."""
+    previous = getattr(_context, "priority", None)
+    _context.priority = priority
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def current_priority():
+    """The rate_priority() lane of this thread, or None."""
+    return getattr(_context, "priority", None)
+
+
+def background_job(func):
+    """Wraps a scheduler job so its Noones calls use the background lane."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with rate_priority(PRIORITY_BACKGROUND):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def classify_endpoint(url):
+    """Maps a Noones URL to its rate-limit class."""
+    path = urlparse(url).path.lower()
+    if "oauth" in path or path.endswith("/token"):
+        return "token"
+    if "trade-chat" in path:
+        return "chat"
+    if "/trade/" in path:
+        return "trade"
+    if "/offer" in path:
+        return "offer"
+    if "wallet" in path:
+        return "wallet"
+    return "other"
+
+
+def _digest(value):
+    """Short digest used in bucket keys instead of the credential itself."""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:12]
+
+
+class _LocalBuckets:
+    """In-process token buckets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # {key: [tokens, updated, paused_until]}
+
+    def take(self, key, rate, burst, reserve):
+        """Takes one token, or returns the seconds to wait before trying again (0 = taken)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, paused_until = self._buckets.get(key, (burst, now, 0.0))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if now < paused_until:
+                self._buckets[key] = [tokens, now, paused_until]
+                return paused_until - now
+            if tokens - 1 >= reserve:
+                self._buckets[key] = [tokens - 1, now, paused_until]
+                return 0.0
+            self._buckets[key] = [tokens, now, paused_until]
+            return (reserve + 1 - tokens) / rate
+
+    def pause(self, key, seconds):
+        now = time.monotonic()
+        with self._lock:
+            self._buckets[key] = [0.0, now, now + seconds]
+
+    def prune(self, idle_seconds):
+        """Drops buckets untouched for idle_seconds. Returns how many were dropped."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [key for key, (_, updated, paused_until) in self._buckets.items()
+                    if updated < now - idle_seconds and paused_until <= now]
+            for key in idle:
+                del self._buckets[key]
+        return len(idle)
+
+
+class _SharedBuckets:
+    """Token buckets in a small SQLite file so every local process draws from the same budget."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, paused_until REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=SHARED_BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, reserve):
+        """Takes one token, or returns the seconds to wait before trying again (0 = taken)."""
+        conn = self._connect()
+        now = time.time()  # wall clock: comparable across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated, paused_until FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated, paused_until = row if row else (burst, now, 0.0)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            if now < paused_until:
+                wait = paused_until - now
+            elif tokens - 1 >= reserve:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (reserve + 1 - tokens) / rate
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated, paused_until) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, paused_until)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def pause(self, key, seconds):
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO buckets (key, tokens, updated, paused_until) VALUES (?, 0, ?, ?)",
+            (key, now, now + seconds)
+        )
+
+    def prune(self, idle_seconds):
+        """Deletes buckets untouched for idle_seconds. Returns how many were deleted."""
+        now = time.time()
+        return self._connect().execute(
+            "DELETE FROM buckets WHERE updated < ? AND paused_until <= ?", (now - idle_seconds, now)
+        ).rowcount
+
+
+class RateGovernor:
+    """
+    Token-bucket rate governor for Noones API calls, one bucket per account
+    and endpoint class. Accounts are identified by client_id; bearer tokens
+    are mapped to theirs through register_token(), so a refreshed token keeps
+    the account's budget instead of starting a new full bucket. Callers block in acquire() until a token is free
+    instead of hitting 429s. Higher-priority waiters on the same bucket go
+    first, and background calls leave a reserve in the bucket for
+    trade-critical ones.
+
+    Buckets live in a shared SQLite file by default so the trading process,
+    the Flask app and the Discord bot share one budget. A locked file only
+    sends that one call to in-process buckets; a file that can't be used at
+    all switches this process to in-process buckets for good.
+    """
+
+    def __init__(self, shared=SHARE_ACROSS_PROCESSES, db_path=SHARED_STATE_DB):
+        """
+        Initialize the rate governor.
+
+        Args:
+            shared: Keep bucket state in a SQLite file shared across processes
+            db_path: Path of the shared state file
+        """
+        self._local_buckets = _LocalBuckets()
+        self._buckets = self._local_buckets
+        if shared:
+            try:
+                self._buckets = _SharedBuckets(db_path)
+            except sqlite3.Error as e:
+                logger.warning(f"Rate governor could not open {db_path}, using per-process buckets: {e}")
+
+        self._cond = threading.Condition()
+        self._waiting = defaultdict(lambda: defaultdict(int))  # {bucket_key: {priority: count}}
+        self._stats_lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"acquired": 0, "waited": 0, "wait_seconds": 0.0, "timeouts": 0, "throttled": 0})
+        self._token_lock = threading.Lock()
+        self._token_accounts = OrderedDict()  # {token digest: account digest}
+        self._last_prune = time.monotonic()
+
+    def _run(self, operation, key, func):
+        """
+        Runs func(buckets) against the shared buckets.
+
+        Operational errors (locked or busy database) are retried a few times,
+        then only this call uses the in-process buckets; any other database
+        error means the file is unusable and disables sharing in this process.
+        """
+        buckets = self._buckets
+        if buckets is not self._local_buckets:
+            error = None
+            for attempt in range(SHARED_ATTEMPTS):
+                if attempt:
+                    time.sleep(SHARED_RETRY_SECONDS)
+                try:
+                    return func(buckets)
+                except sqlite3.OperationalError as e:
+                    error = e
+                except sqlite3.Error as e:
+                    logger.warning(f"Shared rate governor state unusable, using per-process buckets: {e}")
+                    self._buckets = self._local_buckets
+                    error = None
+                    break
+            if error is not None:
+                logger.warning(f"Rate governor: shared state busy, {operation} of {key} used per-process buckets: {error}")
+        return func(self._local_buckets)
+
+    def _take(self, key, rate, burst, reserve):
+        if time.monotonic() - self._last_prune >= BUCKET_PRUNE_INTERVAL:
+            self._prune()
+        return self._run("take", key, lambda buckets: buckets.take(key, rate, burst, reserve))
+
+    def _prune(self):
+        self._last_prune = time.monotonic()
+        removed = self._run("prune", "idle buckets", lambda buckets: buckets.prune(BUCKET_IDLE_SECONDS))
+        if removed:
+            logger.debug(f"Rate governor: dropped {removed} idle bucket(s)")
+
+    def register_token(self, token, client_id):
+        """
+        Maps a bearer token to its account so requests made with it draw
+        from the account's buckets, whichever token is current.
+
+        Args:
+            token: Access token as sent in the Authorization header
+            client_id: Client id of the account the token was issued to
+        """
+        token_digest = _digest(token)
+        with self._token_lock:
+            self._token_accounts[token_digest] = _digest(client_id)
+            self._token_accounts.move_to_end(token_digest)
+            while len(self._token_accounts) > MAX_KNOWN_TOKENS:
+                self._token_accounts.popitem(last=False)
+
+    def account_key(self, headers=None, data=None):
+        """Identifies the account behind a request without keeping the credential itself."""
+        credential = None
+        if headers:
+            credential = headers.get("Authorization") or headers.get("authorization")
+        if credential:
+            token_digest = _digest(credential.split(" ", 1)[-1])
+            with self._token_lock:
+                # Tokens not issued through the token manager get a bucket of their own
+                return self._token_accounts.get(token_digest, token_digest)
+        if isinstance(data, dict) and data.get("client_id"):
+            return _digest(data["client_id"])
+        return "anonymous"
+
+    @staticmethod
+    def is_governed(url):
+        host = urlparse(url).hostname or ""
+        return host.endswith(GOVERNED_HOST_SUFFIX)
+
+    def acquire(self, url, headers=None, data=None, priority=None, max_wait=None):
+        """
+        Blocks until the request may be sent.
+
+        Args:
+            url: Request URL (its path decides the endpoint class)
+            headers: Request headers (the bearer token identifies the account,
+                     see register_token())
+            data: Form data (client_id identifies the account for token requests)
+            priority: Lane override; defaults to the thread's rate_priority()
+                      or the endpoint class default
+            max_wait: Optional tighter wait limit than the lane's MAX_WAIT
+                      (e.g. what is left of the caller's retry deadline)
+
+        Returns:
+            True if a token was acquired, False if the wait limit was hit
+            (the caller goes ahead anyway)
+        """
+        endpoint_class = classify_endpoint(url)
+        if priority is None:
+            priority = getattr(_context, "priority", None)
+        if priority is None:
+            priority = _DEFAULT_PRIORITIES.get(endpoint_class, PRIORITY_NORMAL)
+        rate, burst = ENDPOINT_LIMITS[endpoint_class]
+        reserve = burst * BACKGROUND_RESERVE if priority == PRIORITY_BACKGROUND else 0.0
+        key = f"{self.account_key(headers, data)}:{endpoint_class}"
+        stats_key = f"{endpoint_class}:{_PRIORITY_NAMES.get(priority, priority)}"
+
+        start = time.monotonic()
+        wait_limit = MAX_WAIT.get(priority, 30)
+        if max_wait is not None:
+            wait_limit = max(min(wait_limit, max_wait), 0)
+        deadline = start + wait_limit
+        waited = False
+        with self._cond:
+            self._waiting[key][priority] += 1
+        try:
+            while True:
+                with self._cond:
+                    higher_waiting = any(count for p, count in self._waiting[key].items() if p < priority)
+                wait = 0.05 if higher_waiting else self._take(key, rate, burst, reserve)
+                if wait <= 0:
+                    acquired = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    acquired = False
+                    logger.warning(f"Rate governor: gave up waiting for a {stats_key} token after {wait_limit:.1f}s")
+                    break
+                waited = True
+                with self._cond:
+                    self._cond.wait(min(wait, remaining, 0.5))
+        finally:
+            with self._cond:
+                self._waiting[key][priority] -= 1
+                self._cond.notify_all()
+
+        with self._stats_lock:
+            stats = self._stats[stats_key]
+            if acquired:
+                stats["acquired"] += 1
+            else:
+                stats["timeouts"] += 1
+            if waited:
+                stats["waited"] += 1
+                stats["wait_seconds"] += time.monotonic() - start
+        return acquired
+
+    def throttled(self, url, headers=None, data=None, retry_after=None):
+        """
+        Empties and pauses the bucket after a 429, honouring Retry-After when given.
+
+        Returns:
+            The pause in seconds
+        """
+        endpoint_class = classify_endpoint(url)
+        try:
+            pause = float(retry_after) if retry_after is not None else 5.0
+        except (TypeError, ValueError):
+            pause = 5.0
+        key = f"{self.account_key(headers, data)}:{endpoint_class}"
+        self._run("pause", key, lambda buckets: buckets.pause(key, pause))
+        with self._stats_lock:
+            self._stats[f"{endpoint_class}:429"]["throttled"] += 1
+        logger.warning(f"Noones rate limit hit on {endpoint_class} endpoints; pausing that bucket for {pause:.0f}s")
+        return pause
+
+    def get_stats(self):
+        """Per endpoint class and lane: tokens acquired, waits, average wait and timeouts."""
+        with self._stats_lock:
+            result = {}
+            for stats_key, stats in self._stats.items():
+                entry = dict(stats)
+                entry["avg_wait_ms"] = round(stats["wait_seconds"] / stats["waited"] * 1000, 1) if stats["waited"] else 0.0
+                del entry["wait_seconds"]
+                result[stats_key] = entry
+            return result
+
+
+# Global rate governor instance
+_rate_governor = None
+_rate_governor_lock = threading.Lock()
+
+
+def get_rate_governor():
+    """Get the global rate governor instance, creating it if necessary."""
+    global _rate_governor
+    if _rate_governor is None:
+        with _rate_governor_lock:
+            if _rate_governor is None:
+                _rate_governor = RateGovernor()
+    return _rate_governor
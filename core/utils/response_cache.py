@@ -1,115 +1,353 @@
+import sys
 import time
+import atexit
 import threading
 import logging
 import hashlib
 import json
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from core.utils.api_metrics import get_api_metrics
+from core.utils.rate_governor import rate_priority, PRIORITY_BACKGROUND
+from core.utils.shared_cache import get_shared_cache
 
 logger = logging.getLogger(__name__)
 
+# Bounds of the cache; least recently used entries are evicted first
+MAX_ENTRIES = 1000
+MAX_BYTES = 32 * 1024 * 1024
+
+# Background refreshes of stale entries
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+atexit.register(_refresh_executor.shutdown, wait=False, cancel_futures=True)
+
+
+def _estimate_size(data):
+    """Approximate memory footprint of a cached value (its JSON size)."""
+    try:
+        return len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(data)
+
+
+class _Entry:
+    __slots__ = ("data", "expires_at", "stale_until", "size", "negative")
+
+    def __init__(self, data, expires_at, stale_until, size, negative):
+        self.data = data
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+        self.negative = negative
+
 
 class ResponseCache:
     """
-    Simple response cache for API responses with TTL support.
+    Response cache for API responses with TTL support.
     Prevents redundant API calls when data hasn't changed.
+
+    Bounded by entry count and (estimated) bytes with LRU eviction.
+    get_or_fetch() adds stale-while-revalidate: an expired entry is still
+    served during its stale window while one background refresh runs, and
+    concurrent misses for the same key wait for a single fetch (per-key
+    locks). Failed fetches can be cached briefly (negative caching) so a
+    failing upstream isn't hammered.
+
+    With shared=True, get_or_fetch() also consults the SharedCache tier
+    before fetching and publishes what it fetched there, so the trading
+    process, the Flask app and the bot fetch each key once between them.
     """
-    
-    def __init__(self):
-        self._cache = {}  # {cache_key: {"data": any, "expires_at": float}}
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries
+            max_bytes: Maximum total estimated size of the cached values
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()  # {cache_key: _Entry}, least recently used first
+        self._bytes = 0
         self._lock = threading.Lock()
-        self._hits = 0
-        self._misses = 0
-    
+        self._key_locks = {}  # {cache_key: Lock} for in-progress fetches
+        self._refreshing = set()
+        self._stats = {
+            "hits": 0, "misses": 0, "stale_served": 0, "negative_hits": 0,
+            "shared_hits": 0,
+            "refreshes": 0, "refresh_failures": 0, "evictions": 0, "expired": 0, "uncacheable": 0
+        }
+
     def _generate_key(self, endpoint, params=None):
         """Generate a cache key from endpoint and parameters."""
         if params is None:
             return endpoint
-        
+
         # Create deterministic key from params
         param_str = json.dumps(params, sort_keys=True)
         param_hash = hashlib.md5(param_str.encode()).hexdigest()[:8]
         return f"{endpoint}:{param_hash}"
-    
+
+    def _remove(self, cache_key):
+        entry = self._cache.pop(cache_key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def _store(self, cache_key, data, ttl_seconds, stale_ttl=0, negative=False, shared=False):
+        expires_at = time.time() + ttl_seconds
+        self._store_until(cache_key, data, expires_at, expires_at + stale_ttl, negative)
+        if shared:
+            get_shared_cache().set(cache_key, data, expires_at, expires_at + stale_ttl, negative)
+
+    def _store_until(self, cache_key, data, expires_at, stale_until, negative=False):
+        size = _estimate_size(data)
+        with self._lock:
+            self._remove(cache_key)
+            if size > self.max_bytes:
+                logger.warning(f"Not caching {cache_key}: {size} bytes exceeds the cache size")
+                return
+            self._cache[cache_key] = _Entry(data, expires_at, stale_until, size, negative)
+            self._bytes += size
+            self._evict(time.time())
+
+    def _adopt_shared(self, cache_key):
+        """Copies the shared entry of a key into this process. Returns (entry, state) like _lookup."""
+        shared_entry = get_shared_cache().get(cache_key)
+        if shared_entry is None:
+            return None, None
+        data, expires_at, stale_until, negative = shared_entry
+        self._store_until(cache_key, data, expires_at, stale_until, negative)
+        with self._lock:
+            self._stats["shared_hits"] += 1
+            return self._lookup(cache_key)
+
+    def _evict(self, now):
+        # Drop dead entries from the cold end (up to 8), then enforce the bounds
+        for _ in range(8):
+            if not self._cache:
+                break
+            cache_key, entry = self._cache.popitem(last=False)
+            if entry.stale_until > now:
+                # Still alive: put it back at the cold end and stop
+                self._cache[cache_key] = entry
+                self._cache.move_to_end(cache_key, last=False)
+                break
+            self._bytes -= entry.size
+            self._stats["expired"] += 1
+        while self._cache and (len(self._cache) > self.max_entries or self._bytes > self.max_bytes):
+            cache_key, entry = self._cache.popitem(last=False)
+            self._bytes -= entry.size
+            self._stats["evictions"] += 1
+            logger.debug(f"Evicted {cache_key} from response cache")
+
+    def _lookup(self, cache_key):
+        """Returns (entry, state) with state 'fresh', 'stale' or None; counts nothing."""
+        entry = self._cache.get(cache_key)
+        if entry is None:
+            return None, None
+        now = time.time()
+        if now < entry.expires_at:
+            self._cache.move_to_end(cache_key)
+            return entry, "fresh"
+        if now < entry.stale_until:
+            self._cache.move_to_end(cache_key)
+            return entry, "stale"
+        self._remove(cache_key)
+        self._stats["expired"] += 1
+        return None, None
+
     def get(self, endpoint, params=None):
         """
         Get cached response if it exists and hasn't expired.
-        
+
         Args:
             endpoint: API endpoint identifier
             params: Optional parameters dict for cache key generation
-            
+
         Returns:
             Cached data if valid, None otherwise
         """
         cache_key = self._generate_key(endpoint, params)
-        
+
         with self._lock:
-            if cache_key not in self._cache:
-                self._misses += 1
+            entry, state = self._lookup(cache_key)
+            if state != "fresh" or entry.negative:
+                self._stats["misses"] += 1
                 logger.debug(f"Cache miss for {endpoint}")
                 return None
-            
-            cached_entry = self._cache[cache_key]
-            expires_at = cached_entry["expires_at"]
-            
-            if time.time() >= expires_at:
-                logger.debug(f"Cache expired for {endpoint}")
-                del self._cache[cache_key]
-                self._misses += 1
-                return None
-            
-            self._hits += 1
-            ttl_remaining = int(expires_at - time.time())
+            self._stats["hits"] += 1
+            ttl_remaining = int(entry.expires_at - time.time())
             logger.debug(f"Cache hit for {endpoint} (TTL: {ttl_remaining}s)")
-            return cached_entry["data"]
-    
-    def set(self, endpoint, data, ttl_seconds, params=None):
+            return entry.data
+
+    def set(self, endpoint, data, ttl_seconds, params=None, stale_ttl=0):
         """
         Store data in cache with expiration time.
-        
+
         Args:
             endpoint: API endpoint identifier
             data: Data to cache
             ttl_seconds: Time to live in seconds
             params: Optional parameters dict for cache key generation
+            stale_ttl: Extra seconds get_or_fetch may serve the data after it expired
+        """
+        self._store(self._generate_key(endpoint, params), data, ttl_seconds, stale_ttl)
+        logger.debug(f"Cached response for {endpoint} (TTL: {ttl_seconds}s)")
+
+    def get_or_fetch(self, endpoint, fetch, ttl_seconds, params=None, stale_ttl=0, negative_ttl=0, shared=False,
+                     cache_if=None):
+        """
+        Return the cached value, fetching it if needed.
+
+        Fresh entries are returned directly. Stale entries (expired less than
+        stale_ttl ago) are returned immediately while fetch() refreshes them
+        in the background, once. On a miss, the first caller runs fetch()
+        and concurrent callers for the same key wait for its result.
+
+        Args:
+            endpoint: API endpoint identifier
+            fetch: Callable returning the data, or None on failure
+            ttl_seconds: Time to live of fetched data
+            params: Optional parameters dict for cache key generation
+            stale_ttl: How long expired data may still be served
+            negative_ttl: How long a failed fetch (None) is remembered;
+                          0 disables negative caching
+            shared: Share the entry with the other local processes
+                    (the data must be JSON-serialisable)
+            cache_if: Optional predicate on fetched data; data it rejects
+                      (e.g. a partial failure) is returned but not cached,
+                      and a background refresh producing it keeps the old entry
+
+        Returns:
+            The data, or None if it couldn't be fetched
         """
         cache_key = self._generate_key(endpoint, params)
-        expires_at = time.time() + ttl_seconds
-        
+
         with self._lock:
-            self._cache[cache_key] = {
-                "data": data,
-                "expires_at": expires_at
-            }
-            logger.debug(f"Cached response for {endpoint} (TTL: {ttl_seconds}s)")
-    
+            entry, state = self._lookup(cache_key)
+        if state != "fresh" and shared:
+            # Another process may have fetched it already
+            shared_entry, shared_state = self._adopt_shared(cache_key)
+            if shared_state is not None:
+                entry, state = shared_entry, shared_state
+
+        with self._lock:
+            if state == "fresh":
+                self._stats["negative_hits" if entry.negative else "hits"] += 1
+                return entry.data
+            if state == "stale" and not entry.negative:
+                self._stats["stale_served"] += 1
+                if cache_key not in self._refreshing:
+                    self._refreshing.add(cache_key)
+                    _refresh_executor.submit(self._refresh, endpoint, cache_key, fetch, ttl_seconds, stale_ttl, shared, cache_if)
+                return entry.data
+            self._stats["misses"] += 1
+            key_lock = self._key_locks.setdefault(cache_key, threading.Lock())
+
+        with key_lock:
+            # Another caller may have fetched it while we waited
+            with self._lock:
+                entry, state = self._lookup(cache_key)
+                if state == "fresh":
+                    return entry.data
+            if shared:
+                with get_shared_cache().lease(cache_key):
+                    # The previous lease owner has usually just stored it
+                    entry, state = self._adopt_shared(cache_key)
+                    if state == "fresh":
+                        data = entry.data
+                    else:
+                        data = self._fetch_and_store(endpoint, cache_key, fetch, ttl_seconds, stale_ttl, negative_ttl, shared, cache_if)
+            else:
+                data = self._fetch_and_store(endpoint, cache_key, fetch, ttl_seconds, stale_ttl, negative_ttl, shared, cache_if)
+        with self._lock:
+            if not key_lock.locked():
+                self._key_locks.pop(cache_key, None)
+        return data
+
+    def _fetch_and_store(self, endpoint, cache_key, fetch, ttl_seconds, stale_ttl, negative_ttl, shared, cache_if):
+        try:
+            data = fetch()
+        except Exception as e:
+            logger.error(f"Fetching {endpoint} for the cache failed: {e}")
+            data = None
+        if data is not None and cache_if is not None and not cache_if(data):
+            logger.debug(f"Not caching {endpoint}: the fetch was incomplete")
+            with self._lock:
+                self._stats["uncacheable"] += 1
+            return data
+        if data is not None:
+            self._store(cache_key, data, ttl_seconds, stale_ttl, shared=shared)
+        elif negative_ttl:
+            self._store(cache_key, None, negative_ttl, negative=True, shared=shared)
+        return data
+
+    def _refresh(self, endpoint, cache_key, fetch, ttl_seconds, stale_ttl, shared, cache_if):
+        try:
+            with get_shared_cache().lease(cache_key, wait=0) if shared else nullcontext(True) as owned:
+                if not owned:
+                    # Another process is refreshing it; its result is adopted on the next read
+                    return
+                if shared:
+                    entry, state = self._adopt_shared(cache_key)
+                    if state == "fresh" and not entry.negative:
+                        return
+                with rate_priority(PRIORITY_BACKGROUND):
+                    data = fetch()
+                if data is not None and (cache_if is None or cache_if(data)):
+                    self._store(cache_key, data, ttl_seconds, stale_ttl, shared=shared)
+                    with self._lock:
+                        self._stats["refreshes"] += 1
+                    logger.debug(f"Refreshed stale cache entry for {endpoint}")
+                else:
+                    with self._lock:
+                        self._stats["refresh_failures"] += 1
+        except Exception as e:
+            logger.error(f"Background refresh of {endpoint} failed: {e}")
+            with self._lock:
+                self._stats["refresh_failures"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(cache_key)
+
     def invalidate(self, endpoint, params=None):
         """Remove an entry from the cache."""
         cache_key = self._generate_key(endpoint, params)
-        
+
         with self._lock:
-            if cache_key in self._cache:
-                del self._cache[cache_key]
+            if self._remove(cache_key) is not None:
                 logger.debug(f"Invalidated cache for {endpoint}")
-    
+        get_shared_cache().invalidate(cache_key)
+
     def clear(self):
         """Clear all cached entries."""
         with self._lock:
             count = len(self._cache)
             self._cache.clear()
+            self._bytes = 0
             logger.info(f"Cleared {count} cached responses")
-    
+
     def get_stats(self):
         """Get cache statistics."""
         with self._lock:
-            total_requests = self._hits + self._misses
-            hit_rate = (self._hits / total_requests * 100) if total_requests > 0 else 0
-            
-            return {
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"] + stats["stale_served"] + stats["negative_hits"]
+
+            def rate(count):
+                return f"{(count / lookups * 100) if lookups else 0:.1f}%"
+
+            stats.update({
                 "total_entries": len(self._cache),
-                "hits": self._hits,
-                "misses": self._misses,
-                "hit_rate": f"{hit_rate:.1f}%"
-            }
+                "total_bytes": self._bytes,
+                "hit_rate": rate(stats["hits"] + stats["negative_hits"]),
+                "stale_rate": rate(stats["stale_served"]),
+                "miss_rate": rate(stats["misses"])
+            })
+            return stats
 
 
 # Global response cache instance
@@ -119,3 +357,6 @@ _response_cache = ResponseCache()
 def get_response_cache():
     """Get the global response cache instance."""
     return _response_cache
+
+
+get_api_metrics().register_stats_provider("response_cache", _response_cache.get_stats)
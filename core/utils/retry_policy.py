@@ -0,0 +1,230 @@
+import time
+import random
+import logging
+import threading
+from collections import defaultdict
+
+import requests
+from urllib3.exceptions import NewConnectionError, ConnectTimeoutError
+
+from core.utils.api_metrics import get_api_metrics
+from core.utils.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another attempt when the call is idempotent
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Longest a send can overrun the deadline: urllib3's sleeps between connect
+# retries of the pooled client (backoff_factor 0.5, 2 retries: 0s + 1s)
+CONNECT_BACKOFF_SECONDS = 1.0
+
+_policies = []
+_policies_lock = threading.Lock()
+_budget = threading.local()
+
+
+class DeadlineExceededError(requests.exceptions.Timeout):
+    """The call's retry deadline was spent before the request could be sent."""
+
+    # Not held against the upstream's circuit breaker
+    request_sent = False
+
+
+def remaining_budget():
+    """
+    Seconds left of the deadline of the RetryPolicy.call() running in this
+    thread (may be <= 0), or None outside one. The HTTP client bounds its
+    rate governor wait, 429 retries and request timeouts with it.
+    """
+    deadline = getattr(_budget, "deadline", None)
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def request_not_sent(error):
+    """True if the request provably never reached the server (safe to retry anything)."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], "reason", None)
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+def _retry_after_seconds(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Retry rules for one call site: attempts, jittered exponential backoff,
+    per-attempt timeout and an overall deadline that bounds the worst-case
+    latency of the call, retries and sleeps included.
+
+    Idempotent calls are retried on request errors and on RETRYABLE_STATUSES.
+    Non-idempotent calls (chat sends, releases) are only retried when the
+    request provably never reached the server, so a message is never posted
+    twice and a release is never repeated blindly. CircuitOpenError is never
+    retried.
+    """
+
+    def __init__(self, name, max_attempts=3, base_delay=1.0, max_delay=10.0, attempt_timeout=10.0,
+                 deadline=30.0, idempotent=True, retry_statuses=RETRYABLE_STATUSES):
+        """
+        Initialize a retry policy.
+
+        Args:
+            name: Call site name (used in logs and stats)
+            max_attempts: Attempts including the first one
+            base_delay: Backoff before the first retry (doubles per retry)
+            max_delay: Upper bound for a single backoff
+            attempt_timeout: Request timeout of one attempt (seconds)
+            deadline: Budget for the whole call (seconds); attempts get at
+                      most the remaining budget as timeout, and no retry is
+                      started once it is spent
+            idempotent: Whether the call may safely be repeated
+            retry_statuses: Response statuses that trigger a retry
+        """
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.idempotent = idempotent
+        self.retry_statuses = retry_statuses
+        self._stats_lock = threading.Lock()
+        self._stats = defaultdict(int)
+        with _policies_lock:
+            _policies.append(self)
+
+    @property
+    def worst_case_seconds(self):
+        """
+        Longest a call under this policy can take: the deadline, plus the
+        connect backoff of a send already under way when it runs out (read
+        timeouts apply per socket read, so a trickling response isn't bounded).
+        """
+        return self.deadline + CONNECT_BACKOFF_SECONDS
+
+    def backoff(self, retry_number):
+        """Full-jitter backoff before the given retry (1 = first retry)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry_number - 1)))
+
+    def _should_retry_response(self, response):
+        return self.idempotent and response.status_code in self.retry_statuses
+
+    def _should_retry_error(self, error):
+        if isinstance(error, CircuitOpenError):
+            return False
+        if self.idempotent:
+            return isinstance(error, requests.exceptions.RequestException)
+        return request_not_sent(error)
+
+    def _count(self, **counts):
+        with self._stats_lock:
+            for key, value in counts.items():
+                self._stats[key] += value
+
+    def call(self, send, max_attempts=None):
+        """
+        Runs send(timeout) under this policy.
+
+        The deadline also bounds what happens inside send: while it runs,
+        remaining_budget() reports the time left, which the HTTP client uses
+        to cap its rate governor wait, its 429 retries and the request
+        timeouts (raising DeadlineExceededError once nothing is left).
+
+        Args:
+            send: Callable taking the attempt timeout and returning a
+                  requests.Response
+            max_attempts: Optional override of the policy's attempt count
+
+        Returns:
+            The last response received (which may still be an error status)
+
+        Raises:
+            The last request exception if no attempt produced a response
+        """
+        attempts = max_attempts or self.max_attempts
+        deadline = time.monotonic() + self.deadline
+        outer_deadline = getattr(_budget, "deadline", None)
+        if outer_deadline is not None:
+            # A nested call can't outlive the call it runs in
+            deadline = min(deadline, outer_deadline)
+        _budget.deadline = deadline
+        self._count(calls=1)
+        try:
+            return self._call(send, attempts, deadline)
+        finally:
+            _budget.deadline = outer_deadline
+
+    def _call(self, send, attempts, deadline):
+        for attempt in range(1, attempts + 1):
+            remaining = deadline - time.monotonic()
+            self._count(attempts=1)
+            try:
+                response = send(min(self.attempt_timeout, max(remaining, 0.1)))
+                error = None
+                retry = self._should_retry_response(response)
+                reason = f"HTTP {response.status_code}"
+            except Exception as e:
+                response = None
+                error = e
+                retry = self._should_retry_error(e)
+                reason = str(e)
+
+            if not retry:
+                break
+            if attempt == attempts:
+                self._count(gave_up=1)
+                break
+
+            delay = self.backoff(attempt)
+            if response is not None:
+                retry_after = _retry_after_seconds(response)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+            if time.monotonic() + delay >= deadline:
+                logger.warning(f"[Retry:{self.name}] Deadline of {self.deadline}s reached after {attempt} attempt(s) ({reason})")
+                self._count(deadline_exceeded=1)
+                break
+
+            logger.debug(f"[Retry:{self.name}] Attempt {attempt}/{attempts} failed ({reason}); retrying in {delay:.1f}s")
+            self._count(retries=1)
+            time.sleep(delay)
+
+        if error is not None:
+            raise error
+        return response
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = {key: self._stats[key] for key in ("calls", "attempts", "retries", "gave_up", "deadline_exceeded")}
+        stats["worst_case_seconds"] = self.worst_case_seconds
+        return stats
+
+
+# Per-call-site policies. The deadline bounds each call's latency (see worst_case_seconds).
+TRADE_LIST_POLICY = RetryPolicy("trade_list", max_attempts=3, attempt_timeout=10, deadline=25)
+CHAT_READ_POLICY = RetryPolicy("chat_read", max_attempts=3, attempt_timeout=20, deadline=45)
+CHAT_SEND_POLICY = RetryPolicy("chat_send", max_attempts=3, attempt_timeout=10, deadline=25, idempotent=False)
+RELEASE_POLICY = RetryPolicy("release", max_attempts=2, attempt_timeout=15, deadline=20, idempotent=False)
+TOKEN_POLICY = RetryPolicy("token", max_attempts=3, attempt_timeout=20, deadline=45)
+BINANCE_POLICY = RetryPolicy("binance", max_attempts=5, base_delay=1.5, max_delay=15, attempt_timeout=10, deadline=90)
+BITSO_POLICY = RetryPolicy("bitso", max_attempts=5, base_delay=1.5, max_delay=15, attempt_timeout=10, deadline=90)
+
+
+def get_retry_stats():
+    """Stats for every retry policy: {name: {calls, attempts, retries, gave_up, deadline_exceeded, worst_case_seconds}}."""
+    with _policies_lock:
+        policies = list(_policies)
+    return {policy.name: policy.get_stats() for policy in policies}
+
+
+get_api_metrics().register_stats_provider("retry_policies", get_retry_stats)
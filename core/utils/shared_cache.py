@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+from core.utils.api_metrics import get_api_metrics
+
+logger = logging.getLogger(__name__)
+
+# Cache entries shared by the trading process, the Flask app and the Discord bot
+SHARED_CACHE_DB = os.path.join("data", "shared_cache.db")
+SHARE_ACROSS_PROCESSES = True
+
+# A refresh lease is dropped after this long even if its owner died (seconds)
+LEASE_SECONDS = 30
+# Longest a process waits for another process's refresh before fetching itself
+LEASE_WAIT_SECONDS = 20
+LEASE_POLL_SECONDS = 0.2
+
+# Dead entries and leases are purged every this many writes
+PURGE_EVERY_WRITES = 100
+
+# A locked/busy database (another process mid-write) is retried this often
+# before the single operation is skipped
+OPERATION_ATTEMPTS = 3
+OPERATION_RETRY_SECONDS = 0.1
+
+
+class SharedCache:
+    """
+    Cache tier in a small SQLite file, consulted by every local process
+    before it calls the API, so data fetched by one process serves the
+    others until it expires.
+
+    Refreshes are owned through leases: before fetching a shared key a
+    process takes the key's lease (waiting while another process holds it),
+    then re-reads the entry, because the previous owner has usually just
+    stored it. Only the lease owner fetches, so upstream calls scale with
+    the data and not with the number of processes.
+
+    Values must be JSON-serialisable. If the file can't be opened (or isn't
+    a database) the tier disables itself and every process fetches on its
+    own, as before. Transient errors such as a locked database only skip
+    the operation at hand; a write that can't be applied drops the shared
+    entry so no process keeps serving data older than its own.
+    """
+
+    def __init__(self, enabled=SHARE_ACROSS_PROCESSES, db_path=SHARED_CACHE_DB):
+        """
+        Initialize the shared cache.
+
+        Args:
+            enabled: Use the shared file at all
+            db_path: Path of the shared cache file
+        """
+        self.db_path = db_path
+        self.enabled = enabled
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._writes = 0
+        self._pending_invalidations = set()  # keys whose drop failed; retried on later operations
+        self._stats = {
+            "hits": 0, "misses": 0, "writes": 0,
+            "leases_acquired": 0, "lease_waits": 0, "lease_timeouts": 0, "leases_skipped": 0,
+            "errors": 0
+        }
+        if enabled:
+            try:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                conn = self._connect()
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "expires_at REAL NOT NULL, stale_until REAL NOT NULL, negative INTEGER NOT NULL DEFAULT 0)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+            except (sqlite3.Error, OSError) as e:
+                self._disable(e)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.Error:
+                conn.close()
+                raise
+            self._local.conn = conn
+        return conn
+
+    def _disable(self, error):
+        if self.enabled:
+            logger.warning(f"Shared cache {self.db_path} unavailable, caching per process only: {error}")
+        self.enabled = False
+
+    def _run(self, operation, key, func):
+        """
+        Runs func(conn) against the shared file.
+
+        Operational errors (locked or busy database) are retried a few times,
+        then only this operation is skipped; any other database error means
+        the file is unusable and disables the tier.
+
+        Returns:
+            (True, result), or (False, None) if it wasn't applied
+        """
+        error = None
+        for attempt in range(OPERATION_ATTEMPTS):
+            if not self.enabled:
+                return False, None
+            if attempt:
+                time.sleep(OPERATION_RETRY_SECONDS)
+            try:
+                return True, func(self._connect())
+            except sqlite3.OperationalError as e:
+                error = e
+            except sqlite3.Error as e:
+                self._disable(e)
+                return False, None
+        self._count("errors")
+        logger.warning(f"Shared cache: skipped {operation} of {key}: {error}")
+        return False, None
+
+    def _retry_invalidations(self):
+        if not self._pending_invalidations:
+            return
+        with self._stats_lock:
+            keys = list(self._pending_invalidations)
+            self._pending_invalidations.clear()
+        for key in keys:
+            self.invalidate(key)
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    @staticmethod
+    def _owner():
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    def get(self, key):
+        """
+        Read a shared entry that is still fresh or within its stale window.
+
+        Returns:
+            (data, expires_at, stale_until, negative), or None
+        """
+        self._retry_invalidations()
+        ok, row = self._run("read", key, lambda conn: conn.execute(
+            "SELECT value, expires_at, stale_until, negative FROM entries WHERE key = ? AND stale_until > ?",
+            (key, time.time())
+        ).fetchone())
+        if not ok:
+            return None
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(row[0]), row[1], row[2], bool(row[3])
+
+    def set(self, key, data, expires_at, stale_until=None, negative=False):
+        """
+        Store an entry for every process.
+
+        Args:
+            key: Cache key
+            data: JSON-serialisable value
+            expires_at: Epoch seconds after which the entry is stale
+            stale_until: Epoch seconds after which it is dropped (default: expires_at)
+            negative: The entry records a failed fetch
+
+        Returns:
+            True if the entry was stored
+        """
+        if not self.enabled:
+            return False
+        try:
+            value = json.dumps(data, default=str)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Not sharing {key}: value is not serialisable ({e})")
+            self.invalidate(key)
+            return False
+        self._retry_invalidations()
+        ok, _ = self._run("write", key, lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at, stale_until, negative) VALUES (?, ?, ?, ?, ?)",
+            (key, value, expires_at, stale_until or expires_at, int(negative))
+        ))
+        if not ok:
+            # Don't leave an older shared copy in place of ours
+            self.invalidate(key)
+            return False
+        with self._stats_lock:
+            self._stats["writes"] += 1
+            self._writes += 1
+            purge = self._writes % PURGE_EVERY_WRITES == 0
+        if purge:
+            self.purge()
+        return True
+
+    def update(self, key, patch):
+        """
+        Atomically rewrite a shared entry: patch(data) returns the new data,
+        or None to drop the entry. Nothing happens if the key isn't shared.
+        If the rewrite can't be applied, the entry is dropped instead.
+
+        Returns:
+            True if the entry was rewritten (or there was nothing to rewrite)
+        """
+        if not self.enabled:
+            return False
+
+        def rewrite(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value FROM entries WHERE key = ? AND stale_until > ?", (key, time.time())
+                ).fetchone()
+                if row is not None:
+                    data = patch(json.loads(row[0]))
+                    if data is None:
+                        conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    else:
+                        conn.execute("UPDATE entries SET value = ? WHERE key = ?", (json.dumps(data, default=str), key))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        ok, _ = self._run("update", key, rewrite)
+        if not ok:
+            # Other processes treat the shared copy as authoritative: a missed
+            # write-through must not leave them serving the old data
+            self.invalidate(key)
+        return ok
+
+    def invalidate(self, key):
+        """
+        Drop an entry for every process. If that fails the drop is retried
+        before this process's next read or write.
+
+        Returns:
+            True if it was dropped
+        """
+        if not self.enabled:
+            return False
+        ok, _ = self._run("invalidate", key, lambda conn: conn.execute("DELETE FROM entries WHERE key = ?", (key,)))
+        if not ok and self.enabled:
+            logger.error(f"Shared cache: could not drop {key} yet; retrying on the next operation")
+            with self._stats_lock:
+                self._pending_invalidations.add(key)
+        return ok
+
+    def _try_lease(self, conn, key, owner, lease_seconds):
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+            taken = row is None or row[0] == owner or row[1] <= now
+            if taken:
+                conn.execute(
+                    "INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (key, owner, now + lease_seconds)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return taken
+
+    @contextmanager
+    def lease(self, key, wait=LEASE_WAIT_SECONDS, lease_seconds=LEASE_SECONDS):
+        """
+        Take the refresh lease of a key for the duration of the block.
+
+        While another process or thread holds it, waits up to `wait` seconds
+        (0 = don't wait). Yields True if the lease is ours, False if it
+        couldn't be taken; callers that still go ahead then fetch on their
+        own. With the tier disabled it always yields True.
+
+        Args:
+            key: Cache key being refreshed
+            wait: Seconds to wait for another owner to finish
+            lease_seconds: How long the lease survives a crashed owner
+        """
+        if not self.enabled:
+            yield True
+            return
+        owner = self._owner()
+        deadline = time.time() + wait
+        owned = False
+        waited = False
+        while True:
+            ok, taken = self._run("lease", key, lambda conn: self._try_lease(conn, key, owner, lease_seconds))
+            if not ok or taken:
+                # Without a usable lease table the caller just goes ahead
+                owned = True
+                break
+            if time.time() >= deadline:
+                break
+            waited = True
+            time.sleep(LEASE_POLL_SECONDS)
+        if owned:
+            self._count("leases_acquired")
+        else:
+            self._count("lease_timeouts" if wait else "leases_skipped")
+        if waited:
+            self._count("lease_waits")
+        try:
+            yield owned
+        finally:
+            if owned and self.enabled:
+                # If this fails the lease simply runs out after lease_seconds
+                self._run("lease release", key, lambda conn: conn.execute(
+                    "DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner)
+                ))
+
+    def purge(self):
+        """Delete dead entries and leases."""
+        if not self.enabled:
+            return
+        now = time.time()
+
+        def purge(conn):
+            conn.execute("DELETE FROM entries WHERE stale_until <= ?", (now,))
+            conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+
+        self._run("purge", "dead entries", purge)
+
+    def get_stats(self):
+        """Hits, misses, writes and lease activity of this process, plus the shared entry count."""
+        with self._stats_lock:
+            stats = dict(self._stats, enabled=self.enabled)
+        ok, entries = self._run("count", "entries", lambda conn: conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE stale_until > ?", (time.time(),)
+        ).fetchone()[0])
+        if ok:
+            stats["entries"] = entries
+        return stats
+
+
+# Global shared cache instance
+_shared_cache = SharedCache()
+
+
+def get_shared_cache():
+    """Get the global shared cache instance."""
+    return _shared_cache
+
+
+get_api_metrics().register_stats_provider("shared_cache", _shared_cache.get_stats)
@@ -13,6 +13,9 @@ class TokenCache:
         self._lock = threading.Lock()
         # Default token expiration is 55 minutes (tokens typically last 60 min)
         self.default_ttl_seconds = 55 * 60
+        # Stop handing out a token this long before it really expires, so a
+        # request started just before expiry doesn't fail with 401
+        self.expiry_margin_seconds = 60
     
     def get(self, account_name):
         """
@@ -32,8 +35,8 @@ class TokenCache:
             cached_entry = self._cache[account_name]
             expires_at = cached_entry["expires_at"]
             
-            # Check if token is still valid (with 5 minute buffer)
-            if time.time() >= expires_at:
+            # Check if token is still valid (with expiry margin)
+            if time.time() >= expires_at - self.expiry_margin_seconds:
                 logger.debug(f"Cached token for {account_name} has expired")
                 del self._cache[account_name]
                 return None
@@ -52,9 +55,18 @@ class TokenCache:
         """
         if ttl_seconds is None:
             ttl_seconds = self.default_ttl_seconds
-        
-        expires_at = time.time() + ttl_seconds
-        
+        self.set_with_expiry(account_name, token, time.time() + ttl_seconds)
+
+    def set_with_expiry(self, account_name, token, expires_at):
+        """
+        Store a token that expires at an absolute time (epoch seconds).
+
+        Args:
+            account_name: Name of the account
+            token: Authentication token
+            expires_at: When the token stops being valid
+        """
+        ttl_seconds = int(expires_at - time.time())
         with self._lock:
             self._cache[account_name] = {
                 "token": token,
@@ -62,6 +74,12 @@ class TokenCache:
             }
             logger.debug(f"Cached token for {account_name} (TTL: {ttl_seconds}s)")
     
+    def get_expires_at(self, account_name):
+        """Epoch seconds at which the account's cached token expires, or None."""
+        with self._lock:
+            entry = self._cache.get(account_name)
+            return entry["expires_at"] if entry else None
+
     def invalidate(self, account_name):
         """Remove a token from the cache."""
         with self._lock:
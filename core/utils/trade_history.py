@@ -1,6 +1,5 @@
 import matplotlib
 import threading
-import requests
 import logging
 import pytz
 import json
@@ -18,6 +17,7 @@ import pandas as pd
 
 from core.api.auth import fetch_token_with_retry
 from config import PLATFORM_ACCOUNTS, TRADE_COMPLETED_URL_NOONES, TRADE_HISTORY_DIR
+from core.utils.http_client import instrumented_request
 
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 # NOTE: do NOT call logging.basicConfig here — the root logger is already
@@ -93,7 +93,7 @@ def fetch_completed_trades(account, limit=1000):
         }
 
         try:
-            resp = requests.post(base_url, headers=headers,
+            resp = instrumented_request("POST", base_url, headers=headers,
                                  data=payload, timeout=30)
             resp.raise_for_status()
             json_data = resp.json()
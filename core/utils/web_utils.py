@@ -2,48 +2,39 @@ import os
 import json
 import logging
 from config import PAYMENT_ACCOUNTS_PATH, APP_SETTINGS_FILE
+from core.utils.config_service import get_config_service
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_APP_SETTINGS = {
+    "night_mode_enabled": False,
+    "afk_mode_enabled": False,
+    "verbose_logging_enabled": True,
+    "offers_enabled": False,
+    "wallet_alerts_enabled": True,
+    "force_welcome_chat_check": True,
+    # Minutes of owner silence required before auto-messages resume.
+    # If an owner sent a message less than this many minutes ago,
+    # all interactive bot replies are suppressed automatically.
+    "owner_active_suppression_minutes": 15
+}
+
+
 def get_app_settings():
     """Reads and ensures all keys are present in the settings file."""
     if not os.path.exists(APP_SETTINGS_FILE):
-        default_settings = {
-            "night_mode_enabled": False,
-            "afk_mode_enabled": False,
-            "verbose_logging_enabled": True,
-            "offers_enabled": False,
-            "wallet_alerts_enabled": True,
-            "force_welcome_chat_check": True,
-            # Minutes of owner silence required before auto-messages resume.
-            # If an owner sent a message less than this many minutes ago,
-            # all interactive bot replies are suppressed automatically.
-            "owner_active_suppression_minutes": 15
-        }
+        default_settings = dict(DEFAULT_APP_SETTINGS)
         with open(APP_SETTINGS_FILE, "w") as f:
             json.dump(default_settings, f)
         return default_settings
     try:
         with open(APP_SETTINGS_FILE, "r") as f:
             settings = json.load(f)
-            settings.setdefault("afk_mode_enabled", False)
-            settings.setdefault("night_mode_enabled", False)
-            settings.setdefault("verbose_logging_enabled", True)
-            settings.setdefault("offers_enabled", False)
-            settings.setdefault("wallet_alerts_enabled", True)
-            settings.setdefault("force_welcome_chat_check", True)
-            settings.setdefault("owner_active_suppression_minutes", 15)
+            for key, value in DEFAULT_APP_SETTINGS.items():
+                settings.setdefault(key, value)
             return settings
     except (json.JSONDecodeError, FileNotFoundError):
-        return {
-            "night_mode_enabled": False,
-            "afk_mode_enabled": False,
-            "verbose_logging_enabled": True,
-            "offers_enabled": False,
-            "wallet_alerts_enabled": True,
-            "force_welcome_chat_check": True,
-            "owner_active_suppression_minutes": 15
-        }
+        return dict(DEFAULT_APP_SETTINGS)
 
 def update_app_settings(new_settings):
     """Writes the updated settings to the file using an atomic replace to prevent corruption."""
@@ -58,6 +49,8 @@ def update_app_settings(new_settings):
         with os.fdopen(fd, "w") as f:
             json.dump(new_settings, f, indent=4)
         os.replace(tmp_path, APP_SETTINGS_FILE)
+        # Readers in this process see the change right away
+        get_config_service().reload_path(APP_SETTINGS_FILE)
     except Exception as e:
         logger.error(f"Failed to update settings file: {e}")
         try:
@@ -1,20 +1,22 @@
-import pytesseract
 import logging
-import json
 import cv2
+from PIL import Image
 import re
 import os
 import hashlib
+import time
 
 from datetime import datetime
-from PIL import Image
 
 from config import OCR_LOG_PATH
+from core.validation.ocr_cache import get_ocr_cache
+from core.validation.ocr_engine import get_ocr_engine, OCRTimeoutError
+from core.validation.receipt_registry import get_receipt_registry
+from core.validation.ocr_templates import get_template_engine, normalize_text
 
 logger = logging.getLogger(__name__)
 
 os.makedirs(OCR_LOG_PATH, exist_ok=True)
-RECEIPT_HASH_DB = os.path.join("data", "processed_receipts.json")
 DUPLICATE_LOG_PATH = os.path.join("data", "logs", "duplicate_receipts.log")
 
 def log_duplicate_receipt(trade_hash, owner_username, image_hash, previous_trade):
@@ -30,22 +32,14 @@ def log_duplicate_receipt(trade_hash, owner_username, image_hash, previous_trade
         )
         f.write(log_entry)
 
-def load_ocr_templates():
-    """Loads OCR keyword templates from a JSON file."""
-    try:
-        templates_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'config', 'ocr_templates.json')
-        with open(templates_path, 'r', encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error(f"Could not load or parse ocr_templates.json from the data/config folder: {e}")
-        return {"bank_templates": {}, "generic_amount_keywords": []}
+# Bump when preprocessing or the Tesseract config changes so cached OCR
+# results produced by the old pipeline are no longer used.
+OCR_PIPELINE_VERSION = "tiered-v2"
 
-OCR_TEMPLATES = load_ocr_templates()
 
-try:
-    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-except FileNotFoundError:
-    logger.warning("Tesseract executable not found. Update the path in ocr.py if needed.")
+def get_ocr_config_version():
+    """Version of the OCR pipeline and templates; part of every OCR cache key."""
+    return f"{OCR_PIPELINE_VERSION}:{get_template_engine().get().digest}"
 
 def hash_image(image_path):
     """Computes a SHA256 hash of an image file."""
@@ -60,32 +54,14 @@ def hash_image(image_path):
         return None
 
 def is_duplicate_receipt(image_hash, trade_hash, owner_username):
-    """Checks if a receipt with the given hash has been seen before."""
+    """Checks if a receipt with the given hash has been seen before in another trade."""
     if not image_hash:
         return False, None
 
-    try:
-        with open(RECEIPT_HASH_DB, "r") as f:
-            receipt_db = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        receipt_db = {}
-
-    if image_hash in receipt_db:
-        previous_trade = receipt_db[image_hash]
-        if previous_trade["trade_hash"] != trade_hash:
-            log_duplicate_receipt(trade_hash, owner_username, image_hash, previous_trade)
-            return True, previous_trade
-    
-    receipt_db[image_hash] = {
-        "trade_hash": trade_hash,
-        "owner_username": owner_username,
-        "timestamp": datetime.now().isoformat()
-    }
-    
-    with open(RECEIPT_HASH_DB, "w") as f:
-        json.dump(receipt_db, f, indent=4)
-        
-    return False, None
+    is_duplicate, previous_trade = get_receipt_registry().check_and_register(image_hash, trade_hash, owner_username)
+    if is_duplicate:
+        log_duplicate_receipt(trade_hash, owner_username, image_hash, previous_trade)
+    return is_duplicate, previous_trade
 
 
 def save_ocr_text(trade_hash, owner_username, text, identified_bank=None):
@@ -109,134 +85,226 @@ def save_ocr_text(trade_hash, owner_username, text, identified_bank=None):
     except Exception as e:
         logger.error(f"Failed to save OCR text for trade {trade_hash}: {e}")
 
-def preprocess_image_for_ocr(image_path):
-    """Applies pre-processing techniques to an image to improve OCR accuracy."""
+# Width band the fast tier resizes into: phone screenshots (~1080 px wide)
+# are left alone, small images are upscaled and large photos downscaled.
+_FAST_MIN_WIDTH = 1000
+_FAST_MAX_WIDTH = 2000
+# Total Tesseract time for one receipt across all tiers (the old single-pass
+# limit); a tier is only started if at least OCR_MIN_TIER_SECONDS are left
+OCR_TOTAL_TIMEOUT = 30  # seconds
+OCR_MIN_TIER_SECONDS = 2
+# Upper bound for the denoise tier's 2x upscale
+_DENOISE_MAX_WIDTH = 2400
+# The ROI tier falls back to the whole text bounding box when the largest
+# text block covers less than this share of the image.
+_ROI_MIN_AREA_RATIO = 0.2
+_ROI_PADDING = 10
+
+
+def load_image(image_path):
+    """Decodes an image from disk once so every preprocessing tier can reuse it."""
+    img = cv2.imread(image_path)
+    if img is None:
+        logger.error(f"Could not decode image {image_path}")
+    return img
+
+
+def _resize_to_width_band(img, min_width, max_width, max_scale=2.0):
+    width = img.shape[1]
+    if width < min_width:
+        scale = min(max_scale, min_width / width)
+        return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    if width > max_width:
+        scale = max_width / width
+        return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def _preprocess_fast(img):
+    """Resolution-aware resize, grayscale and Otsu binarization."""
+    img = _resize_to_width_band(img, _FAST_MIN_WIDTH, _FAST_MAX_WIDTH)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def _preprocess_denoise(img):
+    """2x upscale (capped) and bilateral denoising before Otsu, for noisy photos."""
+    scale = max(1.0, min(2.0, _DENOISE_MAX_WIDTH / img.shape[1]))
+    if scale > 1.0:
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # Applying a bilateral filter can reduce noise while keeping edges sharp.
+    denoised = cv2.bilateralFilter(gray, 9, 75, 75)
+    _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def _preprocess_roi(img):
+    """Crops to the main block of text (dropping status bars, logos and margins) and binarizes it."""
+    img = _resize_to_width_band(img, _FAST_MIN_WIDTH, _FAST_MAX_WIDTH)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, inverted = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    # Merge characters and lines into blocks
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 15))
+    blocks = cv2.dilate(inverted, kernel, iterations=2)
+    contours = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+
+    height, width = gray.shape
+    if contours:
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        if w * h < _ROI_MIN_AREA_RATIO * width * height:
+            x, y, w, h = cv2.boundingRect(cv2.findNonZero(inverted))
+        x0, y0 = max(0, x - _ROI_PADDING), max(0, y - _ROI_PADDING)
+        x1, y1 = min(width, x + w + _ROI_PADDING), min(height, y + h + _ROI_PADDING)
+        gray = gray[y0:y1, x0:x1]
+
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+# Preprocessing tiers, cheapest first: (name, preprocess function, Tesseract psm).
+# psm 6 assumes a single uniform block of text; psm 4 a single column of
+# text of variable sizes, which suits a cropped receipt body.
+OCR_TIERS = (
+    ("fast", _preprocess_fast, 6),
+    ("denoise", _preprocess_denoise, 6),
+    ("roi", _preprocess_roi, 4),
+)
+
+
+def preprocess_image_for_ocr(image_path, tier="fast"):
+    """Applies the pre-processing of one OCR tier to an image."""
     try:
-        img = cv2.imread(image_path)
+        img = load_image(image_path)
         if img is None:
             return None
-
-        # --- 1. Resize for Consistency ---
-        # Resizing can help standardize the input and improve performance.
-        img = cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-
-        # --- 2. Convert to Grayscale ---
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-        # --- 3. Noise Reduction ---
-        # Applying a bilateral filter can reduce noise while keeping edges sharp.
-        denoised = cv2.bilateralFilter(gray, 9, 75, 75)
-        
-        # --- 4. Binarization (Thresholding) ---
-        # Using OTSU's method to automatically find the optimal threshold value.
-        _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-        return binary
+        preprocess = next(func for name, func, _ in OCR_TIERS if name == tier)
+        return preprocess(img)
     except Exception as e:
         logger.error(f"An error occurred during image pre-processing for {image_path}: {e}")
         return None
 
-def normalize_text(text):
-    """Normalizes text by removing accents and converting to lowercase for better matching."""
-    if not text:
-        return ""
-    # Remove common Spanish accents
-    accent_map = {
-        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-        'Á': 'a', 'É': 'e', 'Í': 'i', 'Ó': 'o', 'Ú': 'u',
-        'ñ': 'n', 'Ñ': 'n',
-        '¡': '', '¿': ''
-    }
-    for accented, plain in accent_map.items():
-        text = text.replace(accented, plain)
-    return text.lower()
-
-def extract_text_from_image(image_path):
-    """Extracts text from an image using Tesseract OCR."""
+
+def _ocr_unpreprocessed(image_path, timings=None):
+    """
+    OCR of the image as PIL reads it, for files cv2 can't decode (the
+    tiers need a decoded array). Returns the text ('' on failure).
+    """
+    stage_start = time.perf_counter()
     try:
-        preprocessed_image = preprocess_image_for_ocr(image_path)
-        img_to_process = preprocessed_image if preprocessed_image is not None else Image.open(image_path)
-        # --- IMPROVED TESSERACT CONFIG ---
-        # 'psm 6' assumes a single uniform block of text.
-        # 'oem 3' is the default and most accurate engine.
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(img_to_process, config=custom_config, timeout=30)
-        logger.info(f"Successfully extracted text from {image_path}")
-        return text
-    except pytesseract.TesseractTimeoutError as e:
+        with Image.open(image_path) as pil_image:
+            pil_image.load()
+            text = get_ocr_engine().image_to_text(pil_image, psm=6, timeout=OCR_TOTAL_TIMEOUT)
+        logger.info(f"OCR of {image_path} fell back to the undecoded image")
+    except OCRTimeoutError as e:
         logger.error(f"Tesseract OCR timed out for image {image_path}: {e}")
-        return ""
+        text = ""
     except Exception as e:
         logger.error(f"Could not read or process image {image_path}: {e}")
-        return ""
+        text = ""
+    if timings is not None:
+        timings["tesseract"] = timings.get("tesseract", 0.0) + time.perf_counter() - stage_start
+    return text
+
+
+def iter_ocr_tiers(image_path, timings=None, img=None):
+    """
+    Runs OCR tier by tier, cheapest first. The image is decoded once and
+    shared by all tiers; the caller stops iterating as soon as a tier's text
+    is good enough, so heavier tiers only run when they are needed.
+
+    All tiers share one OCR_TOTAL_TIMEOUT: each tier's Tesseract call gets
+    what is left of it, and no further tier starts once less than
+    OCR_MIN_TIER_SECONDS remain. Images cv2 can't decode are read with PIL
+    and OCR'd once without preprocessing (tier 'pil').
+
+    Args:
+        image_path: Path of the receipt image
+        timings: Optional dict that accumulates per-stage durations in seconds
+                 ('preprocess' and 'tesseract') over all tiers that ran
+        img: The image already decoded with load_image, if the caller has it
+
+    Yields:
+        (tier_name, text, seconds) for every tier that ran, in order
+    """
+    if img is None:
+        img = load_image(image_path)
+    if img is None:
+        start = time.perf_counter()
+        text = _ocr_unpreprocessed(image_path, timings)
+        yield "pil", text, time.perf_counter() - start
+        return
+    engine = get_ocr_engine()
+    deadline = time.monotonic() + OCR_TOTAL_TIMEOUT
+    for tier_name, preprocess, psm in OCR_TIERS:
+        remaining = deadline - time.monotonic()
+        if remaining < OCR_MIN_TIER_SECONDS:
+            logger.warning(f"OCR time budget of {OCR_TOTAL_TIMEOUT}s spent for {image_path}; skipping the {tier_name} tier and beyond")
+            return
+        tier_start = time.perf_counter()
+        try:
+            preprocessed = preprocess(img)
+            stage_start = time.perf_counter()
+            if timings is not None:
+                timings["preprocess"] = timings.get("preprocess", 0.0) + stage_start - tier_start
+            text = engine.image_to_text(preprocessed, psm=psm, timeout=max(deadline - time.monotonic(), 1))
+            if timings is not None:
+                timings["tesseract"] = timings.get("tesseract", 0.0) + time.perf_counter() - stage_start
+        except OCRTimeoutError as e:
+            logger.error(f"Tesseract OCR timed out for image {image_path} ({tier_name} tier): {e}")
+            text = ""
+        except Exception as e:
+            logger.error(f"Could not process image {image_path} ({tier_name} tier): {e}")
+            text = ""
+        yield tier_name, text, time.perf_counter() - tier_start
+
+
+def extract_text_from_image(image_path, timings=None, image_hash=None):
+    """
+    Extracts text from an image using Tesseract OCR, escalating through the
+    preprocessing tiers until the text contains an amount.
+
+    Args:
+        image_path: Path of the receipt image
+        timings: Optional dict that receives per-stage durations in seconds
+                 ('preprocess' and 'tesseract')
+        image_hash: Optional SHA-256 of the image; when given, a cached OCR
+                    result for it is returned without running Tesseract
+    """
+    if image_hash:
+        cached = get_ocr_cache().get(image_hash, get_ocr_config_version())
+        if cached:
+            logger.info(f"Using cached OCR text for {image_path}")
+            return cached["text"]
+    best_text = ""
+    for tier_name, text, _ in iter_ocr_tiers(image_path, timings):
+        if _MONEY_PATTERN.search(text.lower()):
+            logger.info(f"Successfully extracted text from {image_path} ({tier_name} tier)")
+            return text
+        if len(text) > len(best_text):
+            best_text = text
+    return best_text
 
 def identify_bank_from_text(text):
     """Identifies the source bank using a detailed fingerprinting method."""
     if not text:
         return None
-    text_lower = text.lower()
-    text_normalized = normalize_text(text)  # Accent-insensitive matching
-    bank_templates = OCR_TEMPLATES.get("bank_templates", {})
-    
-    # --- Fingerprint Identification ---
-    best_match_bank = None
-    highest_score = 0
-
-    for bank_name, template in bank_templates.items():
-        fingerprint = template.get("fingerprint", [])
-        if not fingerprint:
-            continue
-
-        score = 0
-        for phrase in fingerprint:
-            phrase_normalized = normalize_text(phrase)
-            # Try both exact and normalized matching
-            if phrase.lower() in text_lower or phrase_normalized in text_normalized:
-                score += 1
-        
-        normalized_score = score / len(fingerprint) if len(fingerprint) > 0 else 0
-
-        if normalized_score > highest_score:
-            highest_score = normalized_score
-            best_match_bank = bank_name
-
-    # IMPROVED: Lowered threshold from 0.5 to 0.4 for better matching
-    if highest_score > 0.4:
-        logger.info(f"Identified bank via fingerprint: {best_match_bank} with score {highest_score:.2f}")
-        return best_match_bank
-
-    logger.warning("Fingerprint identification failed. Falling back to keyword search.")
-    
-    found_banks = set()
-    for bank_name, template in bank_templates.items():
-        if any(keyword.lower() in text_lower for keyword in template.get("keywords", [])):
-            found_banks.add(bank_name)
-
-    if not found_banks:
-        logger.warning("No known bank keywords found in the text.")
-        return None
-    
-    if len(found_banks) == 1:
-        source_bank = found_banks.pop()
-        logger.info(f"Identified the only available bank as SOURCE: {source_bank}")
-        return source_bank
-
-    return list(found_banks)[0] if found_banks else None
+    return ReceiptAnalysis(text).bank
 
 
-def find_details_with_parsers(text, identified_bank):
+def find_details_with_parsers(text, identified_bank, templates=None):
     """Attempts to extract details (amount, name) using bank-specific regex patterns."""
-    bank_template = OCR_TEMPLATES.get("bank_templates", {}).get(identified_bank, {})
-    parsers = bank_template.get("parsers", {})
+    if templates is None:
+        templates = get_template_engine().get()
+    bank_template = templates.by_name.get(identified_bank)
     found_details = {"amount": None, "name": None}
 
-    if not parsers:
+    if bank_template is None:
         return found_details
 
-    amount_parser = parsers.get("amount", {})
-    amount_pattern = amount_parser.get("pattern")
-    if amount_pattern:
-        match = re.search(amount_pattern, text, re.IGNORECASE | re.MULTILINE)
+    if bank_template.amount_pattern is not None:
+        match = bank_template.amount_pattern.search(text)
         if match:
             try:
                 # --- Handle amounts with or without decimals ---
@@ -248,10 +316,8 @@ def find_details_with_parsers(text, identified_bank):
             except (ValueError, IndexError):
                 logger.warning(f"[{identified_bank} Parser] Pattern matched but failed to extract amount from groups: {match.groups()}")
 
-    name_parser = parsers.get("name", {})
-    name_pattern = name_parser.get("pattern")
-    if name_pattern:
-        match = re.search(name_pattern, text, re.IGNORECASE | re.MULTILINE)
+    if bank_template.name_pattern is not None:
+        match = bank_template.name_pattern.search(text)
         if match:
             try:
                 found_details["name"] = match.group(1).strip()
@@ -261,86 +327,196 @@ def find_details_with_parsers(text, identified_bank):
 
     return found_details
 
-def find_amount_in_text(text, trade_amount):
-    """Finds amount, prioritizing bank-specific parsers then falling back to generic search."""
-    if not text:
+_UNSET = object()
+_MONEY_PATTERN = re.compile(r'\$\s*(\d{1,3}(?:,?\d{3})*(?:\.\d{2})?)\b')
+
+class ReceiptAnalysis:
+    """
+    One-pass analysis of a receipt's OCR text.
+
+    The text is lowercased and normalized once; bank fingerprint scores are
+    computed against the pre-normalized templates and the bank parsers run
+    at most once. Bank, amount and name lookups all share those results.
+    """
+
+    def __init__(self, text, identified_bank=_UNSET, parsed_details=None):
+        """
+        Args:
+            text: Raw OCR text
+            identified_bank: Bank identified earlier (e.g. from the OCR cache);
+                             skips identification when given, even if None
+            parsed_details: Parser results {"amount", "name"} from an earlier run
+        """
+        self.templates = get_template_engine().get()
+        self.text = text or ""
+        self.text_lower = self.text.lower()
+        self.text_normalized = normalize_text(self.text)
+        self._bank = identified_bank
+        self._parsed_details = parsed_details
+
+    def fingerprint_scores(self):
+        """Returns {bank_name: fraction of fingerprint phrases found in the text}."""
+        scores = {}
+        for bank in self.templates.banks:
+            if not bank.fingerprint:
+                continue
+            score = 0
+            for phrase_lower, phrase_normalized in bank.fingerprint:
+                # Try both exact and normalized matching
+                if phrase_lower in self.text_lower or phrase_normalized in self.text_normalized:
+                    score += 1
+            scores[bank.name] = score / len(bank.fingerprint)
+        return scores
+
+    @property
+    def bank(self):
+        """The identified source bank, or None."""
+        if self._bank is _UNSET:
+            self._bank = self._identify_bank() if self.text else None
+        return self._bank
+
+    def _identify_bank(self):
+        # --- Fingerprint Identification ---
+        best_match_bank = None
+        highest_score = 0
+        for bank_name, normalized_score in self.fingerprint_scores().items():
+            if normalized_score > highest_score:
+                highest_score = normalized_score
+                best_match_bank = bank_name
+
+        # IMPROVED: Lowered threshold from 0.5 to 0.4 for better matching
+        if highest_score > 0.4:
+            logger.info(f"Identified bank via fingerprint: {best_match_bank} with score {highest_score:.2f}")
+            return best_match_bank
+
+        logger.warning("Fingerprint identification failed. Falling back to keyword search.")
+
+        found_banks = set()
+        for bank in self.templates.banks:
+            if any(keyword in self.text_lower for keyword in bank.keywords):
+                found_banks.add(bank.name)
+
+        if not found_banks:
+            logger.warning("No known bank keywords found in the text.")
+            return None
+
+        if len(found_banks) == 1:
+            source_bank = found_banks.pop()
+            logger.info(f"Identified the only available bank as SOURCE: {source_bank}")
+            return source_bank
+
+        return list(found_banks)[0] if found_banks else None
+
+    @property
+    def parsed_details(self):
+        """Results of the bank-specific parsers: {"amount": float|None, "name": str|None}."""
+        if self._parsed_details is None:
+            if self.bank:
+                self._parsed_details = find_details_with_parsers(self.text, self.bank, self.templates)
+            else:
+                self._parsed_details = {"amount": None, "name": None}
+        return self._parsed_details
+
+    def find_amount(self, trade_amount):
+        """Finds amount, prioritizing bank-specific parsers then falling back to generic search."""
+        if not self.text:
+            return None
+        identified_bank = self.bank
+
+        if identified_bank:
+            parsed_amount = self.parsed_details.get("amount")
+            if parsed_amount is not None:
+                if float(parsed_amount) != float(trade_amount):
+                     logger.warning(f"Amount mismatch. Expected: {trade_amount}, Parser found: {parsed_amount}")
+                return parsed_amount
+
+        logger.info("Parser failed. Falling back to generic amount search.")
+        priority_keywords = list(self.templates.generic_amount_keywords)
+        if identified_bank:
+            bank_template = self.templates.by_name.get(identified_bank)
+            if bank_template and bank_template.amount_line_keyword:
+                priority_keywords.insert(0, bank_template.amount_line_keyword)
+
+        # _MONEY_PATTERN is flexible for amounts with or without decimals
+        all_amounts, priority_amounts = [], []
+
+        for line in self.text_lower.split('\n'):
+            found = _MONEY_PATTERN.findall(line)
+            if not found:
+                continue
+            is_priority = any(keyword in line for keyword in priority_keywords)
+            for amount_str in found:
+                amount = float(amount_str.replace(',', ''))
+                all_amounts.append(amount)
+                if is_priority:
+                    priority_amounts.append(amount)
+
+        expected_amount = float(trade_amount)
+        for amount in priority_amounts:
+            if amount == expected_amount:
+                logger.info(f"SUCCESS (Fallback): Found matching priority amount: {amount}")
+                return amount
+        for amount in all_amounts:
+            if amount == expected_amount:
+                logger.info(f"SUCCESS (Fallback): Found matching amount: {amount}")
+                return amount
+
+        if all_amounts:
+            closest_amount = min(all_amounts, key=lambda x: abs(x - expected_amount))
+            logger.warning(
+                f"Amount mismatch (Fallback). Expected: {expected_amount}, Found: {all_amounts}. "
+                f"Returning closest value: {closest_amount}"
+            )
+            return closest_amount
+
+        logger.warning(f"Could not find any amount in the text for trade amount {expected_amount}.")
         return None
-    identified_bank = identify_bank_from_text(text)
-    
-    if identified_bank:
-        parsed_details = find_details_with_parsers(text, identified_bank)
-        parsed_amount = parsed_details.get("amount")
-        if parsed_amount is not None:
-            if float(parsed_amount) != float(trade_amount):
-                 logger.warning(f"Amount mismatch. Expected: {trade_amount}, Parser found: {parsed_amount}")
-            return parsed_amount
-    
-    logger.info("Parser failed. Falling back to generic amount search.")
-    priority_keywords = [k.lower() for k in OCR_TEMPLATES.get("generic_amount_keywords", [])]
-    if identified_bank:
-        bank_template = OCR_TEMPLATES.get("bank_templates", {}).get(identified_bank, {})
-        kw = bank_template.get("parsers", {}).get("amount", {}).get("line_keyword")
-        if kw:
-            priority_keywords.insert(0, kw.lower())
-
-    # --- UPDATED REGEX: More flexible for amounts with or without decimals ---
-    money_pattern = r'\$\s*(\d{1,3}(?:,?\d{3})*(?:\.\d{2})?)\b'
-    all_amounts, priority_amounts = [], []
-
-    for line in text.lower().split('\n'):
-        found = re.findall(money_pattern, line)
-        if not found:
-            continue
-        is_priority = any(keyword in line for keyword in priority_keywords)
-        for amount_str in found:
-            amount = float(amount_str.replace(',', ''))
-            all_amounts.append(amount)
-            if is_priority:
-                priority_amounts.append(amount)
-
-    expected_amount = float(trade_amount)
-    for amount in priority_amounts:
-        if amount == expected_amount:
-            logger.info(f"SUCCESS (Fallback): Found matching priority amount: {amount}")
-            return amount
-    for amount in all_amounts:
-        if amount == expected_amount:
-            logger.info(f"SUCCESS (Fallback): Found matching amount: {amount}")
-            return amount
-            
-    if all_amounts:
-        closest_amount = min(all_amounts, key=lambda x: abs(x - expected_amount))
-        logger.warning(
-            f"Amount mismatch (Fallback). Expected: {expected_amount}, Found: {all_amounts}. "
-            f"Returning closest value: {closest_amount}"
-        )
-        return closest_amount
 
-    logger.warning(f"Could not find any amount in the text for trade amount {expected_amount}.")
-    return None
+    def find_name(self, name_keywords):
+        """Finds name, prioritizing bank-specific parsers then falling back to keyword search."""
+        if not self.text or not name_keywords:
+            return None
+
+        if self.bank:
+            parsed_name = self.parsed_details.get("name")
+            if parsed_name:
+                parsed_name_lower = parsed_name.lower()
+                for keyword in name_keywords:
+                    if keyword.lower() in parsed_name_lower:
+                        logger.info(f"SUCCESS: Parsed name '{parsed_name}' contains expected keyword '{keyword}'.")
+                        return parsed_name
+                logger.warning(f"Parsed name '{parsed_name}' did not contain expected keywords: {name_keywords}")
+
+        logger.info("Parser failed. Falling back to generic name keyword search.")
+        for keyword in name_keywords:
+            if re.search(r'\b' + re.escape(keyword) + r'\b', self.text, re.IGNORECASE):
+                logger.info(f"SUCCESS (Fallback): Found name keyword '{keyword}'.")
+                return keyword
+
+        logger.warning(f"Could not find any of the expected name keywords: {name_keywords}")
+        return None
+
+def _make_analysis(text, identified_bank, parsed_details):
+    """Builds a ReceiptAnalysis, reusing an earlier identification/parse when supplied."""
+    if parsed_details is None:
+        return ReceiptAnalysis(text)
+    return ReceiptAnalysis(text, identified_bank=identified_bank, parsed_details=parsed_details)
+
+def find_amount_in_text(text, trade_amount, identified_bank=None, parsed_details=None):
+    """
+    Finds amount, prioritizing bank-specific parsers then falling back to generic search.
+    Pass identified_bank and parsed_details to reuse an earlier identification/parse.
+    """
+    if not text:
+        return None
+    return _make_analysis(text, identified_bank, parsed_details).find_amount(trade_amount)
 
 
-def find_name_in_text(text, name_keywords):
-    """Finds name, prioritizing bank-specific parsers then falling back to keyword search."""
+def find_name_in_text(text, name_keywords, identified_bank=None, parsed_details=None):
+    """
+    Finds name, prioritizing bank-specific parsers then falling back to keyword search.
+    Pass identified_bank and parsed_details to reuse an earlier identification/parse.
+    """
     if not text or not name_keywords:
         return None
-    identified_bank = identify_bank_from_text(text)
-    
-    if identified_bank:
-        parsed_details = find_details_with_parsers(text, identified_bank)
-        parsed_name = parsed_details.get("name")
-        if parsed_name:
-            for keyword in name_keywords:
-                if keyword.lower() in parsed_name.lower():
-                    logger.info(f"SUCCESS: Parsed name '{parsed_name}' contains expected keyword '{keyword}'.")
-                    return parsed_name
-            logger.warning(f"Parsed name '{parsed_name}' did not contain expected keywords: {name_keywords}")
-    
-    logger.info("Parser failed. Falling back to generic name keyword search.")
-    for keyword in name_keywords:
-        if re.search(r'\b' + re.escape(keyword) + r'\b', text, re.IGNORECASE):
-            logger.info(f"SUCCESS (Fallback): Found name keyword '{keyword}'.")
-            return keyword
-            
-    logger.warning(f"Could not find any of the expected name keywords: {name_keywords}")
-    return None
\ No newline at end of file
+    return _make_analysis(text, identified_bank, parsed_details).find_name(name_keywords)
@@ -0,0 +1,168 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_DB = os.path.join("data", "ocr_cache.db")
+
+
+class OCRCache:
+    """
+    On-disk cache of OCR results keyed by image SHA-256 plus the OCR config
+    version. Stores the raw text, the identified bank and the parser-found
+    amount and name so a re-sent receipt skips preprocessing, Tesseract and
+    the parsers entirely. Bounded by entry count with LRU eviction.
+
+    Backed by SQLite so it can be shared by the OCR worker processes.
+    """
+
+    def __init__(self, db_path=OCR_CACHE_DB, max_entries=5000):
+        """
+        Initialize the OCR cache.
+
+        Args:
+            db_path: Path of the SQLite database file
+            max_entries: Maximum number of cached receipts before LRU eviction
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._hits = 0
+        self._misses = 0
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS ocr_cache (
+                            cache_key TEXT PRIMARY KEY,
+                            text TEXT NOT NULL,
+                            bank TEXT,
+                            amount REAL,
+                            name TEXT,
+                            created_at REAL NOT NULL,
+                            last_access REAL NOT NULL
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_access ON ocr_cache (last_access)")
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    @staticmethod
+    def _make_key(image_hash, config_version):
+        return f"{image_hash}:{config_version}"
+
+    def get(self, image_hash, config_version):
+        """
+        Get the cached OCR result for an image.
+
+        Args:
+            image_hash: SHA-256 hex digest of the image file
+            config_version: OCR config version the result must have been produced with
+
+        Returns:
+            Dict with 'text', 'bank', 'amount' and 'name', or None on a miss
+        """
+        if not image_hash:
+            return None
+        cache_key = self._make_key(image_hash, config_version)
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT text, bank, amount, name FROM ocr_cache WHERE cache_key = ?", (cache_key,)
+                ).fetchone()
+                if row is None:
+                    self._misses += 1
+                    return None
+                conn.execute("UPDATE ocr_cache SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"OCR cache lookup failed for {image_hash}: {e}")
+            return None
+
+        self._hits += 1
+        logger.debug(f"OCR cache hit for {image_hash}")
+        return {"text": row[0], "bank": row[1], "amount": row[2], "name": row[3]}
+
+    def set(self, image_hash, config_version, text, bank=None, amount=None, name=None):
+        """Store an OCR result, evicting the least recently used entries past max_entries."""
+        if not image_hash or not text:
+            return
+        cache_key = self._make_key(image_hash, config_version)
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO ocr_cache (cache_key, text, bank, amount, name, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (cache_key, text, bank, amount, name, now, now)
+                )
+                count = conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+                if count > self.max_entries:
+                    conn.execute(
+                        "DELETE FROM ocr_cache WHERE cache_key IN "
+                        "(SELECT cache_key FROM ocr_cache ORDER BY last_access ASC LIMIT ?)",
+                        (count - self.max_entries,)
+                    )
+                    logger.debug(f"Evicted {count - self.max_entries} least recently used OCR cache entries")
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not cache OCR result for {image_hash}: {e}")
+
+    def clear(self):
+        """Clear all cached OCR results."""
+        try:
+            conn = self._connect()
+            try:
+                count = conn.execute("DELETE FROM ocr_cache").rowcount
+                conn.commit()
+            finally:
+                conn.close()
+            logger.info(f"Cleared {count} cached OCR results")
+        except sqlite3.Error as e:
+            logger.error(f"Could not clear OCR cache: {e}")
+
+    def get_stats(self):
+        """Get cache statistics (hit/miss counters are per process)."""
+        total_requests = self._hits + self._misses
+        hit_rate = (self._hits / total_requests * 100) if total_requests > 0 else 0
+        try:
+            conn = self._connect()
+            try:
+                total_entries = conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            total_entries = None
+        return {
+            "total_entries": total_entries,
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": f"{hit_rate:.1f}%"
+        }
+
+
+# Global OCR cache instance
+_ocr_cache = OCRCache()
+
+
+def get_ocr_cache():
+    """Get the global OCR cache instance."""
+    return _ocr_cache
@@ -0,0 +1,164 @@
+import os
+import time
+import shutil
+import logging
+import threading
+
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# Override with the TESSERACT_CMD / TESSDATA_PREFIX environment variables;
+# without them the default Windows install is used, else tesseract on PATH
+TESSERACT_CMD = os.getenv("TESSERACT_CMD") or (
+    _DEFAULT_TESSERACT_CMD if os.path.exists(_DEFAULT_TESSERACT_CMD) else shutil.which("tesseract") or _DEFAULT_TESSERACT_CMD
+)
+TESSDATA_PATH = os.getenv("TESSDATA_PREFIX") or os.path.join(os.path.dirname(TESSERACT_CMD), 'tessdata')
+OCR_LANGUAGE = "eng"
+# Default per-image limit for one Tesseract call
+TESSERACT_TIMEOUT = 30  # seconds
+
+
+
+class OCRTimeoutError(RuntimeError):
+    """An OCR call ran past its timeout (raised by every engine)."""
+
+
+try:
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+except FileNotFoundError:
+    logger.warning("Tesseract executable not found. Set the TESSERACT_CMD environment variable if needed.")
+
+
+class PytesseractEngine:
+    """
+    Fallback engine: runs the tesseract executable once per image. Every call
+    spawns a process, reloads the language data and writes the image to a
+    temp file, so it is the slow path.
+    """
+
+    name = "pytesseract"
+
+    def image_to_text(self, image, psm=6, timeout=TESSERACT_TIMEOUT):
+        """
+        Run OCR on a preprocessed image.
+
+        Args:
+            image: Grayscale/binary numpy array (or PIL image)
+            psm: Tesseract page segmentation mode
+            timeout: Seconds before the tesseract process is killed
+
+        Returns:
+            Recognized text
+
+        Raises:
+            OCRTimeoutError: If the timeout is hit
+        """
+        try:
+            return pytesseract.image_to_string(image, config=f'--oem 3 --psm {psm}', timeout=timeout)
+        except RuntimeError as e:
+            # pytesseract signals its subprocess timeout with a bare RuntimeError
+            if "timeout" in str(e).lower():
+                raise OCRTimeoutError(str(e)) from e
+            raise
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine:
+    """
+    Long-lived libtesseract engine (tesserocr bindings). The language model is
+    loaded once per process and images are handed over as in-memory buffers,
+    with no subprocess and no temp file per receipt.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, language=OCR_LANGUAGE, tessdata_path=TESSDATA_PATH):
+        """
+        Initialize the engine and load the language data.
+
+        Args:
+            language: Tesseract language code(s), e.g. 'eng' or 'spa+eng'
+            tessdata_path: Directory with the traineddata files
+        """
+        kwargs = {"lang": language, "oem": tesserocr.OEM.DEFAULT}
+        if os.path.isdir(tessdata_path):
+            kwargs["path"] = tessdata_path
+        self._api = tesserocr.PyTessBaseAPI(**kwargs)
+        # The API object is not thread-safe
+        self._lock = threading.Lock()
+
+    def image_to_text(self, image, psm=6, timeout=TESSERACT_TIMEOUT):
+        """
+        Run OCR on a preprocessed image.
+
+        Args:
+            image: Grayscale/binary numpy array (or PIL image)
+            psm: Tesseract page segmentation mode
+            timeout: Seconds before libtesseract cancels recognition (its
+                     progress monitor deadline), so a bad image can't hold
+                     the pool worker
+
+        Returns:
+            Recognized text
+
+        Raises:
+            OCRTimeoutError: If the timeout is hit
+        """
+        with self._lock:
+            self._api.SetPageSegMode(psm)
+            if hasattr(image, "shape"):
+                height, width = image.shape[:2]
+                channels = image.shape[2] if image.ndim == 3 else 1
+                self._api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+            else:
+                self._api.SetImage(image)
+            if not self._api.Recognize(timeout=int(timeout * 1000) if timeout else 0):
+                self._api.Clear()
+                raise OCRTimeoutError(f"Tesseract recognition stopped after {timeout}s")
+            return self._api.GetUTF8Text()
+
+    def close(self):
+        with self._lock:
+            self._api.End()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _create_engine():
+    if tesserocr is not None:
+        try:
+            return TesserocrEngine()
+        except Exception as e:
+            logger.warning(f"Could not start tesserocr engine, falling back to pytesseract: {e}")
+    return PytesseractEngine()
+
+
+def get_ocr_engine():
+    """Get this process's OCR engine, creating (and warming) it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                start = time.perf_counter()
+                _engine = _create_engine()
+                logger.info(
+                    f"OCR engine '{_engine.name}' ready in {(time.perf_counter() - start) * 1000:.0f}ms "
+                    f"(pid {os.getpid()})"
+                )
+    return _engine
+
+
+def warm_ocr_engine():
+    """Process pool initializer: loads the OCR engine before the first receipt arrives."""
+    get_ocr_engine()
@@ -0,0 +1,387 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core.validation.ocr import (
+    ReceiptAnalysis,
+    get_ocr_config_version,
+    hash_image,
+    iter_ocr_tiers,
+    load_image
+)
+from core.validation.ocr_cache import get_ocr_cache
+from core.validation.ocr_engine import warm_ocr_engine
+from core.validation.receipt_similarity import compute_dhash
+from core.validation.ocr_templates import get_template_engine
+
+logger = logging.getLogger(__name__)
+
+_STAGES = ("queue_wait", "decode", "dhash", "preprocess", "tesseract", "bank", "parse", "amount", "name", "total")
+
+# The trading process owns the OCR pool; the Flask dashboard reads this file.
+OCR_STATS_FILE = os.path.join("data", "ocr_stats.json")
+_STATS_WRITE_INTERVAL = 30  # seconds
+# Results not merged by their trade within this window (e.g. the trade was
+# released meanwhile) are dropped.
+_RESULT_RETENTION_SECONDS = 60 * 60
+
+
+def _amount_resolved(analysis, trade_amount):
+    """A tier succeeds when a bank parser found the amount or the text contains the expected amount."""
+    if analysis.bank and analysis.parsed_details.get("amount") is not None:
+        return True
+    if trade_amount is None:
+        return False
+    found_amount = analysis.find_amount(trade_amount)
+    return found_amount is not None and float(found_amount) == float(trade_amount)
+
+
+def analyze_receipt(image_path, trade_amount, name_keywords=None, image_hash=None, use_cache=True):
+    """
+    Runs the full OCR pipeline for one receipt. Executed inside a pool process.
+
+    Preprocessing is tiered: the cheap tier runs first and heavier tiers only
+    run when the parsers could not find the amount in the text so far.
+    When a result for the same image digest and OCR config version is in the
+    OCR cache, preprocessing, Tesseract and the bank parsers are skipped.
+
+    The perceptual hash for near-duplicate detection is computed from the
+    same decoded image; it is None on a cache hit (the exact same file was
+    indexed when it was first seen).
+
+    Args:
+        use_cache: Set to False to always run the pipeline (benchmarks); the
+                   OCR cache is then neither read nor written.
+
+    Returns:
+        Dict with the raw text, identified bank, found amount/name, perceptual
+        hash, whether the OCR cache was hit, the tiers that ran and the
+        duration of every stage in seconds.
+    """
+    started_at = time.time()
+    timings = {}
+    tiers = []
+    ocr_cache = get_ocr_cache()
+    config_version = get_ocr_config_version()
+    if image_hash is None:
+        image_hash = hash_image(image_path)
+
+    dhash = None
+    cached = ocr_cache.get(image_hash, config_version) if use_cache else None
+    if cached:
+        analysis = ReceiptAnalysis(
+            cached["text"],
+            identified_bank=cached["bank"],
+            parsed_details={"amount": cached["amount"], "name": cached["name"]}
+        )
+    else:
+        stage_start = time.perf_counter()
+        img = load_image(image_path)
+        timings["decode"] = time.perf_counter() - stage_start
+        if img is not None:
+            stage_start = time.perf_counter()
+            dhash = compute_dhash(img)
+            timings["dhash"] = time.perf_counter() - stage_start
+
+        analysis = None
+        for tier_name, text, seconds in iter_ocr_tiers(image_path, timings, img=img):
+            candidate = ReceiptAnalysis(text)
+
+            # Properties are memoized; evaluate them here so each stage is timed
+            stage_start = time.perf_counter()
+            candidate.bank
+            timings["bank"] = timings.get("bank", 0.0) + time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            candidate.parsed_details
+            timings["parse"] = timings.get("parse", 0.0) + time.perf_counter() - stage_start
+
+            resolved = _amount_resolved(candidate, trade_amount)
+            tiers.append({"tier": tier_name, "seconds": seconds, "success": resolved})
+            # Without a resolved amount, keep the tier that read the most text.
+            if resolved or analysis is None or len(candidate.text) > len(analysis.text):
+                analysis = candidate
+            if resolved:
+                break
+        if analysis is None:
+            analysis = ReceiptAnalysis("")
+
+        if use_cache:
+            ocr_cache.set(
+                image_hash, config_version, analysis.text, analysis.bank,
+                analysis.parsed_details.get("amount"), analysis.parsed_details.get("name")
+            )
+
+    stage_start = time.perf_counter()
+    found_amount = analysis.find_amount(trade_amount) if trade_amount is not None else None
+    timings["amount"] = time.perf_counter() - stage_start
+
+    found_name = None
+    if name_keywords:
+        stage_start = time.perf_counter()
+        found_name = analysis.find_name(name_keywords)
+        timings["name"] = time.perf_counter() - stage_start
+
+    return {
+        "image_path": image_path,
+        "image_hash": image_hash,
+        "text": analysis.text,
+        "bank": analysis.bank,
+        "amount": found_amount,
+        "name": found_name,
+        "dhash": dhash,
+        "parsed_amount": analysis.parsed_details.get("amount"),
+        "parsed": {
+            "amount": analysis.parsed_details.get("amount") is not None,
+            "name": analysis.parsed_details.get("name") is not None
+        },
+        "cache_hit": bool(cached),
+        "tiers": tiers,
+        "started_at": started_at,
+        "timings": timings
+    }
+
+
+class OCRService:
+    """
+    Runs receipt OCR in a process pool so trading threads never block on
+    OpenCV/Tesseract. Trades submit a receipt with a callback and move on;
+    the callback fires once the result is ready and the result is also kept
+    until the owning trade merges it into its state on its next cycle.
+    """
+
+    def __init__(self, max_workers=None):
+        """
+        Initialize the OCR service. The process pool is created lazily on the
+        first submission so importing this module never spawns processes.
+
+        Args:
+            max_workers: Number of OCR processes (default: number of CPU cores)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Callbacks do disk and notification work; keep them off the pool's
+        # internal result-handling thread.
+        self._callback_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ocr-merge")
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._cache_hits = 0
+        self._stage_totals = defaultdict(float)
+        self._stage_max = defaultdict(float)
+        self._stage_counts = defaultdict(int)
+        self._tier_stats = defaultdict(lambda: {"attempts": 0, "successes": 0, "resolved": 0, "total": 0.0, "max": 0.0})
+        self._results = defaultdict(list)  # {trade_hash: [result, ...]}
+        self._stats_written_at = 0.0
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # Each worker loads the OCR engine once and keeps it warm
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=warm_ocr_engine)
+                logger.info(f"Started OCR process pool with {self.max_workers} workers")
+            return self._pool
+
+    def _discard_pool(self, pool):
+        """
+        Drops a pool whose worker died (native Tesseract crash, OOM kill) so the
+        next submission starts a fresh one. Another thread may already have
+        replaced it; only the pool that broke is discarded.
+        """
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        logger.error("OCR process pool is broken (a worker died). Starting a new pool on the next receipt.")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, trade_hash, image_path, trade_amount, name_keywords=None, on_result=None, image_hash=None):
+        """
+        Queues a receipt for OCR and returns immediately.
+
+        Args:
+            trade_hash: Trade the receipt belongs to
+            image_path: Path of the downloaded receipt
+            trade_amount: Expected fiat amount, used to pick the best amount match
+            name_keywords: Optional list of expected account-holder names
+            on_result: Optional callable(result) invoked when OCR finishes.
+                       result is None if the job failed.
+            image_hash: SHA-256 of the image if already known (OCR cache key)
+
+        Returns:
+            The concurrent.futures.Future of the job
+
+        Raises:
+            BrokenProcessPool: If a freshly started pool breaks as well
+            RuntimeError: If the service was shut down
+        """
+        submitted_at = time.time()
+        with self._lock:
+            self._pending += 1
+            self._submitted += 1
+
+        try:
+            pool = self._get_pool()
+            try:
+                future = pool.submit(analyze_receipt, image_path, trade_amount, name_keywords, image_hash)
+            except BrokenProcessPool:
+                # The pool broke since the last receipt; retry once on a new one.
+                self._discard_pool(pool)
+                pool = self._get_pool()
+                future = pool.submit(analyze_receipt, image_path, trade_amount, name_keywords, image_hash)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self._submitted -= 1
+            raise
+
+        future.add_done_callback(
+            lambda f: self._callback_executor.submit(self._finish, f, pool, trade_hash, submitted_at, on_result)
+        )
+        logger.debug(f"Queued receipt {image_path} for trade {trade_hash} (queue depth: {self.get_queue_depth()})")
+        return future
+
+    def _finish(self, future, pool, trade_hash, submitted_at, on_result):
+        result = None
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            logger.error(f"OCR job failed for trade {trade_hash}: {e}")
+            self._discard_pool(pool)
+        except Exception as e:
+            logger.error(f"OCR job failed for trade {trade_hash}: {e}")
+
+        with self._lock:
+            self._pending -= 1
+            if result is None:
+                self._failed += 1
+            else:
+                self._completed += 1
+                if result.get("cache_hit"):
+                    self._cache_hits += 1
+                timings = result["timings"]
+                timings["queue_wait"] = max(0.0, result["started_at"] - submitted_at)
+                timings["total"] = time.time() - submitted_at
+                result["finished_at"] = time.time()
+                for stage, seconds in timings.items():
+                    self._stage_totals[stage] += seconds
+                    self._stage_counts[stage] += 1
+                    self._stage_max[stage] = max(self._stage_max[stage], seconds)
+                for tier in result.get("tiers", []):
+                    tier_stats = self._tier_stats[tier["tier"]]
+                    tier_stats["attempts"] += 1
+                    tier_stats["successes"] += int(tier["success"])
+                    tier_stats["total"] += tier["seconds"]
+                    tier_stats["max"] = max(tier_stats["max"], tier["seconds"])
+                if result.get("tiers") and result["tiers"][-1]["success"]:
+                    self._tier_stats[result["tiers"][-1]["tier"]]["resolved"] += 1
+                self._results[trade_hash].append(result)
+                self._prune_results()
+
+        if result is not None:
+            # Template counters live in this (parent) process, not the pool workers.
+            parsed = result.get("parsed", {})
+            get_template_engine().record_match(result.get("bank"), parsed.get("amount"), parsed.get("name"))
+
+        if on_result:
+            try:
+                on_result(result)
+            except Exception as e:
+                logger.error(f"OCR result callback failed for trade {trade_hash}: {e}", exc_info=True)
+
+        if time.time() - self._stats_written_at >= _STATS_WRITE_INTERVAL:
+            self.save_stats()
+
+    def _prune_results(self):
+        """Drops unmerged results past retention. Caller must hold self._lock."""
+        cutoff = time.time() - _RESULT_RETENTION_SECONDS
+        for key in [k for k, v in self._results.items() if v[-1]["finished_at"] < cutoff]:
+            del self._results[key]
+
+    def pop_results(self, trade_hash):
+        """Returns and forgets all finished OCR results for a trade."""
+        with self._lock:
+            return self._results.pop(trade_hash, [])
+
+    def get_queue_depth(self):
+        """Number of receipts submitted but not finished yet."""
+        with self._lock:
+            return self._pending
+
+    def get_stats(self):
+        """Get queue statistics and per-stage timings (milliseconds)."""
+        with self._lock:
+            stages = {}
+            for stage in _STAGES:
+                count = self._stage_counts.get(stage, 0)
+                if not count:
+                    continue
+                stages[stage] = {
+                    "avg_ms": round(self._stage_totals[stage] / count * 1000, 1),
+                    "max_ms": round(self._stage_max[stage] * 1000, 1),
+                    "count": count
+                }
+            tiers = {
+                name: {
+                    "attempts": tier_stats["attempts"],
+                    "success_rate": f"{tier_stats['successes'] / tier_stats['attempts'] * 100:.1f}%",
+                    "resolved": tier_stats["resolved"],
+                    "avg_ms": round(tier_stats["total"] / tier_stats["attempts"] * 1000, 1),
+                    "max_ms": round(tier_stats["max"] * 1000, 1)
+                }
+                for name, tier_stats in self._tier_stats.items() if tier_stats["attempts"]
+            }
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self._pending,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "cache_hits": self._cache_hits,
+                "stages": stages,
+                "tiers": tiers,
+                "templates": get_template_engine().get_stats()
+            }
+
+    def save_stats(self, filepath=OCR_STATS_FILE):
+        """Writes the current stats to a JSON file so other processes can read them."""
+        self._stats_written_at = time.time()
+        try:
+            stats = self.get_stats()
+            stats["updated_at"] = self._stats_written_at
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            temp_path = f"{filepath}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(stats, f, indent=4)
+            os.replace(temp_path, filepath)
+        except Exception as e:
+            logger.warning(f"Could not save OCR stats: {e}")
+
+    def shutdown(self):
+        """Stop the worker processes, letting queued receipts finish."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+        self._callback_executor.shutdown(wait=True)
+        self.save_stats()
+
+
+# Global OCR service instance
+_ocr_service = OCRService()
+atexit.register(_ocr_service.shutdown)
+
+
+def get_ocr_service():
+    """Get the global OCR service instance."""
+    return _ocr_service
@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from types import MappingProxyType
+from collections import namedtuple, defaultdict
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'config', 'ocr_templates.json')
+
+# How often get() may stat the templates file to look for changes
+_MTIME_CHECK_INTERVAL = 1.0  # seconds
+
+_PARSER_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Remove common Spanish accents
+_ACCENT_TABLE = str.maketrans({
+    'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
+    'Á': 'a', 'É': 'e', 'Í': 'i', 'Ó': 'o', 'Ú': 'u',
+    'ñ': 'n', 'Ñ': 'n',
+    '¡': '', '¿': ''
+})
+
+
+def normalize_text(text):
+    """Normalizes text by removing accents and converting to lowercase for better matching."""
+    if not text:
+        return ""
+    return text.translate(_ACCENT_TABLE).lower()
+
+
+# fingerprint: tuple of (phrase_lower, phrase_normalized)
+# keywords: tuple of lowercased keywords
+# amount_pattern / name_pattern: compiled regex or None
+BankTemplate = namedtuple(
+    "BankTemplate",
+    ["name", "fingerprint", "keywords", "amount_pattern", "amount_line_keyword", "name_pattern"]
+)
+
+# banks: tuple of BankTemplate in file order; by_name: read-only {name: BankTemplate}
+CompiledTemplates = namedtuple(
+    "CompiledTemplates",
+    ["banks", "by_name", "generic_amount_keywords", "digest", "mtime"]
+)
+
+
+def _compile_pattern(bank_name, field, pattern):
+    if not pattern:
+        return None
+    if not isinstance(pattern, str):
+        raise ValueError(f"{bank_name}: {field} pattern must be a string")
+    try:
+        compiled = re.compile(pattern, _PARSER_FLAGS)
+    except re.error as e:
+        raise ValueError(f"{bank_name}: invalid {field} pattern {pattern!r}: {e}")
+    if compiled.groups < 1:
+        raise ValueError(f"{bank_name}: {field} pattern {pattern!r} needs a capture group")
+    return compiled
+
+
+def compile_templates(raw, mtime=None):
+    """
+    Validates raw template JSON and compiles it into an immutable CompiledTemplates.
+
+    Raises:
+        ValueError: if the structure is invalid or a regex does not compile
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("templates root must be an object")
+    bank_templates = raw.get("bank_templates", {})
+    if not isinstance(bank_templates, dict):
+        raise ValueError("'bank_templates' must be an object")
+    generic_keywords = raw.get("generic_amount_keywords", [])
+    if not isinstance(generic_keywords, list) or not all(isinstance(k, str) for k in generic_keywords):
+        raise ValueError("'generic_amount_keywords' must be a list of strings")
+
+    banks = []
+    for bank_name, template in bank_templates.items():
+        if not isinstance(template, dict):
+            raise ValueError(f"{bank_name}: template must be an object")
+        fingerprint = template.get("fingerprint", [])
+        keywords = template.get("keywords", [])
+        for field, values in (("fingerprint", fingerprint), ("keywords", keywords)):
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"{bank_name}: '{field}' must be a list of strings")
+        parsers = template.get("parsers", {}) or {}
+        amount_parser = parsers.get("amount", {}) or {}
+        name_parser = parsers.get("name", {}) or {}
+        line_keyword = amount_parser.get("line_keyword")
+
+        banks.append(BankTemplate(
+            name=bank_name,
+            fingerprint=tuple((phrase.lower(), normalize_text(phrase)) for phrase in fingerprint),
+            keywords=tuple(keyword.lower() for keyword in keywords),
+            amount_pattern=_compile_pattern(bank_name, "amount", amount_parser.get("pattern")),
+            amount_line_keyword=line_keyword.lower() if line_keyword else None,
+            name_pattern=_compile_pattern(bank_name, "name", name_parser.get("pattern"))
+        ))
+
+    digest = hashlib.sha256(json.dumps(raw, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return CompiledTemplates(
+        banks=tuple(banks),
+        by_name=MappingProxyType({bank.name: bank for bank in banks}),
+        generic_amount_keywords=tuple(k.lower() for k in generic_keywords),
+        digest=digest,
+        mtime=mtime
+    )
+
+
+_EMPTY_TEMPLATES = compile_templates({"bank_templates": {}, "generic_amount_keywords": []})
+
+
+class OCRTemplateEngine:
+    """
+    Holds the compiled OCR templates and swaps in a new compiled set when the
+    templates file changes on disk (mtime watch, no restart needed). A file
+    that fails validation is rejected and the previous templates stay active.
+    Also counts per-bank matches so hot and dead templates can be spotted.
+    """
+
+    def __init__(self, path=TEMPLATES_PATH):
+        self.path = path
+        self._templates = _EMPTY_TEMPLATES
+        self._reload_lock = threading.Lock()
+        self._last_check = 0.0
+        self._rejected_mtime = None
+        self._counters_lock = threading.Lock()
+        self._counters = defaultdict(lambda: {"identified": 0, "amount_parsed": 0, "name_parsed": 0})
+        self._reload()
+
+    def _reload(self):
+        """Loads and compiles the templates file. Caller holds _reload_lock or is __init__."""
+        mtime = None
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, 'r', encoding="utf-8") as f:
+                raw = json.load(f)
+            compiled = compile_templates(raw, mtime=mtime)
+        except (OSError, json.JSONDecodeError, ValueError) as e:
+            logger.error(f"Could not load or validate OCR templates from {self.path}: {e}")
+            # Don't retry the same broken file every check interval.
+            self._rejected_mtime = mtime
+            return False
+        # Single reference assignment: readers see either the old or the new set.
+        self._templates = compiled
+        logger.info(f"Loaded {len(compiled.banks)} OCR bank templates (version {compiled.digest})")
+        return True
+
+    def get(self):
+        """Returns the current CompiledTemplates, reloading first if the file changed."""
+        now = time.monotonic()
+        if now - self._last_check >= _MTIME_CHECK_INTERVAL and self._reload_lock.acquire(blocking=False):
+            try:
+                self._last_check = now
+                try:
+                    mtime = os.path.getmtime(self.path)
+                except OSError:
+                    mtime = None
+                if mtime is not None and mtime not in (self._templates.mtime, self._rejected_mtime):
+                    logger.info("OCR templates file changed on disk. Reloading.")
+                    self._reload()
+            finally:
+                self._reload_lock.release()
+        return self._templates
+
+    def record_match(self, bank_name, amount_parsed=False, name_parsed=False):
+        """Counts one identified receipt for a bank and whether its parsers matched."""
+        if not bank_name:
+            return
+        with self._counters_lock:
+            counters = self._counters[bank_name]
+            counters["identified"] += 1
+            if amount_parsed:
+                counters["amount_parsed"] += 1
+            if name_parsed:
+                counters["name_parsed"] += 1
+
+    def get_stats(self):
+        """Per-bank match counters; banks never identified are listed as dead."""
+        templates = self._templates
+        with self._counters_lock:
+            by_bank = {name: dict(counters) for name, counters in self._counters.items()}
+        return {
+            "version": templates.digest,
+            "banks": by_bank,
+            "dead_templates": [bank.name for bank in templates.banks if bank.name not in by_bank]
+        }
+
+
+# Global template engine instance
+_template_engine = OCRTemplateEngine()
+
+
+def get_template_engine():
+    """Get the global OCR template engine instance."""
+    return _template_engine
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_REGISTRY_DB = os.path.join("data", "receipt_registry.db")
+# Stores replaced by the registry; imported once, then renamed to *.migrated
+LEGACY_RECEIPT_HASH_DB = os.path.join("data", "processed_receipts.json")
+LEGACY_RECEIPT_PHASH_DB = os.path.join("data", "receipt_phashes.jsonl")
+
+RECEIPT_RETENTION_DAYS = 365
+_PURGE_INTERVAL = 60 * 60  # seconds
+
+
+class ReceiptRegistry:
+    """
+    Registry of every receipt seen, keyed by image SHA-256. Lookups are a
+    primary-key probe and registration is a single INSERT OR IGNORE, so
+    concurrent checks from worker threads (or processes) never overwrite
+    each other and cost the same however many receipts are stored. Rows
+    older than the retention window are purged periodically.
+
+    Also stores each receipt's perceptual hash and OCR amount for the
+    near-duplicate index.
+    """
+
+    def __init__(self, db_path=RECEIPT_REGISTRY_DB, retention_days=RECEIPT_RETENTION_DAYS):
+        """
+        Initialize the receipt registry.
+
+        Args:
+            db_path: Path of the SQLite database file
+            retention_days: Receipts older than this are purged
+        """
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._last_purge = 0.0
+        # Bumped whenever this process purges rows, so in-memory indexes
+        # built from the registry know to rebuild
+        self.purge_generation = 0
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS receipts (
+                            image_hash TEXT PRIMARY KEY,
+                            trade_hash TEXT NOT NULL,
+                            owner_username TEXT,
+                            timestamp TEXT NOT NULL,
+                            created_at REAL NOT NULL,
+                            dhash TEXT,
+                            amount REAL
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_receipts_created_at ON receipts (created_at)")
+                    conn.commit()
+                    self._migrate_legacy(conn)
+                    self._initialized = True
+        return conn
+
+    def _migrate_legacy(self, conn):
+        """Imports processed_receipts.json and receipt_phashes.jsonl, then renames them."""
+        if os.path.exists(LEGACY_RECEIPT_HASH_DB):
+            try:
+                with open(LEGACY_RECEIPT_HASH_DB, "r") as f:
+                    receipt_db = json.load(f)
+                rows = []
+                for image_hash, info in receipt_db.items():
+                    timestamp = info.get("timestamp") or datetime.now().isoformat()
+                    try:
+                        created_at = datetime.fromisoformat(timestamp).timestamp()
+                    except ValueError:
+                        created_at = time.time()
+                    rows.append((image_hash, info.get("trade_hash", ""), info.get("owner_username"), timestamp, created_at))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO receipts (image_hash, trade_hash, owner_username, timestamp, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)", rows
+                )
+                conn.commit()
+                os.replace(LEGACY_RECEIPT_HASH_DB, f"{LEGACY_RECEIPT_HASH_DB}.migrated")
+                logger.info(f"Migrated {len(rows)} receipts from {LEGACY_RECEIPT_HASH_DB} to the receipt registry")
+            except (OSError, ValueError, AttributeError, sqlite3.Error) as e:
+                logger.error(f"Could not migrate {LEGACY_RECEIPT_HASH_DB}: {e}")
+
+        if os.path.exists(LEGACY_RECEIPT_PHASH_DB):
+            try:
+                count = 0
+                with open(LEGACY_RECEIPT_PHASH_DB, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        self._upsert_perceptual_hash(
+                            conn, entry["image_hash"], entry["trade_hash"], entry.get("owner_username"),
+                            entry["dhash"], entry.get("amount"), entry.get("timestamp")
+                        )
+                        count += 1
+                conn.commit()
+                os.replace(LEGACY_RECEIPT_PHASH_DB, f"{LEGACY_RECEIPT_PHASH_DB}.migrated")
+                logger.info(f"Migrated {count} perceptual hashes from {LEGACY_RECEIPT_PHASH_DB} to the receipt registry")
+            except (OSError, KeyError, sqlite3.Error) as e:
+                logger.error(f"Could not migrate {LEGACY_RECEIPT_PHASH_DB}: {e}")
+
+    def check_and_register(self, image_hash, trade_hash, owner_username):
+        """
+        Registers a receipt, or reports the trade it was first seen in.
+
+        Returns:
+            (is_duplicate, previous_trade_info) where previous_trade_info is a
+            dict with trade_hash, owner_username and timestamp, or None
+        """
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO receipts (image_hash, trade_hash, owner_username, timestamp, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (image_hash, trade_hash, owner_username, datetime.now().isoformat(), now)
+                ).rowcount
+                conn.commit()
+                row = None
+                if not inserted:
+                    row = conn.execute(
+                        "SELECT trade_hash, owner_username, timestamp FROM receipts WHERE image_hash = ?",
+                        (image_hash,)
+                    ).fetchone()
+                if now - self._last_purge >= _PURGE_INTERVAL:
+                    self._purge_expired(conn, now)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Receipt registry check failed for {image_hash}: {e}")
+            return False, None
+
+        if row is None or row[0] == trade_hash:
+            return False, None
+        return True, {"trade_hash": row[0], "owner_username": row[1], "timestamp": row[2]}
+
+    def _purge_expired(self, conn, now):
+        self._last_purge = now
+        cutoff = now - self.retention_days * 86400
+        removed = conn.execute("DELETE FROM receipts WHERE created_at < ?", (cutoff,)).rowcount
+        conn.commit()
+        if removed:
+            self.purge_generation += 1
+            logger.info(f"Purged {removed} receipts older than {self.retention_days} days from the receipt registry")
+
+    def has_receipt(self, image_hash):
+        """
+        Whether a receipt is still registered (not purged, possibly by
+        another process). Errs on the side of True if the registry can't be read.
+        """
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT 1 FROM receipts WHERE image_hash = ?", (image_hash,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Receipt registry lookup failed for {image_hash}: {e}")
+            return True
+        return row is not None
+
+    @staticmethod
+    def _upsert_perceptual_hash(conn, image_hash, trade_hash, owner_username, dhash, amount, timestamp=None):
+        timestamp = timestamp or datetime.now().isoformat()
+        conn.execute(
+            "INSERT OR IGNORE INTO receipts (image_hash, trade_hash, owner_username, timestamp, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (image_hash, trade_hash, owner_username, timestamp, time.time())
+        )
+        conn.execute("UPDATE receipts SET dhash = ?, amount = ? WHERE image_hash = ?", (dhash, amount, image_hash))
+
+    def set_perceptual_hash(self, image_hash, trade_hash, owner_username, dhash, amount=None):
+        """Stores a receipt's perceptual hash (hex) and OCR amount."""
+        try:
+            conn = self._connect()
+            try:
+                self._upsert_perceptual_hash(conn, image_hash, trade_hash, owner_username, dhash, amount)
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not store perceptual hash for {image_hash}: {e}")
+
+    def get_perceptual_hashes(self):
+        """Returns every stored perceptual hash as a list of receipt info dicts."""
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT image_hash, trade_hash, owner_username, timestamp, dhash, amount "
+                    "FROM receipts WHERE dhash IS NOT NULL"
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not load perceptual hashes: {e}")
+            return []
+        return [
+            {"image_hash": r[0], "trade_hash": r[1], "owner_username": r[2], "timestamp": r[3], "dhash": r[4], "amount": r[5]}
+            for r in rows
+        ]
+
+
+# Global receipt registry instance
+_receipt_registry = ReceiptRegistry()
+
+
+def get_receipt_registry():
+    """Get the global receipt registry instance."""
+    return _receipt_registry
@@ -0,0 +1,185 @@
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+from core.validation.receipt_registry import get_receipt_registry
+
+logger = logging.getLogger(__name__)
+
+# 16x16 dHash = 256 bits: fine enough that two different receipts from the
+# same banking app (same layout, different text) stay far apart.
+DHASH_SIZE = 16
+DHASH_BITS = DHASH_SIZE * DHASH_SIZE
+# Re-screenshots and re-compressions of the same receipt land within a few bits
+NEAR_DUPLICATE_MAX_DISTANCE = 12
+
+
+def compute_dhash(img, hash_size=DHASH_SIZE):
+    """
+    Computes a difference hash from an already-decoded OpenCV (BGR or gray) image.
+
+    Returns:
+        The hash as an int of hash_size * hash_size bits
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    diff = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(diff.flatten()).tobytes(), "big")
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def similarity_from_distance(distance, bits=DHASH_BITS):
+    """Hamming distance as a 0..1 similarity score."""
+    return 1.0 - distance / bits
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes with Hamming distance. Radius
+    lookups only visit children whose edge distance is within the radius of
+    the query's distance to the node, so they stay sub-linear in the number
+    of stored hashes.
+    """
+
+    def __init__(self):
+        self._root = None  # [hash, [items], {distance: child}]
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """Returns [(distance, item), ...] for all items within max_distance, closest first."""
+        if self._root is None:
+            return []
+        matches = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                matches.extend((distance, item) for item in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for edge, child in node[2].items() if low <= edge <= high)
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+class ReceiptSimilarityIndex:
+    """
+    Perceptual-hash index of every receipt seen, for catching re-screenshotted
+    or re-compressed copies of old receipts that the SHA-256 check misses.
+    Hashes are persisted in the receipt registry and loaded into a BK-tree
+    on first use. The tree is rebuilt from the registry after the registry
+    purges old receipts, and every match is confirmed against the registry
+    before it is reported, so receipts purged by another process never
+    trigger an alert either.
+    """
+
+    def __init__(self, max_distance=NEAR_DUPLICATE_MAX_DISTANCE):
+        """
+        Initialize the similarity index.
+
+        Args:
+            max_distance: Largest Hamming distance still reported as a near-duplicate
+        """
+        self.max_distance = max_distance
+        self._tree = BKTree()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._generation = None  # registry purge generation the tree was built at
+
+    def _load(self):
+        """(Re)builds the tree from the persisted hashes. Caller must hold self._lock."""
+        registry = get_receipt_registry()
+        self._loaded = True
+        self._generation = registry.purge_generation
+        self._tree = BKTree()
+        for entry in get_receipt_registry().get_perceptual_hashes():
+            try:
+                self._tree.add(int(entry["dhash"], 16), entry)
+            except ValueError:
+                continue
+        logger.info(f"Loaded {self._tree.size} receipt perceptual hashes")
+
+    def check_and_add(self, dhash, image_hash, trade_hash, owner_username, amount=None):
+        """
+        Looks for a near-duplicate of a receipt from another trade, then indexes it.
+
+        Byte-identical files (same image_hash) are left to the exact SHA-256
+        check. When both receipts have an OCR amount, they must agree.
+
+        Args:
+            dhash: Perceptual hash from compute_dhash
+            image_hash: SHA-256 of the image file
+            trade_hash: Trade the receipt was posted in
+            owner_username: Account owning the trade
+            amount: Amount read from the receipt by OCR, if any
+
+        Returns:
+            Previous receipt info dict (trade_hash, owner_username, timestamp,
+            similarity) of the closest match, or None
+        """
+        entry = {
+            "image_hash": image_hash,
+            "trade_hash": trade_hash,
+            "owner_username": owner_username,
+            "dhash": format(dhash, "x"),
+            "amount": amount
+        }
+        registry = get_receipt_registry()
+        with self._lock:
+            if not self._loaded or self._generation != registry.purge_generation:
+                self._load()
+            match = None
+            purged = False
+            for distance, previous in self._tree.search(dhash, self.max_distance):
+                if previous["trade_hash"] == trade_hash or previous["image_hash"] == image_hash:
+                    continue
+                if amount is not None and previous.get("amount") is not None and float(amount) != float(previous["amount"]):
+                    continue
+                if not registry.has_receipt(previous["image_hash"]):
+                    # Purged from the registry (past retention): rebuild on the next check
+                    purged = True
+                    continue
+                match = dict(previous, similarity=round(similarity_from_distance(distance), 3))
+                break
+            if purged:
+                self._loaded = False
+            self._tree.add(dhash, entry)
+        registry.set_perceptual_hash(image_hash, trade_hash, owner_username, entry["dhash"], amount)
+
+        if match:
+            logger.warning(
+                f"Near-duplicate receipt in trade {trade_hash}: matches trade {match['trade_hash']} "
+                f"({match['similarity']:.1%} similar)"
+            )
+        return match
+
+
+# Global similarity index instance
+_similarity_index = ReceiptSimilarityIndex()
+
+
+def get_receipt_similarity_index():
+    """Get the global receipt similarity index instance."""
+    return _similarity_index
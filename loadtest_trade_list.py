@@ -0,0 +1,164 @@
+"""
+Trade List Paging Load Test
+Starts a local mock of the Noones /trade/list endpoint holding a large number
+of open trades and compares:
+  - the old single-page fetch (limit=100, page=1)
+  - paging through every page one after another
+  - fetch_all_trades (first page, then the remaining pages concurrently)
+A second cycle then adds, removes and changes trades on the mock server to
+check the delta fetch_all_trades reports against the previous cycle.
+
+Nothing is sent to Noones and the dashboard's trade snapshots are untouched
+(snapshots go to a temporary directory).
+
+Usage:
+    python loadtest_trade_list.py [open_trades] [latency_ms]
+
+Examples:
+    python loadtest_trade_list.py              # 500 open trades, 150ms per request
+    python loadtest_trade_list.py 1200 300     # 1200 open trades, 300ms per request
+"""
+import sys
+import json
+import time
+import tempfile
+import threading
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import core.api.trade_list as trade_list
+from core.state.trade_snapshot import TradeSnapshotPublisher
+
+ACCOUNT = {"name": "loadtest", "owner_username": "loadtest"}
+HEADERS = {"Authorization": "Bearer loadtest"}
+
+
+class MockTradeStore:
+    def __init__(self, count):
+        self.lock = threading.Lock()
+        self.trades = [self.make_trade(i) for i in range(count)]
+        self.requests = 0
+
+    @staticmethod
+    def make_trade(i):
+        return {
+            "trade_hash": f"mock{i:06d}",
+            "owner_username": "loadtest",
+            "trade_status": "Active funded",
+            "fiat_amount_requested": str(100 + i),
+            "total_attachments": 0
+        }
+
+    def page(self, page, limit):
+        with self.lock:
+            self.requests += 1
+            start = (page - 1) * limit
+            return {
+                "status": "success",
+                "data": {"trades": [dict(t) for t in self.trades[start:start + limit]], "totalCount": len(self.trades)}
+            }
+
+
+def start_mock_server(store, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+            form = {k: v[0] for k, v in parse_qs(body).items()}
+            time.sleep(latency)
+            payload = json.dumps(store.page(int(form.get("page", 1)), int(form.get("limit", 10)))).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def sequential_fetch(page_size):
+    trades = []
+    page = 1
+    while True:
+        page_trades = trade_list._page_trades(trade_list._fetch_trade_page(ACCOUNT, HEADERS, page, page_size))
+        trades.extend(page_trades)
+        if len(page_trades) < page_size:
+            return trades
+        page += 1
+
+
+def main():
+    open_trades = int(sys.argv[1]) if len(sys.argv) >= 2 else 500
+    latency_ms = int(sys.argv[2]) if len(sys.argv) >= 3 else 150
+
+    store = MockTradeStore(open_trades)
+    server = start_mock_server(store, latency_ms / 1000)
+    trade_list.TRADE_LIST_URL_NOONES = f"http://127.0.0.1:{server.server_address[1]}/noones/v1/trade/list"
+    publisher = TradeSnapshotPublisher(tempfile.mkdtemp(prefix="loadtest_trades_"))
+    trade_list.get_trade_snapshot_publisher = lambda: publisher
+
+    print("=" * 70)
+    print(f"TRADE LIST LOAD TEST ({open_trades} open trades, {latency_ms}ms per request)")
+    print("=" * 70)
+    print()
+
+    single, single_seconds = timed(lambda: trade_list.get_trade_list(ACCOUNT, HEADERS, limit=100, page=1))
+    missed = open_trades - len(single)
+    print(f"📄 Single page (old):   {len(single):5d} trades in {single_seconds * 1000:7.0f}ms"
+          + (f"   ⚠️  {missed} never processed" if missed else ""))
+
+    requests_before = store.requests
+    sequential, sequential_seconds = timed(lambda: sequential_fetch(trade_list.TRADE_PAGE_SIZE))
+    print(f"📚 Sequential paging:   {len(sequential):5d} trades in {sequential_seconds * 1000:7.0f}ms"
+          f"   ({store.requests - requests_before} requests)")
+
+    requests_before = store.requests
+    first, concurrent_seconds = timed(lambda: trade_list.fetch_all_trades(ACCOUNT, HEADERS))
+    print(f"🚀 fetch_all_trades:    {len(first.trades):5d} trades in {concurrent_seconds * 1000:7.0f}ms"
+          f"   ({store.requests - requests_before} requests)")
+    if sequential_seconds and concurrent_seconds:
+        print(f"   Speed-up vs sequential paging: {sequential_seconds / concurrent_seconds:.1f}x")
+    print()
+
+    # Second cycle: 25 new, 10 gone, 5 changed
+    with store.lock:
+        removed = [t["trade_hash"] for t in store.trades[:10]]
+        store.trades = store.trades[10:]
+        for trade in store.trades[:5]:
+            trade["trade_status"] = "Paid"
+        store.trades.extend(MockTradeStore.make_trade(open_trades + i) for i in range(25))
+
+    second, second_seconds = timed(lambda: trade_list.fetch_all_trades(ACCOUNT, HEADERS))
+    print(f"🔁 Second cycle:        {len(second.trades):5d} trades in {second_seconds * 1000:7.0f}ms")
+    print(f"   Delta: {len(second.added)} new, {len(second.changed)} changed, {len(second.removed)} gone")
+
+    ok = (
+        len(first.trades) == open_trades
+        and len(first.added) == open_trades
+        and len(second.added) == 25
+        and len(second.changed) == 5
+        and sorted(second.removed) == sorted(removed)
+    )
+    print(f"   Snapshot writes: {publisher.get_stats()}")
+    server.shutdown()
+
+    print()
+    if ok:
+        print("✅ All trades fetched and the delta matches the changes made")
+    else:
+        print("❌ Unexpected result")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
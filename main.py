@@ -15,6 +15,7 @@ from core.messaging.alerts.telegram_alert import send_scheduled_task_alert, send
 from core.utils.connection_guard import wait_for_internet
 from core.utils.startup_checks import validate_config
 from core.binance.email_monitor import check_binance_emails
+from core.utils.rate_governor import background_job
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -143,16 +144,18 @@ def main():
         except Exception as e:
             logger.error(f"Failed to perform initial startup pricing/report check: {e}")
 
+        # Scans and reports run in the rate governor's background lane so they
+        # never delay trade-critical Noones calls.
         scheduler = BackgroundScheduler(timezone='America/Mexico_City')
         scheduler.add_job(turn_on_offers_job, 'cron', hour=8, minute=30)
         scheduler.add_job(turn_off_offers_job, 'cron', hour=2, minute=0)
-        scheduler.add_job(check_wallet_balances_and_alert, 'interval', minutes=30)
+        scheduler.add_job(background_job(check_wallet_balances_and_alert), 'interval', minutes=30)
         scheduler.add_job(check_disk_space_job, 'interval', hours=1)
         scheduler.add_job(check_binance_emails, 'interval', seconds=30)
-        scheduler.add_job(check_promoted_leaderboard_and_alert, 'interval', minutes=3)
-        scheduler.add_job(update_dynamic_pricing_job, 'interval', minutes=5)
-        scheduler.add_job(send_market_status_report, 'interval', hours=4)
-        scheduler.add_job(send_hourly_market_report, 'interval', hours=1)
+        scheduler.add_job(background_job(check_promoted_leaderboard_and_alert), 'interval', minutes=3)
+        scheduler.add_job(background_job(update_dynamic_pricing_job), 'interval', minutes=5)
+        scheduler.add_job(background_job(send_market_status_report), 'interval', hours=4)
+        scheduler.add_job(background_job(send_hourly_market_report), 'interval', hours=1)
         scheduler.start()
         logger.info(
             "Scheduler started. Offers will be turned on daily at 8:30 AM and off at 2:00 AM Central Time.")
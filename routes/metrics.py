@@ -1,5 +1,10 @@
 from flask import Blueprint, jsonify
 from core.utils.customer_metrics import get_new_customers_this_month, get_customer_growth_metrics
+from core.validation.ocr_service import OCR_STATS_FILE
+from core.utils.api_metrics import get_api_metrics, load_published_metrics
+from core.utils.rate_governor import get_rate_governor
+from core.utils.circuit_breaker import get_circuit_breakers
+import json
 import logging
 
 metrics_bp = Blueprint('metrics', __name__)
@@ -31,3 +36,51 @@ def customer_growth():
     except Exception as e:
         logger.error(f"Error fetching customer growth metrics: {e}")
         return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route("/ocr_stats")
+def ocr_stats():
+    """
+    Get OCR queue depth and per-stage timings published by the trading process.
+    """
+    try:
+        with open(OCR_STATS_FILE, "r", encoding="utf-8") as f:
+            return jsonify(json.load(f))
+    except FileNotFoundError:
+        return jsonify({"queue_depth": 0, "completed": 0, "stages": {}})
+    except Exception as e:
+        logger.error(f"Error reading OCR stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route("/api_stats")
+def api_stats():
+    """
+    Get per-endpoint HTTP stats (latency histogram, status codes, retries,
+    backoff, bytes) for every process, plus the rate governor's waits.
+    """
+    try:
+        processes = load_published_metrics()
+        # The dashboard's own numbers are always current
+        processes["app"] = get_api_metrics().get_stats()
+        return jsonify({"processes": processes, "rate_governor": get_rate_governor().get_stats()})
+    except Exception as e:
+        logger.error(f"Error reading API stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.route("/circuit_breakers")
+def circuit_breakers():
+    """
+    Get the state of every upstream circuit breaker, per process.
+    """
+    try:
+        processes = {
+            name: stats.get("circuit_breakers", {})
+            for name, stats in load_published_metrics().items()
+        }
+        processes["app"] = get_circuit_breakers().get_stats()
+        return jsonify(processes)
+    except Exception as e:
+        logger.error(f"Error reading circuit breaker state: {e}")
+        return jsonify({"error": str(e)}), 500
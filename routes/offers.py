@@ -60,7 +60,7 @@ def toggle_offers():
 
 @offers_bp.route("/get_offers")
 def get_offers_route():
-    from core.api.offers import search_public_offers
+    from core.api.market_snapshot import get_market_snapshots, market_for
     from core.trading.dynamic_pricing import load_settings
     from config import BOT_OWNER_USERNAMES
     import time
@@ -82,15 +82,9 @@ def get_offers_route():
             fiat = offer.get("currency_code")
             pm = offer.get("payment_method_slug")
             
-            # Fetch public offers (using internal cache)
-            public_offers = search_public_offers(
-                crypto_code=crypto,
-                fiat_code=fiat,
-                payment_method_slug=pm,
-                trade_direction="buy",
-                payment_method_country_iso="MX" if fiat.upper() == "MXN" else None,
-                country_code="MX" if fiat.upper() == "MXN" else None
-            )
+            # Public offers from the shared market snapshots
+            snapshot = get_market_snapshots().get(market_for(crypto, fiat, pm), allow_stale=True)
+            public_offers = snapshot.offers if snapshot is not None else None
             
             closest_margin = None
             closest_user = None
@@ -33,6 +33,7 @@ def update_setting():
 
 @settings_bp.route("/update_all_selections", methods=["POST"])
 def update_all_selections():
+    from core.utils.config_service import get_config_service
     selections = request.json
     if not isinstance(selections, list):
         return jsonify({"success": False, "error": "Invalid data format"}), 400
@@ -54,16 +55,19 @@ def update_all_selections():
             continue
 
         try:
-            with open(filepath, "r+", encoding="utf-8") as f:
+            with open(filepath, "r", encoding="utf-8") as f:
                 file_data = json.load(f)
-                if owner_username in file_data and payment_method in file_data.get(owner_username, {}):
-                    file_data[owner_username][payment_method]["selected_id"] = selected_id
-                    f.seek(0)
+            if owner_username in file_data and payment_method in file_data.get(owner_username, {}):
+                file_data[owner_username][payment_method]["selected_id"] = selected_id
+                # Atomic replace: the config watchers of the other processes never see a half-written file
+                temp_path = f"{filepath}.{os.getpid()}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
                     json.dump(file_data, f, indent=4)
-                    f.truncate()
-                else:
-                    errors.append(
-                        f"Invalid structure in {filename} for {owner_username}.")
+                os.replace(temp_path, filepath)
+                get_config_service().reload_path(filepath)
+            else:
+                errors.append(
+                    f"Invalid structure in {filename} for {owner_username}.")
         except Exception as e:
             errors.append(
                 f"An unexpected error occurred with {filename}: {str(e)}")
@@ -86,7 +90,7 @@ def get_pricing_settings():
 @settings_bp.route("/get_market_prices", methods=["GET"])
 def get_market_prices():
     from core.trading.dynamic_pricing import load_settings
-    from core.api.offers import search_public_offers
+    from core.api.market_snapshot import get_market_snapshots, market_for
     from config import BOT_OWNER_USERNAMES
     
     try:
@@ -96,15 +100,9 @@ def get_market_prices():
         market_data = []
         for crypto, crypto_rules in rules.items():
             for pm, rule_details in crypto_rules.items():
-                # Fetch public offers (using internal cache)
-                public_offers = search_public_offers(
-                    crypto_code=crypto,
-                    fiat_code="MXN",
-                    payment_method_slug=pm,
-                    trade_direction="buy",
-                    payment_method_country_iso="MX",
-                    country_code="MX"
-                )
+                # Public offers from the shared market snapshots
+                snapshot = get_market_snapshots().get(market_for(crypto, "MXN", pm), allow_stale=True)
+                public_offers = snapshot.offers if snapshot is not None else None
                 
                 closest_competitor = None
                 if public_offers:
@@ -187,17 +185,22 @@ def get_market_prices():
 @settings_bp.route("/update_pricing_settings", methods=["POST"])
 def update_pricing_settings():
     from core.trading.dynamic_pricing import load_settings, SETTINGS_FILE
+    from core.utils.config_service import get_config_service, thaw
     data = request.json
     if not data:
         return jsonify({"success": False, "error": "No data payload provided."}), 400
     try:
-        settings = load_settings()
+        settings = thaw(load_settings())
         for key in ["david_min_margin", "joe_min_margin"]:
             if key in data:
                 settings[key] = float(data[key])
-                
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
+
+        # Atomic replace: the config watchers of the other processes never see a half-written file
+        temp_path = f"{SETTINGS_FILE}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
             json.dump(settings, f, indent=4)
+        os.replace(temp_path, SETTINGS_FILE)
+        get_config_service().reload_path(SETTINGS_FILE)
             
         return jsonify({"success": True, "message": "Pricing settings updated successfully."})
     except Exception as e:
@@ -1,60 +1,32 @@
-import os
-import json
 import logging
-import time
 from flask import Blueprint, jsonify, request
 from core.api.auth import fetch_token_with_retry
 from core.messaging.message_sender import send_message_with_retry
 from config import PLATFORM_ACCOUNTS, CHAT_URL_NOONES, TRADES_ACTIVE_DIR
 from core.api.trade_chat import release_trade
 from core.state.trade_state_loader import load_processed_trades
+from core.state.trade_snapshot import TradeSnapshotReader
 
 trades_bp = Blueprint('trades', __name__)
 logger = logging.getLogger(__name__)
 
 
+def _annotate_trades(stem, trades):
+    account_name_source = stem.replace("_", " ").title()
+    for trade in trades:
+        trade['account_name_source'] = account_name_source
+        trade['has_attachment'] = int(trade.get("total_attachments", 0)) > 0
+
+
+# Only re-parses an account's snapshot when its version changed
+_snapshot_reader = TradeSnapshotReader(TRADES_ACTIVE_DIR, prepare=_annotate_trades)
+
+
 @trades_bp.route("/get_active_trades")
 def get_active_trades():
     active_trades_data = []
-    if not os.path.exists(TRADES_ACTIVE_DIR):
-        return jsonify([])
-
-    for filename in os.listdir(TRADES_ACTIVE_DIR):
-        if filename.endswith("_trades.json"):
-            try:
-                filepath = os.path.join(TRADES_ACTIVE_DIR, filename)
-                data = None
-                for attempt in range(5):
-                    try:
-                        with open(filepath, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                        break
-                    except (PermissionError, FileNotFoundError) as e:
-                        if attempt == 4:
-                            raise
-                        time.sleep(0.05 * (attempt + 1))
-                    except json.JSONDecodeError:
-                        # If JSON is partially written, wait a moment and try again
-                        if attempt == 4:
-                            raise
-                        time.sleep(0.05 * (attempt + 1))
-                
-                if data is not None:
-                    trades_list = data.get("data", {}).get("trades", [])
-                    if trades_list:
-                        account_name_source = filename.replace(
-                            "_trades.json", "").replace("_", " ").title()
-                        for trade in trades_list:
-                            trade['account_name_source'] = account_name_source
-                            
-                            
-                            trade['has_attachment'] = int(trade.get("total_attachments", 0)) > 0
-                        active_trades_data.extend(trades_list)
-            except json.JSONDecodeError as e:
-                logger.warning(f"JSON parsing error for {filename} (might be writing): {e}")
-            except Exception as e:
-                logger.error(
-                    f"Could not read or parse trades file {filename}: {e}")
+    for trades_list in _snapshot_reader.read_all().values():
+        active_trades_data.extend(trades_list)
     return jsonify(active_trades_data)
 
 